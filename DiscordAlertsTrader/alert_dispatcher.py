@@ -0,0 +1,91 @@
+import time
+import queue
+import threading
+import traceback
+from collections import deque
+
+
+class AlertDispatcher():
+    """Process alerts in worker threads, off the discord event loop.
+
+    Each key (e.g. the channel) is always routed to the same worker, so
+    alerts with the same key are processed in the order they arrived. The time
+    each alert waited in the queue is recorded, see `wait_stats`.
+
+    Parameters
+    ----------
+    handler : callable
+        function called by the worker with the submitted args
+    n_workers : int
+        number of worker threads
+    warn_wait : float
+        print a warning if an alert waited more than warn_wait seconds, 0 to disable
+    maxlen : int
+        number of queue wait times kept for the stats
+    """
+    def __init__(self, handler, n_workers=4, warn_wait=0, maxlen=1000):
+        self.handler = handler
+        self.warn_wait = warn_wait
+        self.n_workers = max(1, int(n_workers))
+        self.queues = [queue.Queue() for _ in range(self.n_workers)]
+        self.waits = deque(maxlen=maxlen)
+        self.waits_lock = threading.Lock()
+        self.running = True
+        self.threads = []
+        for i in range(self.n_workers):
+            th = threading.Thread(target=self.worker, args=(self.queues[i],),
+                                  name=f"alert_worker_{i}", daemon=True)
+            th.start()
+            self.threads.append(th)
+
+    def submit(self, key, *args):
+        "Queue args to be processed by the worker assigned to key"
+        ix = hash(key) % self.n_workers
+        self.queues[ix].put((time.perf_counter(), args))
+
+    def worker(self, que):
+        while True:
+            item = que.get()
+            if item is None:
+                que.task_done()
+                break
+            t_in, args = item
+            wait = time.perf_counter() - t_in
+            with self.waits_lock:
+                self.waits.append(wait)
+            if self.warn_wait and wait > self.warn_wait:
+                print(f"alert waited {wait:.2f} sec in queue, {self.qsize()} alerts queued")
+            try:
+                self.handler(*args)
+            except Exception as e:
+                print("error processing alert:", e)
+                traceback.print_exc()
+            finally:
+                que.task_done()
+
+    def join(self):
+        "Block until all queued alerts are processed"
+        for que in self.queues:
+            que.join()
+
+    def qsize(self):
+        return sum(que.qsize() for que in self.queues)
+
+    def wait_stats(self):
+        "Queue wait time in seconds of the last processed alerts"
+        with self.waits_lock:
+            waits = sorted(self.waits)
+        if not len(waits):
+            return {"count": 0, "mean": 0, "p50": 0, "max": 0, "queued": self.qsize()}
+        return {"count": len(waits),
+                "mean": sum(waits)/len(waits),
+                "p50": waits[len(waits)//2],
+                "max": waits[-1],
+                "queued": self.qsize()}
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        for que in self.queues:
+            que.put(None)
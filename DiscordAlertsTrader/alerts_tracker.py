@@ -5,8 +5,10 @@ import os.path as op
 from datetime import datetime, date
 
 from.message_parser import parse_option_under
-from .alerts_trader import find_last_trade, option_date
+from .alerts_trader import find_last_trade, option_date, TradeIndex
 from .configurator import cfg
+from .live_quotes import Watchlist, quote_cache
+from .portfolio_store import open_table
 
 def get_date():
     time_strf = "%Y-%m-%d %H:%M:%S.%f"
@@ -20,7 +22,8 @@ class AlertsTracker():
                  portfolio_fname=cfg['portfolio_names']["tracker_portfolio_name"],
                  dir_quotes = cfg['general']['data_dir'] + '/live_quotes',
                  cfg=cfg,
-                 do_avg=False):
+                 do_avg=False,
+                 watchlist=None):
 
         self.portfolio_fname = portfolio_fname
         self.dir_quotes = dir_quotes
@@ -28,13 +31,15 @@ class AlertsTracker():
         self.cfg = cfg
         self.do_avg = do_avg
 
-        if op.exists(self.portfolio_fname):
-            self.portfolio = pd.read_csv(self.portfolio_fname, na_values=[''])
-            if "underlying" not in self.portfolio.columns:
-                self.portfolio['underlying'] = None
-        else:
-            self.portfolio = pd.DataFrame(columns=self.cfg["col_names"]['tracker_portfolio'].split(",") )
-            self.portfolio.to_csv(self.portfolio_fname, index=False)
+        self.portfolio_store = open_table(self.portfolio_fname, self.cfg["col_names"]['tracker_portfolio'].split(","), self.cfg)
+        self.portfolio = self.portfolio_store.load()
+        if "underlying" not in self.portfolio.columns:
+            self.portfolio['underlying'] = None
+        # portfolio rows by trader and symbol, for find_last_trade
+        self.trade_index = TradeIndex()
+        # symbols of open trades for live quotes
+        self.watchlist = Watchlist() if watchlist is None else watchlist
+        self.watchlist.load("tracker", self.portfolio)
 
     def price_now(self, symbol:str, price_type="BTO"):
         if self.bksession is None:
@@ -47,10 +52,11 @@ class AlertsTracker():
         else: # get both ask and bid
             ptype = ['askPrice', 'bidPrice']
 
-        quote = self.bksession.get_quotes([symbol])
+        max_age = float(self.cfg['general']['quotes_max_age'])
+        quote = quote_cache.get_quotes([symbol], self.bksession, max_age)
         if quote is None:
             # Try it again in case of TDA
-            quote = self.bksession.get_quotes([symbol])
+            quote = quote_cache.get_quotes([symbol], self.bksession, max_age)
 
         if quote is not None and len(quote) and quote.get(symbol) is not None and quote.get(symbol).get('description' ) != 'Symbol not found':
             if isinstance(ptype, list):
@@ -63,7 +69,7 @@ class AlertsTracker():
                 print("quote 0 for", symbol, price_type)
 
     def trade_alert(self, order, live_alert=True, channel=None):
-        open_trade, _ = find_last_trade(order, self.portfolio, open_only=True)
+        open_trade, _ = find_last_trade(order, self.portfolio, open_only=True, trade_index=self.trade_index)
         order = copy.deepcopy(order)
         if order.get('Qty') is None:
             order['Qty'] = 1
@@ -73,28 +79,30 @@ class AlertsTracker():
             if order.get('Actual Cost', 'None') == 'None':
                 order["Actual Cost"] = self.price_now(order["Symbol"], order["action"])
 
+        # rows changed, new rows are always saved
+        changed = []
         if (open_trade is None or self.do_avg is False) and order["action"] in ["BTO", 'STO']:
             str_act = self.make_BTO(order, channel)
         elif order["action"] in ["BTO", 'STO']:
             # str_act = "BTO averaging disabled as it is mostly wrong alert messages"
             str_act = self.make_BTO_Avg(order, open_trade)
+            changed.append(open_trade)
         elif order["action"] in ["STC", "BTC"] and open_trade is None:
             str_act = order["action"] + "without BTO"
         elif order["action"] in ["STC", "BTC"]:
             str_act = ""
-            trades_log = self.portfolio.loc[self.portfolio["Trader"] == order["Trader"]]
-            msk_ticker = trades_log["Symbol"].str.match(f"{order['Symbol']}$")
-            open_trades = trades_log[msk_ticker].index.values
+            open_trades = self.trade_index.rows(self.portfolio, order["Trader"], order['Symbol'])
             for open_trade in  open_trades:
                 if self.portfolio.loc[open_trade, "isOpen"] == 1:
                     str_act += self.make_STC(order, open_trade)
+                    changed.append(open_trade)
         elif order["action"] == "ExitUpdate":
             if open_trade is not None:
                 self.portfolio.loc[open_trade, "SL"] = order.get('SL')
             return
 
         #save to csv
-        self.portfolio.to_csv(self.portfolio_fname, index=False)
+        self.portfolio_store.save(self.portfolio, changed)
         return str_act
 
     def make_BTO(self, order, chan=None):
@@ -130,6 +138,7 @@ class AlertsTracker():
             ],
             ignore_index=True,
         )
+        self.watchlist.add("tracker", self.portfolio.index[-1], order['Symbol'], order["asset"], date)
 
         str_act = f"{order['action']} {order['Symbol']} {order['price']}"
         if order['SL'] is not None:
@@ -185,6 +194,7 @@ class AlertsTracker():
         if stc_utotal >= trade['Qty']:
             suffx = " Closed"
             self.portfolio.loc[open_trade, "isOpen"] = 0
+            self.watchlist.close("tracker", open_trade)
 
         if stc_price == "none" or stc_price is None:
             str_STC = f"{order['action']} {order['Symbol']}  ({order['Qty']}), no price provided" + suffx
@@ -200,6 +210,7 @@ class AlertsTracker():
 
         if eval(order.get('# Closed', "0"))==1 :
             self.portfolio.loc[open_trade, "isOpen"]=0
+            self.watchlist.close("tracker", open_trade)
         str_STC = str_STC + " " + trailstat.replace('| ', '\n\t')
         return str_STC
 
@@ -254,6 +265,7 @@ class AlertsTracker():
         return tdiff_str, trl_r
 
     def close_expired(self):
+        expired = []
         for i, trade in  self.portfolio.iterrows():
             if trade["Asset"] != "option" or trade["isOpen"] == 0:
                 continue
@@ -269,9 +281,11 @@ class AlertsTracker():
                     self.portfolio.loc[i, k] = v
 
                 self.portfolio.loc[i, "isOpen"] = 0
+                self.watchlist.close("tracker", i)
+                expired.append(i)
                 str_prt = f"{trade['Symbol']} option expired -100%"
                 print(str_prt)
-        self.portfolio.to_csv(self.portfolio_fname, index=False)
+        self.portfolio_store.save(self.portfolio, expired)
 
 def calc_stc_prices(trade, order=None):
     # if order is None = expired option
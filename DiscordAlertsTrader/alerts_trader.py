@@ -13,37 +13,69 @@ from datetime import datetime, timedelta, date
 import time
 import threading
 import queue
+from concurrent.futures import Future
 from colorama import Fore, Back
 
 from DiscordAlertsTrader.configurator import cfg
 from DiscordAlertsTrader.message_parser import parse_exit_plan, set_exit_price_type, ordersymb_to_str
+from DiscordAlertsTrader.live_quotes import Watchlist, quote_cache
+from DiscordAlertsTrader.portfolio_store import open_table
+from DiscordAlertsTrader.latency import latency
+from DiscordAlertsTrader.brokerages import capabilities
+
+
+class TradeIndex():
+    """Portfolio rows by (Trader, Symbol) and by (Trader, option root symbol)
+
+    Rows appended to the portfolio are indexed on the next lookup, the whole
+    portfolio is only indexed again if rows were removed. Symbol and Trader of
+    a row are not expected to change.
+    """
+    def __init__(self):
+        self.symbols = {}  # (trader, symbol): [portfolio index]
+        self.roots = {}  # (trader, option root): [portfolio index]
+        self.n_rows = 0
+        self.lock = threading.Lock()
+
+    def sync(self, portfolio):
+        "Index rows appended to portfolio since last sync"
+        with self.lock:
+            if len(portfolio) < self.n_rows:
+                self.symbols, self.roots, self.n_rows = {}, {}, 0
+            if len(portfolio) == self.n_rows:
+                return
+            new = portfolio.iloc[self.n_rows:]
+            for ix, trader, symbol, asset in zip(new.index, new["Trader"], new["Symbol"], new["Asset"]):
+                self.symbols.setdefault((trader, symbol), []).append(ix)
+                if asset == "option" and isinstance(symbol, str):
+                    self.roots.setdefault((trader, symbol.split("_")[0]), []).append(ix)
+            self.n_rows = len(portfolio)
 
+    def rows(self, portfolio, trader, symbol, root=False):
+        "Portfolio index of the trades of trader with symbol, or with option root symbol if root"
+        self.sync(portfolio)
+        return list((self.roots if root else self.symbols).get((trader, symbol), []))
 
-def find_last_trade(order, trades_log, open_only=True):
-    trades_authr = trades_log["Trader"] == order["Trader"]
-    trades_log = trades_log.loc[trades_authr]
 
-    msk_ticker = trades_log["Symbol"].str.match(f"{order['Symbol']}$")
+def find_last_trade(order, trades_log, open_only=True, trade_index=None):
+    if trade_index is None:
+        trade_index = TradeIndex()
+    trades = trade_index.rows(trades_log, order["Trader"], order['Symbol'])
 
     # Order ticker without dates and strike
-    if sum(msk_ticker) == 0 and order['asset'] == 'option':
-        trades_log = trades_log[trades_log["Asset"] == "option"]
-        trade_symb = trades_log["Symbol"].apply(lambda x: x.split("_")[0])
-
-        msk_ticker = trade_symb.str.match(f"{order['Symbol']}$")
+    if len(trades) == 0 and order['asset'] == 'option':
+        trades = trade_index.rows(trades_log, order["Trader"], order['Symbol'], root=True)
 
-    if sum(msk_ticker) == 1:
-        last_trade, = trades_log[msk_ticker].index.values
+    if len(trades) == 1:
+        last_trade = trades[0]
     # Either take open trade or last
-    elif sum(msk_ticker) > 1:
-        open_trade = trades_log.loc[msk_ticker, "isOpen"]
-        if open_trade.sum() == 1:
-            last_trade, = open_trade.index[open_trade==1]
-        elif open_trade.sum() > 1:
-            # raise ValueError ("Trade with more than one open position")
+    elif len(trades) > 1:
+        open_trade = trades_log.loc[trades, "isOpen"]
+        if open_trade.sum() >= 1:
+            # more than one open position, take last
             last_trade = open_trade.index[open_trade==1][-1]
-        elif open_trade.sum() == 0:
-            last_trade = open_trade.index[-1]
+        else:
+            last_trade = trades[-1]
     else:
         return None, 0
 
@@ -62,7 +94,8 @@ class AlertsTrader():
                  alerts_log_fname=cfg['portfolio_names']['alerts_log_fname'],
                  queue_prints=queue.Queue(maxsize=10),
                  update_portfolio=True,
-                 cfg=cfg
+                 cfg=cfg,
+                 watchlist=None
                  ):
         self.bksession = brokerage
         self.portfolio_fname = portfolio_fname
@@ -74,20 +107,35 @@ class AlertsTrader():
         self.EOD = {} # end of day shorting actions
         self.order_update_rate = 10
         self.max_stc_orders = int(cfg['order_configs']['max_stc_orders']) + 1
+        self.risk_t0 = None  # start of the risk latency stage of the order being confirmed
         # load port and log
-        if op.exists(self.portfolio_fname):
-            self.portfolio = pd.read_csv(self.portfolio_fname, na_values=[''])
-        else:
-            self.portfolio = pd.DataFrame(columns=self.cfg["col_names"]['portfolio'].split(",") )
-            self.portfolio.to_csv(self.portfolio_fname, index=False)
-        if op.exists(self.alerts_log_fname):
-            self.alerts_log = pd.read_csv(self.alerts_log_fname, na_values=[''])
-        else:
-            self.alerts_log = pd.DataFrame(columns=self.cfg["col_names"]['alerts_log'].split(","))
-            self.alerts_log.to_csv(self.alerts_log_fname, index=False)
+        self.portfolio_store = open_table(self.portfolio_fname, self.cfg["col_names"]['portfolio'].split(","), self.cfg)
+        self.alerts_log_store = open_table(self.alerts_log_fname, self.cfg["col_names"]['alerts_log'].split(","), self.cfg)
+        self.portfolio = self.portfolio_store.load()
+        self.alerts_log = self.alerts_log_store.load()
+        # symbols of open trades for live quotes
+        self.watchlist = Watchlist() if watchlist is None else watchlist
+        self.watchlist.load("trader", self.portfolio)
+        # portfolio rows by trader and symbol, for find_last_trade
+        self.trade_index = TradeIndex()
+        # index of open trades, including pending fill and invTSbuy, for update_orders
+        self.open_trades = set(self.portfolio.index[self.portfolio['isOpen'] == 1])
 
         self.update_portfolio = update_portfolio
-        self.update_paused = False
+        self.orders_snapshot = None  # orders status, fetched once per update_orders
+        self.orders_info = {}  # orders status, updated with get_orders_since if the brokerage can
+        self.orders_polled = 0
+        # secs between orders polls when order updates are streamed, None polls every update
+        self.order_reconcile_rate = None
+        self.orders_fetched = 0
+        self.quotes_snapshot = None  # quotes of open trades, fetched once per update_orders
+        # portfolio is only changed by the owner thread, running commands from a queue.
+        # Alerts and order updates are queued, readers use snapshot()
+        self._snapshot = self.portfolio.copy()
+        self._dirty = False  # portfolio may have changed since the snapshot, copied when read
+        self.commands = queue.Queue()
+        self.owner = threading.Thread(target=self.run_commands, name="trader_owner", daemon=True)
+        self.owner.start()
         if update_portfolio:
             # first do a synch, then thread it
             self.update_orders()
@@ -98,9 +146,6 @@ class AlertsTrader():
 
     def trade_updater(self):
         while self.update_portfolio is True:
-            if self.update_paused is True:
-                time.sleep(0.5)
-                continue
             t0 = time.time()
             try:
                 self.update_orders()
@@ -116,11 +161,79 @@ class AlertsTrader():
         print(Back.GREEN + str_msg)
         self.queue_prints.put([str_msg, "", "green"])
 
-    def save_logs(self, csvs=["port", "alert"]):
+    def run_commands(self):
+        "Owner thread, runs the queued commands one at a time"
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            future, func, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            if func != self._copy_portfolio:
+                self._dirty = True
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def is_owner(self):
+        "True if called from the owner thread or if it is not running"
+        return threading.current_thread() is self.owner or not self.owner.is_alive()
+
+    def submit(self, func, *args):
+        "Queue func to run in the owner thread, returns a Future"
+        future = Future()
+        if self.is_owner():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self.commands.put((future, func, args))
+        return future
+
+    def call(self, func, *args):
+        "Run func in the owner thread and wait for its result"
+        if self.is_owner():
+            return func(*args)
+        return self.submit(func, *args).result()
+
+    def snapshot(self):
+        "Copy of the portfolio after the last command, do not modify"
+        if self._dirty or not self.owner.is_alive():
+            self._snapshot = self.call(self._copy_portfolio)
+        return self._snapshot
+
+    def _copy_portfolio(self):
+        self._dirty = False
+        return self.portfolio.copy()
+
+    def stop(self):
+        "Stop the portfolio updater and the owner thread once queued commands are done"
+        self.update_portfolio = False
+        self.commands.put(None)
+
+    def track_open(self, open_trade):
+        "Add new open trade to open trades index and watchlist"
+        trade = self.portfolio.loc[open_trade]
+        self.open_trades.add(open_trade)
+        self.watchlist.add("trader", open_trade, trade['Symbol'], trade['Asset'], trade['Date'])
+
+    def close_trade(self, open_trade):
+        "Set trade as closed and remove it from open trades index and watchlist"
+        self.portfolio.loc[open_trade, "isOpen"] = 0
+        self.open_trades.discard(open_trade)
+        self.watchlist.close("trader", open_trade)
+
+    def save_logs(self, csvs=["port", "alert"], rows=None):
+        "Save portfolio and alerts log, rows are the portfolio rows changed, None for all"
         if "port" in csvs:
-            self.portfolio.to_csv(self.portfolio_fname, index=False)
+            self.portfolio_store.save(self.portfolio, rows)
         if "alert" in csvs:
-            self.alerts_log.to_csv(self.alerts_log_fname, index=False)
+            # alerts are only appended, new rows are saved
+            self.alerts_log_store.save(self.alerts_log, [])
 
     def order_to_pars(self, order):
         pars_str = f"{order['action']} {order['Symbol']} @{order['price']}"
@@ -183,7 +296,11 @@ class AlertsTrader():
         else:
             ptype= 'bidPrice'
         try:
-            resp = self.bksession.get_quotes([symbol])
+            if self.quotes_snapshot is not None and symbol in self.quotes_snapshot:
+                resp = self.quotes_snapshot
+            else:
+                with latency.span("quote"):
+                    resp = quote_cache.get_quotes([symbol], self.bksession, float(self.cfg['general']['quotes_max_age']))
             if resp is None or len(resp) == 0 or symbol not in resp.keys() or resp[symbol].get('description' ) == 'Symbol not found' :
                 str_msg =  f"{symbol} not found during price quote"
                 print (Back.RED + str_msg)
@@ -202,10 +319,17 @@ class AlertsTrader():
             return "CURRENTLY @%.2f"% quote
 
     def confirm_and_send(self, order, pars, order_funct):
-            resp, order, ord_chngd = self.notify_alert(order, pars)
+            self.risk_t0 = time.perf_counter()
+            try:
+                resp, order, ord_chngd = self.notify_alert(order, pars)
+            finally:
+                self.end_risk_span()
             if resp in ["yes", "y"]:
+                with latency.span("build"):
+                    bk_order = order_funct(**order)
                 # try:
-                ord_resp, ord_id = self.bksession.send_order(order_funct(**order))
+                with latency.span("send"):
+                    ord_resp, ord_id = self.bksession.send_order(bk_order)
                 # except Exception as e:
                 #     str_msg = f"Error in order {e}"
                 #     print(Back.GREEN + str_msg)
@@ -214,6 +338,8 @@ class AlertsTrader():
                 
                 if ord_resp is None:
                     return None, None, order, None
+                if ord_id is not None:
+                    latency.order_sent(order_key(ord_id))
 
                 str_msg = f"Sent order {order['action']} {order['Qty']} {order['Symbol']} @{order['price']}"
                 print(Back.GREEN + str_msg)
@@ -344,6 +470,12 @@ class AlertsTrader():
         else:
             return "no", order, False
 
+    def end_risk_span(self):
+        "Record the risk stage once, before waiting for the user confirmation"
+        if self.risk_t0 is not None:
+            latency.record("risk", time.perf_counter() - self.risk_t0)
+            self.risk_t0 = None
+
     def notify_alert(self, order, pars):
         price_now = self.price_now
         symb = order['Symbol']
@@ -451,7 +583,8 @@ class AlertsTrader():
                             return "no", order, False
                 return "yes", order, False
 
-            # Manual trade 
+            # Manual trade, user reaction time is not timed
+            self.end_risk_span()
             resp = input(Back.RED  + question + "\n Make trade? (y, n or (c)hange) \n").lower()
 
             if resp in [ "c", "change", "y", "yes"] and 'Qty' not in order.keys():
@@ -493,9 +626,10 @@ class AlertsTrader():
         # close STCn waiting orders
         if STCn is None:
             STCn = range(1,self.max_stc_orders)
-        position = self.portfolio.iloc[open_trade]
+        position = self.portfolio.loc[open_trade]
         if type(STCn) == int: STCn = [STCn]
 
+        to_cancel = []
         for i in STCn:
             if pd.isnull(position[ f"STC{i}-ordID"]):
                 continue
@@ -506,22 +640,76 @@ class AlertsTrader():
             if ord_stat not in ["FILLED", "EXECUTED", 'CANCELED','CANCEL_REQUESTED','REJECTED', 'EXPIRED']:
                 print(Back.GREEN + f"Cancelling {position['Symbol']} STC{i}")
                 self.queue_prints.put([f"Cancelling {position['Symbol']} STC{i}", "", "green"])
-                _ = self.bksession.cancel_order(order_id)
+                to_cancel.append(order_id)
 
                 self.portfolio.loc[open_trade, f"STC{i}-Status"] = np.nan
                 self.portfolio.loc[open_trade, f"STC{i}-ordID"] = np.nan                
-                self.save_logs("port")
                 
             elif ord_stat in ["REJECTED", 'CANCELED','CANCEL_REQUESTED', 'EXPIRED']:
                 self.portfolio.loc[open_trade, f"STC{i}-Status"] = np.nan
                 self.portfolio.loc[open_trade, f"STC{i}-ordID"] = np.nan
-                self.save_logs("port")
+        # all at once if the brokerage can
+        if len(to_cancel):
+            self.cancel_orders(to_cancel)
+        self.save_logs("port", rows=[open_trade])
 
 
+    def fetch_orders_info(self):
+        "Get all orders status once per update, used by get_order_info"
+        if self.order_reconcile_rate is not None and self.orders_snapshot is not None \
+                and time.time() - self.orders_fetched < self.order_reconcile_rate:
+            # order updates are streamed, snapshot kept until the next reconcile
+            return
+        self.orders_snapshot = None
+        if not self.cfg['order_configs'].getboolean('batch_order_status'):
+            return
+        get_orders_info = getattr(self.bksession, "get_orders_info", None)
+        if get_orders_info is None:
+            return
+        try:
+            if "orders_since" in capabilities(self.bksession):
+                # only orders changed since last poll, with a margin
+                t_poll = time.time()
+                self.orders_info.update(self.bksession.run(self.bksession.get_orders_since(self.orders_polled - 5)))
+                self.orders_polled = t_poll
+                self.orders_snapshot = dict(self.orders_info)
+            else:
+                self.orders_snapshot = get_orders_info()
+            self.orders_fetched = time.time()
+        except Exception as e:
+            print(Back.RED + f"Error getting orders, asking each order status instead. Error: {e}")
+
+    def cancel_order(self, order_id):
+        "Cancel order and remove it from the orders snapshot"
+        return self.cancel_orders([order_id])[0]
+
+    def cancel_orders(self, order_ids):
+        "Cancel orders, in one request if the brokerage can, and remove them from the orders snapshot"
+        for order_id in order_ids:
+            self.orders_info.pop(order_key(order_id), None)
+            if self.orders_snapshot is not None:
+                self.orders_snapshot.pop(order_key(order_id), None)
+        if "batch_cancel" in capabilities(self.bksession):
+            return self.bksession.run(self.bksession.cancel_orders(order_ids))
+        return [self.bksession.cancel_order(order_id) for order_id in order_ids]
+
+    def send_orders(self, bk_orders):
+        "Send brokerage orders, in one request if the brokerage can, returns [(order_response, order_id), ...]"
+        if len(bk_orders) > 1 and "batch_orders" in capabilities(self.bksession):
+            return self.bksession.run(self.bksession.send_orders(bk_orders))
+        return [self.bksession.send_order(bk_order) for bk_order in bk_orders]
+
     def get_order_info(self, order_id):
+        # use snapshot of the update, if order not there ask brokerage
+        if self.orders_snapshot is not None:
+            info = self.orders_snapshot.get(order_key(order_id))
+            if info is not None:
+                latency.order_status(order_key(order_id), info[0])
+                return info
         # try:
-            order_status, order_info = self.bksession.get_order_info(order_id)
-            return order_status, order_info
+        order_status, order_info = self.bksession.get_order_info(order_id)
+        latency.order_status(order_key(order_id), order_status)
+        return order_status, order_info
         # except Exception as ex:
         #     print(f"Caught Error in order info, skipping order info retr. Error: {ex}")
         #     self.queue_prints.put([f"Caught Error, skipping order info retr. Error: {ex}", "", "red"])
@@ -534,8 +722,10 @@ class AlertsTrader():
 
     def new_trade_alert(self, order:dict, pars:str, msg):
         """ get order from ```parser_alerts``` """
+        if not self.is_owner():
+            return self.call(self.new_trade_alert, order, pars, msg)
 
-        open_trade, isOpen = find_last_trade(order, self.portfolio)
+        open_trade, isOpen = find_last_trade(order, self.portfolio, trade_index=self.trade_index)
 
         time_strf = "%Y-%m-%d %H:%M:%S.%f"
         date = datetime.now().strftime(time_strf)
@@ -551,8 +741,8 @@ class AlertsTrader():
             if order.get("isopen") == False:
                 # close position command
                 self.close_open_exit_orders(open_trade)
-                self.portfolio.loc[open_trade, "isOpen"] = 0
-                self.save_logs("port")
+                self.close_trade(open_trade)
+                self.save_logs("port", rows=[open_trade])
                 
                 symb = self.portfolio.loc[open_trade, "Symbol"]
                 msg = f"Position marked as closed: {symb}"
@@ -568,18 +758,17 @@ class AlertsTrader():
                         ordID = trade['ordID'].split(",")[-1]
                     else:
                         ordID = trade['ordID']
-                    order_status = self.bksession.cancel_order(ordID)
+                    order_status = self.cancel_order(ordID)
                     order_status = order_status.replace("UROUT", "CANCELED")                    
-                    self.portfolio.loc[i, "BTO-avg-Status"] = order_status
+                    self.portfolio.loc[open_trade, "BTO-avg-Status"] = order_status
                     
                     symb = self.portfolio.loc[open_trade, "Symbol"]
                     msg = f"Cancelled avg order for {symb}"
                     print(Back.GREEN + msg)
                     self.queue_prints.put([msg, "", "green"])                
+                    self.save_logs("port", rows=[open_trade])
                 return
-            
-            # Pause updater to avoid overlapping
-            self.update_paused = True
+
 
             old_plan = self.portfolio.loc[open_trade, "exit_plan"]
             new_plan = parse_exit_plan(order)
@@ -624,10 +813,9 @@ class AlertsTrader():
                 renew_plan = new_plan
                 
             self.portfolio.loc[open_trade, "exit_plan"] = str(renew_plan)
-            self.update_paused = False
 
             log_alert['action'] = "ExitUpdate"
-            self.save_logs()
+            self.save_logs(rows=[open_trade])
 
             symb = self.portfolio.loc[open_trade, "Symbol"]
             print(Back.GREEN + f"Updated {symb} exit plan from :{old_plan} to {renew_plan}")
@@ -679,23 +867,20 @@ class AlertsTrader():
                                 "trader_qty": order.get('Qty', 1),
                                 }
                     self.portfolio = pd.concat([self.portfolio, pd.DataFrame.from_records(new_trade, index=[0])], ignore_index=True)                    
+                    self.track_open(self.portfolio.index[-1])
                     str_msg = f"{action} {order['Symbol']} created inverse TS local order @{pricenow}, TSconst {ts}, stp @{pricenow-ts}"
                     print(Back.GREEN + str_msg)
                     self.queue_prints.put([str_msg, "", "green"])
-                    self.save_logs("port")
+                    self.save_logs("port", rows=[open_trade])
                     return
                 else:
                     order["trail_stop_const"] = round(ts / 0.01) * 0.01
                     order_response, order_id, order, _ = self.confirm_and_send(order, pars, self.bksession.make_STC_SL_trailstop)
                 
             else:
-                if self.bksession.name == "cobra":
-                    self.update_paused = True
                 order_response, order_id, order, _ = self.confirm_and_send(order, pars, self.bksession.make_BTO_lim_order)
-                if self.bksession.name == "cobra":
-                    self.update_paused = False
     
-            self.save_logs("port")
+            self.save_logs("port", rows=[open_trade])
             if order_response is None:  #Assume trade not accepted
                 log_alert['action'] = action+"-notAccepted"                
                 self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
@@ -747,9 +932,10 @@ class AlertsTrader():
                          }
 
             self.portfolio = pd.concat([self.portfolio, pd.DataFrame.from_records(new_trade, index=[0])], ignore_index=True)
+            self.track_open(self.portfolio.index[-1])
             
             if order_status in ["FILLED", "EXECUTED"]:
-                ot, _ = find_last_trade(order, self.portfolio)
+                ot, _ = find_last_trade(order, self.portfolio, trade_index=self.trade_index)
                 self.portfolio.loc[ot, "Price"] = order_info['price']
                 self.portfolio.loc[ot, "filledQty"] = order_info['filledQuantity']
                 self.disc_notifier(order_info)
@@ -772,7 +958,7 @@ class AlertsTrader():
             log_alert['action'] = action
             log_alert["portfolio_idx"] = len(self.portfolio) - 1
             self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-            self.save_logs()
+            self.save_logs(rows=[open_trade])
 
         elif order["action"] == "BTO" and self.cfg['order_configs'].getboolean('accept_repeated_bto_alerts') or \
             order["action"] == "STO" and self.cfg['shorting'].getboolean('accept_repeated_sto_alerts'):
@@ -780,7 +966,7 @@ class AlertsTrader():
             alert_price = order['price']
             order_response, order_id, order, _ = self.confirm_and_send(order, pars,
                                                                        self.bksession.make_BTO_lim_order)
-            self.save_logs("port")
+            self.save_logs("port", rows=[open_trade])
             if order_response is None:  # Assume trade not accepted
                 log_alert['action'] = "BTO-Avg-notAccepted"
                 self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
@@ -840,7 +1026,7 @@ class AlertsTrader():
             log_alert['action'] = "BTO-avg"
             log_alert["portfolio_idx"] = len(self.portfolio) - 1
             self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-            self.save_logs()
+            self.save_logs(rows=[open_trade])
 
         elif order["action"] in ["BTO", "STO"]:
             str_act = f"Repeated {order['action']}"
@@ -851,18 +1037,18 @@ class AlertsTrader():
             self.queue_prints.put([str_act, "", "red"])
 
         elif order["action"] in ["STC", "BTC"] and isOpen == 0:
-            open_trade, _ = find_last_trade(order, self.portfolio, open_only=False)
+            open_trade, _ = find_last_trade(order, self.portfolio, open_only=False, trade_index=self.trade_index)
             if open_trade is None:
                 log_alert['action'] = str_msg = f"{order['action']}-alerted without open position"
                 self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-                self.save_logs()
+                self.save_logs(rows=[open_trade])
                 if (self.cfg['general'].getboolean('DO_BTO_TRADES') and order["action"] == "STC") or \
                     (self.cfg['general'].getboolean('DO_STO_TRADES') and order["action"] == "BTC"):
                     print(Back.GREEN + str_msg)
                     self.queue_prints.put([str_msg, "", "green"])
                 return
 
-            position = self.portfolio.iloc[open_trade]
+            position = self.portfolio.loc[open_trade]
             # Check if closed position was not alerted
             for i in range(1,self.max_stc_orders):
                 STC = f"STC{i}"
@@ -875,7 +1061,7 @@ class AlertsTrader():
                         log_alert['action'] = f"{STC}-alerterdAfterClose"
                         log_alert["portfolio_idx"] = open_trade
                         self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-                        self.save_logs()
+                        self.save_logs(rows=[open_trade])
                     return
 
             if order["action"] == "STC":
@@ -889,7 +1075,7 @@ class AlertsTrader():
             self.queue_prints.put([str_act, "", "red"])
 
         elif order["action"] in ["STC", "BTC"]:
-            position = self.portfolio.iloc[open_trade]
+            position = self.portfolio.loc[open_trade]
             if order.get("amnt_left"):
                 order, changed = amnt_left(order, position)
                 print(Back.GREEN + f"Based on alerted amnt left, Updated order: " +
@@ -945,18 +1131,18 @@ class AlertsTrader():
             if position["BTO-Status"] in ["CANCELED", "REJECTED", "EXPIRED", "CANCEL_REQUESTED"]:
                 log_alert['action'] = "Trade-already canceled"
                 log_alert["portfolio_idx"] = open_trade
-                self.portfolio.iloc[open_trade, 'isOpen'] = 0
+                self.close_trade(open_trade)
                 self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-                self.save_logs(["alert"])
+                self.save_logs(rows=[open_trade])
                 return
 
             # Close position of STC All or STC SL
             if qty_bought == 0 and order['xQty'] == 1:
 
                 order_id = position['ordID']
-                _ = self.bksession.cancel_order(order_id)
+                _ = self.cancel_order(order_id)
 
-                self.portfolio.loc[open_trade, "isOpen"] = 0
+                self.close_trade(open_trade)
 
                 order_status, _ =  self.get_order_info(order_id)
                 self.portfolio.loc[open_trade, "BTO-Status"] = order_status.replace("UROUT", "CANCELED")
@@ -966,7 +1152,7 @@ class AlertsTrader():
 
                 log_alert['action'] = f"{order['action']}-ClosedBeforeFill"
                 log_alert["portfolio_idx"] = open_trade
-                self.save_logs()
+                self.save_logs(rows=[open_trade])
                 return
             
             # Set STC as exit plan, not bought yet
@@ -979,18 +1165,19 @@ class AlertsTrader():
                 self.queue_prints.put([str_msg,"", "green"])
                 log_alert['action'] = f"{order['action']}-partial-BeforeFill-ExUp"
                 log_alert["portfolio_idx"] = open_trade
+                self.save_logs("port", rows=[open_trade])
                 return
 
             qty_sold = np.nansum([position[f"STC{i}-Qty"] for i in range(1,self.max_stc_orders)])
             if position["Qty"] - qty_sold == 0:
-                self.portfolio.loc[open_trade, "isOpen"] = 0
+                self.close_trade(open_trade)
                 print(Back.GREEN + "Already sold")
                 self.queue_prints.put(["Already sold", "", "green"])
 
                 log_alert['action'] = f"{STC}-DoneBefore"
                 log_alert["portfolio_idx"] = open_trade
                 self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-                self.save_logs(["alert"])
+                self.save_logs(rows=[open_trade])
                 return
 
             # # adjust trader qty to match portfolio
@@ -1005,7 +1192,7 @@ class AlertsTrader():
                 elif order['xQty'] == 1:
                     print("Selling all, got xQTY =1, check if not true")              
                 qty_sold = np.nansum([position[f"STC{i}-Qty"] for i in range(1,self.max_stc_orders)])
-                position = self.portfolio.iloc[open_trade]
+                position = self.portfolio.loc[open_trade]
                 order['Qty'] = int(position["Qty"]) - qty_sold
 
             elif order['xQty'] < 1 :  # portion
@@ -1017,8 +1204,6 @@ class AlertsTrader():
                 print(Back.RED + Fore.BLACK + str_msg)
                 self.queue_prints.put([str_msg, "", "red"])
 
-            # Stop updater to avoid overlapping
-            self.update_paused = True
             # close waiting stc orders
             self.close_open_exit_orders(open_trade)
             # remove exits from exit plan
@@ -1035,7 +1220,6 @@ class AlertsTrader():
                 msg_str = f"{order['action']} not accepted by user, order response null"
                 print(Back.GREEN + msg_str)
                 self.queue_prints.put([msg_str, "", "green"])
-                self.update_paused = False
                 return
 
             order_status, order_info = self.get_order_info(order_id)
@@ -1066,8 +1250,7 @@ class AlertsTrader():
             #Log trades_log
             log_alert['action'] = "STC-partial" if order['xQty']<1 else "STC-ALL"
             self.alerts_log = pd.concat([self.alerts_log, pd.DataFrame.from_records(log_alert, index=[0])], ignore_index=True)
-            self.save_logs()
-            self.update_paused = False
+            self.save_logs(rows=[open_trade])
 
 
     def log_filled_STC(self, order_id, open_trade, STC):
@@ -1137,11 +1320,11 @@ class AlertsTrader():
 
         if sold_Qty == self.portfolio.loc[open_trade, "Qty"]:
             str_STC += " (Closed)"
-            self.portfolio.loc[open_trade, "isOpen"] = 0
+            self.close_trade(open_trade)
 
         print (Back.GREEN + f"Filled: {str_STC}")
         self.queue_prints.put([f"Filled: {str_STC}","", "green"])
-        self.save_logs()
+        self.save_logs(rows=[open_trade])
 
 
     def exit_percent_to_price(self, open_trade):
@@ -1202,389 +1385,484 @@ class AlertsTrader():
             self.queue_prints.put([str_msg, "", "green"])
 
 
-    def update_orders(self):
-        for i in range(len(self.portfolio)):
-            if self.update_paused:
-                return
-            self.close_expired(i)
-            trade = self.portfolio.iloc[i]
-            redo_orders = False
-
-            if trade["isOpen"] == 0:
+    def fetch_quotes(self):
+        "Get quotes of open trades that will need it in this update in one call, used by price_now"
+        self.quotes_snapshot = None
+        eod_short = self.cfg['shorting'].getboolean("BTC_EOD")
+        today = date.today()
+        symbols = set()
+        for i in self.open_trades:
+            trade = self.portfolio.loc[i]
+            if trade["BTO-Status"] == "invTSbuy" or (eod_short and trade['Type'] == 'STO') or \
+                (trade["Asset"] == "option" and option_date(trade['Symbol']).date() < today) or \
+                self.exits_need_quote(trade):
+                symbols.add(trade['Symbol'])
+        if not len(symbols):
+            return
+        try:
+            self.quotes_snapshot = quote_cache.get_quotes(list(symbols), self.bksession,
+                                                          float(self.cfg['general']['quotes_max_age']))
+        except Exception as e:
+            print(Back.RED + f"Error getting quotes, asking each quote instead. Error: {e}")
+
+    def exits_need_quote(self, trade):
+        "True if making the exit orders of trade asks its price, SL below market or trailing stop PT"
+        if trade["BTO-Status"] not in ["FILLED", "EXECUTED"] or not isinstance(trade["exit_plan"], str):
+            return False
+        exit_plan = eval(trade["exit_plan"])
+        for ii in range(1, self.max_stc_orders):
+            STC = f"STC{ii}"
+            if trade[STC+"-Status"] in ["FILLED", "EXECUTED"]:
                 continue
-            
-            # check if inverse TSbuy stop has reached or update stop
-            if trade["BTO-Status"] == "invTSbuy":
-                self.order_update_rate = 1       
-                ts_const, max_price = trade["open_trailingstop"].split(",")
-                max_price = eval(max_price.split(":")[1])
-                ts_const = eval(ts_const.split(":")[1])
-                stp_price = max_price - ts_const
-                quote_opt = self.price_now(trade['Symbol'], "STC", 1)
-                if quote_opt == -1:
+            PT = exit_plan.get(f"PT{ii}")
+            if pd.isnull(trade[STC+"-ordID"]):
+                if trade["Type"] == "BTO" and exit_plan.get("SL") is not None:
+                    return True
+            elif isinstance(PT, str) and "TS" in PT:
+                return True
+        return False
+
+    def update_orders(self):
+        "Update open trades, one owner command per trade so queued alerts run in between"
+        snapshots = self.call(self.fetch_snapshots)
+        try:
+            self.update_open_trades(snapshots)
+        finally:
+            self.call(self.clear_snapshots)
+
+    def fetch_snapshots(self):
+        "Orders status and quotes asked once for all trades, returned for the running update only"
+        self.fetch_orders_info()
+        self.fetch_quotes()
+        snapshots = (self.orders_snapshot, self.quotes_snapshot)
+        self.clear_snapshots()
+        return snapshots
+
+    def clear_snapshots(self):
+        "Alerts between trade updates ask fresh quotes, and orders status unless it is streamed"
+        if self.order_reconcile_rate is None:
+            self.orders_snapshot = None
+        self.quotes_snapshot = None
+
+    def on_order_event(self, order_id, order_status=None):
+        "Order update pushed by the brokerage (fill, partial fill, cancel), updates its trade right away"
+        return self.submit(self.update_order_trade, order_key(order_id))
+
+    def update_order_trade(self, order_id):
+        "Update the open trade with order_id as BTO, avg or STC order"
+        # pushed order changed, ask its status again
+        self.orders_info.pop(order_id, None)
+        if self.orders_snapshot is not None:
+            self.orders_snapshot.pop(order_id, None)
+        for i in sorted(self.open_trades):
+            trade = self.portfolio.loc[i]
+            ord_ids = [trade["ordID"]] + [trade[f"STC{j}-ordID"] for j in range(1, self.max_stc_orders)]
+            for ord_id in ord_ids:
+                if pd.isnull(ord_id):
                     continue
-                if quote_opt <= stp_price*1.01: # 1%
-                    if pd.isna(trade['trader_qty']):
-                        qty = 1 
-                    else:
-                        qty = int(trade['trader_qty'])
-                    order = {"Symbol": trade['Symbol'],
-                            "action": "BTO",
-                            "asset": trade['Asset'],
-                            "price": quote_opt,
-                            "Qty": qty,
-                            }
-                    order = self.round_order_price(order, trade)
-                    pars = f"BTO {trade['trader_qty']} {trade['Symbol']} @{order['price']}"
-                    order_response, order_id, order, _ = self.confirm_and_send(order, pars, self.bksession.make_BTO_lim_order)
-                    
-                    if order_response is None:  # trade not successful 
-                        str_msg = "BTO after invTS did not go through, order response is none. Will try again next update. Trigger an STC to cancel it"
-                        print(Back.GREEN + str_msg)
-                        self.queue_prints.put([str_msg, "", "green"])
-                        return
-                    order_status, order_info = self.get_order_info(order_id)                    
-                    self.portfolio.loc[i, "Qty"] = order_info['quantity']
-                    self.portfolio.loc[i, "filledQty"] = order_info['filledQuantity']
-                    self.portfolio.loc[i, "BTO-Status"] = order_info['status']
-                    self.portfolio.loc[i, "Price"] = order_info.get("price")
-                    self.portfolio.loc[i, "trader_qty"] = order_info.get("trader_qty")
-                    self.portfolio.loc[i, "ordID"] = order_id
-                    self.order_update_rate = 5
-                else:
-                    if quote_opt > max_price:
-                        max_price = quote_opt
-                        self.portfolio.loc[i, "open_trailingstop"] = f"ts:{ts_const},max_price:{max_price}"
-                        self.portfolio.loc[i, "Price"] = stp_price
-                self.save_logs("port")
-                continue
+                if order_id in [order_key(o.strip()).removesuffix(".0") for o in str(ord_id).split(",")]:
+                    try:
+                        self.update_trade(i)
+                    finally:
+                        self.save_logs("port", rows=[i])
+                    return i
+
+    def update_open_trades(self, snapshots=(None, None)):
+        # only open trades, closed ones are not updated
+        updated = []
+        try:
+            for i in self.call(sorted, self.open_trades):
+                updated.append(i)
+                if self.call(self.update_open_trade, i, snapshots) is False:
+                    # stop, but keep changes of the trades already updated
+                    break
+        finally:
+            self.call(self.save_logs, "port", updated)
+
+    def update_open_trade(self, i, snapshots):
+        "Update trade i with the orders status and quotes of the running update, skipped if closed meanwhile"
+        if i not in self.open_trades:
+            return
+        orders_snapshot, self.quotes_snapshot = snapshots
+        if self.order_reconcile_rate is None:
+            self.orders_snapshot = orders_snapshot
+        try:
+            return self.update_trade(i)
+        finally:
+            self.clear_snapshots()
+
+    def update_trade(self, i):
+        "Check orders of open trade i and make exit orders, returns False if the update has to stop"
+        self.close_expired(i)
+        trade = self.portfolio.loc[i]
+        redo_orders = False
+
+        if trade["isOpen"] == 0:
+            return
             
-            if trade["BTO-Status"] not in ['FILLED', "CANCELED", "REJECTED"]:
-                # if str and has comma, take first
-                if isinstance(trade['ordID'], str):
-                    ordID = trade['ordID'].split(",")[0]
+        # check if inverse TSbuy stop has reached or update stop
+        if trade["BTO-Status"] == "invTSbuy":
+            self.order_update_rate = 1       
+            ts_const, max_price = trade["open_trailingstop"].split(",")
+            max_price = eval(max_price.split(":")[1])
+            ts_const = eval(ts_const.split(":")[1])
+            stp_price = max_price - ts_const
+            quote_opt = self.price_now(trade['Symbol'], "STC", 1)
+            if quote_opt == -1:
+                return
+            if quote_opt <= stp_price*1.01: # 1%
+                if pd.isna(trade['trader_qty']):
+                    qty = 1 
                 else:
-                    ordID = trade['ordID']
-                order_status, order_info = self.get_order_info(ordID)
-                if order_status is None:
-                    print(Back.GREEN + f"Order info not found for {trade['Symbol']} ordid {ordID}")
-                    continue
-                
-                if order_status == "REJECTED":
-                    self.portfolio.loc[i, "BTO-Status"] = order_status
-                    self.portfolio.loc[i, 'isOpen'] = 0
+                    qty = int(trade['trader_qty'])
+                order = {"Symbol": trade['Symbol'],
+                        "action": "BTO",
+                        "asset": trade['Asset'],
+                        "price": quote_opt,
+                        "Qty": qty,
+                        }
+                order = self.round_order_price(order, trade)
+                pars = f"BTO {trade['trader_qty']} {trade['Symbol']} @{order['price']}"
+                order_response, order_id, order, _ = self.confirm_and_send(order, pars, self.bksession.make_BTO_lim_order)
                     
-                    str_msg = f"BTO {self.portfolio.loc[i, 'Symbol']} Status: {order_status}"
+                if order_response is None:  # trade not successful 
+                    str_msg = "BTO after invTS did not go through, order response is none. Will try again next update. Trigger an STC to cancel it"
                     print(Back.GREEN + str_msg)
                     self.queue_prints.put([str_msg, "", "green"])
-                    continue
-                elif order_status == "MISSING":
-                    self.portfolio.loc[i, "BTO-Status"] = order_status
-                    self.portfolio.loc[i, 'isOpen'] = 0
-                    str_msg = f"BTO {trade['Symbol']} order ID not found, probably canceled"
-                    print(Back.GREEN + str_msg)
-                    self.queue_prints.put([str_msg, "", "green"])
-                    continue
-                # Check if number filled Qty changed
-                qty_fill = order_info['filledQuantity']
-                qty_fill_old = self.portfolio.loc[i, "filledQty"]
-                # If so, redo orders
-                if not (pd.isnull(qty_fill_old) or qty_fill_old == 0) and \
-                    qty_fill_old != qty_fill:
-                    redo_orders = True
+                    return False
+                order_status, order_info = self.get_order_info(order_id)                    
+                self.portfolio.loc[i, "Qty"] = order_info['quantity']
+                self.portfolio.loc[i, "filledQty"] = order_info['filledQuantity']
+                self.portfolio.loc[i, "BTO-Status"] = order_info['status']
+                self.portfolio.loc[i, "Price"] = order_info.get("price")
+                self.portfolio.loc[i, "trader_qty"] = order_info.get("trader_qty")
+                self.portfolio.loc[i, "ordID"] = order_id
+                self.order_update_rate = 5
+            else:
+                if quote_opt > max_price:
+                    max_price = quote_opt
+                    self.portfolio.loc[i, "open_trailingstop"] = f"ts:{ts_const},max_price:{max_price}"
+                    self.portfolio.loc[i, "Price"] = stp_price
+            self.save_logs("port", rows=[i])
+            return
+            
+        if trade["BTO-Status"] not in ['FILLED', "CANCELED", "REJECTED"]:
+            # if str and has comma, take first
+            if isinstance(trade['ordID'], str):
+                ordID = trade['ordID'].split(",")[0]
+            else:
+                ordID = trade['ordID']
+            order_status, order_info = self.get_order_info(ordID)
+            if order_status is None:
+                print(Back.GREEN + f"Order info not found for {trade['Symbol']} ordid {ordID}")
+                return
                 
-                if order_status in ["FILLED", "EXECUTED"]:
-                    price = order_info.get("price")
-                    self.portfolio.loc[i, "Price"] = price
-                    self.disc_notifier(order_info)
-                    str_msg = f"ENTERED {order_info['orderLegCollection'][0]['instrument']['symbol']} filled @ {price}. Status: {order_status}"
-                    print(Back.GREEN + str_msg)
-                    self.queue_prints.put([str_msg, "", "green"])
+            if order_status == "REJECTED":
+                self.portfolio.loc[i, "BTO-Status"] = order_status
+                self.close_trade(i)
                     
-                    # Add default short exits, once filled and price is known
-                    if self.portfolio.loc[i, "Type"] == "STO":
-                        exit_plan = eval(self.portfolio.loc[i,"exit_plan"])
-                        if len(self.cfg['shorting']['BTC_PT']) and exit_plan.get("PT1") is None:
-                            exit_plan['PT1'] = round(price * (1 - float(self.cfg['shorting']['BTC_PT'])/100),2)
-                        if len(self.cfg['shorting']['BTC_SL']) and exit_plan.get("SL") is None:
-                            exit_plan['SL'] = round(price * (1 + float(self.cfg['shorting']['BTC_SL'])/100),2)
-                        self.portfolio.loc[i,"exit_plan"]= str(exit_plan)
+                str_msg = f"BTO {self.portfolio.loc[i, 'Symbol']} Status: {order_status}"
+                print(Back.GREEN + str_msg)
+                self.queue_prints.put([str_msg, "", "green"])
+                return
+            elif order_status == "MISSING":
+                self.portfolio.loc[i, "BTO-Status"] = order_status
+                self.close_trade(i)
+                str_msg = f"BTO {trade['Symbol']} order ID not found, probably canceled"
+                print(Back.GREEN + str_msg)
+                self.queue_prints.put([str_msg, "", "green"])
+                return
+            # Check if number filled Qty changed
+            qty_fill = order_info['filledQuantity']
+            qty_fill_old = self.portfolio.loc[i, "filledQty"]
+            # If so, redo orders
+            if not (pd.isnull(qty_fill_old) or qty_fill_old == 0) and \
+                qty_fill_old != qty_fill:
+                redo_orders = True
+                
+            if order_status in ["FILLED", "EXECUTED"]:
+                price = order_info.get("price")
+                self.portfolio.loc[i, "Price"] = price
+                self.disc_notifier(order_info)
+                str_msg = f"ENTERED {order_info['orderLegCollection'][0]['instrument']['symbol']} filled @ {price}. Status: {order_status}"
+                print(Back.GREEN + str_msg)
+                self.queue_prints.put([str_msg, "", "green"])
                     
-                    # Update exits from % to value
-                    self.portfolio.loc[i, "BTO-Status"] = order_info['status']
-                    self.exit_percent_to_price(i)
+                # Add default short exits, once filled and price is known
+                if self.portfolio.loc[i, "Type"] == "STO":
+                    exit_plan = eval(self.portfolio.loc[i,"exit_plan"])
+                    if len(self.cfg['shorting']['BTC_PT']) and exit_plan.get("PT1") is None:
+                        exit_plan['PT1'] = round(price * (1 - float(self.cfg['shorting']['BTC_PT'])/100),2)
+                    if len(self.cfg['shorting']['BTC_SL']) and exit_plan.get("SL") is None:
+                        exit_plan['SL'] = round(price * (1 + float(self.cfg['shorting']['BTC_SL'])/100),2)
+                    self.portfolio.loc[i,"exit_plan"]= str(exit_plan)
+                    
+                # Update exits from % to value
+                self.portfolio.loc[i, "BTO-Status"] = order_info['status']
+                self.exit_percent_to_price(i)
                 
-                self.portfolio.loc[i, "filledQty"] = order_info['filledQuantity']
+            self.portfolio.loc[i, "filledQty"] = order_info['filledQuantity']
                 
-                if order_status == 'REJECTED':
-                    self.portfolio.loc[i, 'isOpen'] = 0
-                    str_msg = f"BTO {order_info['orderLegCollection'][0]['instrument']['symbol']} Status: {order_status}"
-                    print(Back.GREEN + str_msg)
-                    self.queue_prints.put([str_msg, "", "green"])
-                elif order_status in ["QUEUED", "WORKING", 'OPEN', 'AWAITING_CONDITION', 'PENDING_ACTIVATION', 'AWAITING_MANUAL_REVIEW', "PARTIAL"] \
-                    and self.portfolio.loc[i,'Type'] == 'BTO':
-                    # see if too much time has passed
-                    bot_time = datetime.strptime(self.portfolio.loc[i, 'Date'], '%Y-%m-%d %H:%M:%S.%f')
-                    time_difference = (datetime.now() - bot_time).total_seconds()
-                    if cfg['order_configs']['kill_if_nofill'] not in ['0', '']:
-                        max_time = int(cfg['order_configs']['kill_if_nofill'])
-                        if time_difference > max_time:
-                            order_status = self.bksession.cancel_order(order_info['order_id'])
-                            str_msg = f"Killing order after not filling in {max_time} secs [{time_difference}] {order_info['orderLegCollection'][0]['instrument']['symbol']} Status: {order_status}"
-                            print(Back.GREEN + str_msg)
-                            self.queue_prints.put([str_msg, "", "green"])
-                trade = self.portfolio.iloc[i]
-                self.save_logs("port")
+            if order_status == 'REJECTED':
+                self.close_trade(i)
+                str_msg = f"BTO {order_info['orderLegCollection'][0]['instrument']['symbol']} Status: {order_status}"
+                print(Back.GREEN + str_msg)
+                self.queue_prints.put([str_msg, "", "green"])
+            elif order_status in ["QUEUED", "WORKING", 'OPEN', 'AWAITING_CONDITION', 'PENDING_ACTIVATION', 'AWAITING_MANUAL_REVIEW', "PARTIAL"] \
+                and self.portfolio.loc[i,'Type'] == 'BTO':
+                # see if too much time has passed
+                bot_time = datetime.strptime(self.portfolio.loc[i, 'Date'], '%Y-%m-%d %H:%M:%S.%f')
+                time_difference = (datetime.now() - bot_time).total_seconds()
+                if cfg['order_configs']['kill_if_nofill'] not in ['0', '']:
+                    max_time = int(cfg['order_configs']['kill_if_nofill'])
+                    if time_difference > max_time:
+                        order_status = self.cancel_order(order_info['order_id'])
+                        str_msg = f"Killing order after not filling in {max_time} secs [{time_difference}] {order_info['orderLegCollection'][0]['instrument']['symbol']} Status: {order_status}"
+                        print(Back.GREEN + str_msg)
+                        self.queue_prints.put([str_msg, "", "green"])
+            trade = self.portfolio.loc[i]
+            self.save_logs("port", rows=[i])
 
-            if pd.isnull(trade["filledQty"]) or trade["filledQty"] == 0:
-                continue
+        if pd.isnull(trade["filledQty"]) or trade["filledQty"] == 0:
+            return
 
-            if not pd.isnull(trade.get("BTO-avg-Status")) and trade.get("BTO-avg-Status") not in ['FILLED', "CANCELED", "REJECTED", "MISSING"]:
-                if isinstance(trade['ordID'], str):
-                    ordID = trade['ordID'].split(",")[-1]
-                else:
-                    ordID = trade['ordID']
-                order_status, order_info = self.get_order_info(ordID)
-                if order_info is None:
-                    continue
-                if order_status == "MISSING":
-                    self.portfolio.loc[i, "BTO-avg-Status"] = "MISSING"
-                    str_msg = f"BTO-avg {trade['Symbol']} order ID not found, probably canceled"
-                    print(Back.GREEN + str_msg)
-                    self.queue_prints.put([str_msg, "", "green"])
-                    continue
+        if not pd.isnull(trade.get("BTO-avg-Status")) and trade.get("BTO-avg-Status") not in ['FILLED', "CANCELED", "REJECTED", "MISSING"]:
+            if isinstance(trade['ordID'], str):
+                ordID = trade['ordID'].split(",")[-1]
+            else:
+                ordID = trade['ordID']
+            order_status, order_info = self.get_order_info(ordID)
+            if order_info is None:
+                return
+            if order_status == "MISSING":
+                self.portfolio.loc[i, "BTO-avg-Status"] = "MISSING"
+                str_msg = f"BTO-avg {trade['Symbol']} order ID not found, probably canceled"
+                print(Back.GREEN + str_msg)
+                self.queue_prints.put([str_msg, "", "green"])
+                return
                 
-                if order_info['status'] in ["FILLED", "EXECUTED"]:
+            if order_info['status'] in ["FILLED", "EXECUTED"]:
                     
-                    or_price = self.portfolio.loc[i,"Price"]*self.portfolio.loc[i, "filledQty"]
-                    nw_price = order_info['price']*order_info['filledQuantity']
-                    avg_price = round((or_price + nw_price)/(self.portfolio.loc[i, "filledQty"] + order_info['filledQuantity']),2)
-                    self.portfolio.loc[i, "Price"] = avg_price
-
-                    self.portfolio.loc[i, "filledQty"] += order_info['filledQuantity']
-                    self.disc_notifier(order_info)
-                    self.close_open_exit_orders(i)
+                or_price = self.portfolio.loc[i,"Price"]*self.portfolio.loc[i, "filledQty"]
+                nw_price = order_info['price']*order_info['filledQuantity']
+                avg_price = round((or_price + nw_price)/(self.portfolio.loc[i, "filledQty"] + order_info['filledQuantity']),2)
+                self.portfolio.loc[i, "Price"] = avg_price
+
+                self.portfolio.loc[i, "filledQty"] += order_info['filledQuantity']
+                self.disc_notifier(order_info)
+                self.close_open_exit_orders(i)
                 
-                    self.portfolio.loc[i, "BTO-avg-Status"] = order_info['status']
+                self.portfolio.loc[i, "BTO-avg-Status"] = order_info['status']
                     
-                    redo_orders = True
-                    trade = self.portfolio.iloc[i]
-                    self.save_logs("port")
+                redo_orders = True
+                trade = self.portfolio.loc[i]
+                self.save_logs("port", rows=[i])
                     
-                    str_msg = f"BTO-avg {order_info['orderLegCollection'][0]['instrument']['symbol']} executed @ {order_info['price']}. Status: {order_status}"
-                    print(Back.GREEN + str_msg)
-                    self.queue_prints.put([str_msg, "", "green"])
-                    self.disc_notifier(order_info)
+                str_msg = f"BTO-avg {order_info['orderLegCollection'][0]['instrument']['symbol']} executed @ {order_info['price']}. Status: {order_status}"
+                print(Back.GREEN + str_msg)
+                self.queue_prints.put([str_msg, "", "green"])
+                self.disc_notifier(order_info)
                     
-                    # Update exits from % to value
-                    self.exit_percent_to_price(i)
-
-            # For shorting positions if closing end of day           
-            if trade['Type'] == 'STO' and self.cfg['shorting'].getboolean("BTC_EOD"):
-                time_now = datetime.now().time()
-                time_closed = datetime.strptime(self.cfg['general']["off_hours"].split(",")[0], "%H")
-                time_quarter = time_closed - timedelta(minutes=15)
-                time_five = time_closed - timedelta(minutes=5)
-                # Change exits before 15 min to close
-                if time_now >= time_quarter.time() and time_now < time_five.time() and \
-                    len(self.cfg['shorting']['BTC_EOD_PT_SL']):
-                        exit_plan = eval(trade["exit_plan"])                        
-                        PT, SL = self.cfg['shorting']['BTC_EOD_PT_SL'].split(",")
-                        SL, PT = eval(SL)/100, eval(PT)/100
+                # Update exits from % to value
+                self.exit_percent_to_price(i)
+
+        # For shorting positions if closing end of day           
+        if trade['Type'] == 'STO' and self.cfg['shorting'].getboolean("BTC_EOD"):
+            time_now = datetime.now().time()
+            time_closed = datetime.strptime(self.cfg['general']["off_hours"].split(",")[0], "%H")
+            time_quarter = time_closed - timedelta(minutes=15)
+            time_five = time_closed - timedelta(minutes=5)
+            # Change exits before 15 min to close
+            if time_now >= time_quarter.time() and time_now < time_five.time() and \
+                len(self.cfg['shorting']['BTC_EOD_PT_SL']):
+                    exit_plan = eval(trade["exit_plan"])                        
+                    PT, SL = self.cfg['shorting']['BTC_EOD_PT_SL'].split(",")
+                    SL, PT = eval(SL)/100, eval(PT)/100
                         
-                        if self.EOD.get(trade["Symbol"]) != "15min":
-                            # Close and send lim order
-                            self.close_open_exit_orders(i) 
-                            quote = self.price_now(trade["Symbol"], "BTC", 1)
-                            # get the STC number to save PT
-                            STC = f"STC{self.max_stc_orders-1}"
-                            for ith in range(1,self.max_stc_orders):
-                                STC = f"STC{ith}"
-                                if pd.isnull(trade[STC+"-ordID"]):
-                                    break
-                            exit_plan = {"PT1": None, "PT2": None,"PT3": None,"SL": round(quote + SL * quote, 2)}
-                            exit_plan[f"PT{ith}"] = round(quote - PT * quote, 2)
+                    if self.EOD.get(trade["Symbol"]) != "15min":
+                        # Close and send lim order
+                        self.close_open_exit_orders(i) 
+                        quote = self.price_now(trade["Symbol"], "BTC", 1)
+                        # get the STC number to save PT
+                        STC = f"STC{self.max_stc_orders-1}"
+                        for ith in range(1,self.max_stc_orders):
+                            STC = f"STC{ith}"
+                            if pd.isnull(trade[STC+"-ordID"]):
+                                break
+                        exit_plan = {"PT1": None, "PT2": None,"PT3": None,"SL": round(quote + SL * quote, 2)}
+                        exit_plan[f"PT{ith}"] = round(quote - PT * quote, 2)
                             
-                            self.portfolio.at[i,'exit_plan'] = str(exit_plan)
-                            redo_orders = True
-                            self.exit_percent_to_price(i)
-                            str_msg = f'updating exits option {trade["Symbol"]} 15 min before EOD with {int(SL*100)}% SL and {int(PT*100)}% PT'
-                            print(Back.GREEN + str_msg)
-                            self.queue_prints.put([str_msg, "", "green"])
-                            self.EOD[trade["Symbol"]] = "15min"
+                        self.portfolio.at[i,'exit_plan'] = str(exit_plan)
+                        redo_orders = True
+                        self.exit_percent_to_price(i)
+                        str_msg = f'updating exits option {trade["Symbol"]} 15 min before EOD with {int(SL*100)}% SL and {int(PT*100)}% PT'
+                        print(Back.GREEN + str_msg)
+                        self.queue_prints.put([str_msg, "", "green"])
+                        self.EOD[trade["Symbol"]] = "15min"
                     
-                # Close position 5 min to close
-                elif time_now >= time_five.time() and time_now < time_closed.time() \
-                    and self.EOD.get(trade["Symbol"]) != "5min":
-                    print(f'closing option {trade["Symbol"]} 5 min before EOD')
-                    quote = self.price_now(trade["Symbol"], "BTC", 1)
+            # Close position 5 min to close
+            elif time_now >= time_five.time() and time_now < time_closed.time() \
+                and self.EOD.get(trade["Symbol"]) != "5min":
+                print(f'closing option {trade["Symbol"]} 5 min before EOD')
+                quote = self.price_now(trade["Symbol"], "BTC", 1)
                     
-                    # Close and send lim order
-                    self.close_open_exit_orders(i)       
-                    order = {}
-                    order['action'] = "BTC"
-                    order['Symbol'] = trade["Symbol"]
-                    qty_sold = np.nansum([trade[f"STC{i}-Qty"] for i in range(1,self.max_stc_orders)])
-                    order['Qty'] =  int(int(trade["filledQty"]) - qty_sold)
-                    order['price'] = quote
-                    self.update_paused = True
-                    _, order_id, order, _ = self.confirm_and_send(order, f'EOD {order["Symbol"]}', self.bksession.make_STC_lim)
+                # Close and send lim order
+                self.close_open_exit_orders(i)       
+                order = {}
+                order['action'] = "BTC"
+                order['Symbol'] = trade["Symbol"]
+                qty_sold = np.nansum([trade[f"STC{i}-Qty"] for i in range(1,self.max_stc_orders)])
+                order['Qty'] =  int(int(trade["filledQty"]) - qty_sold)
+                order['price'] = quote
+                _, order_id, order, _ = self.confirm_and_send(order, f'EOD {order["Symbol"]}', self.bksession.make_STC_lim)
                     
-                    # add order id
-                    for ith in range(1,self.max_stc_orders):
-                        STC = f"STC{ith}"
-                        if pd.isnull(trade[STC+"-ordID"]):
-                            break
-                    self.portfolio.loc[i, STC + "-ordID"] =  order_id
-                    self.EOD[trade["Symbol"]] = "5min"
-                    self.save_logs("port")
-                    self.update_paused = False
-            if self.update_paused:
-                return
-            if trade['Type'] == 'STO' and (cfg['shorting']['avg_down'] is not None or
-                                           (not pd.isna(trade.get('avg_down')) and 
-                                           not pd.isna(eval(trade['avg_down']).get('avgs')))):
+                # add order id
+                for ith in range(1,self.max_stc_orders):
+                    STC = f"STC{ith}"
+                    if pd.isnull(trade[STC+"-ordID"]):
+                        break
+                self.portfolio.loc[i, STC + "-ordID"] =  order_id
+                self.EOD[trade["Symbol"]] = "5min"
+                self.save_logs("port", rows=[i])
+        if trade['Type'] == 'STO' and (cfg['shorting']['avg_down'] is not None or
+                                       (not pd.isna(trade.get('avg_down')) and 
+                                       not pd.isna(eval(trade['avg_down']).get('avgs')))):
                 
-                price_currernt = self.price_now(trade['Symbol'], "STO", 1)
-                avg_down = {}
-                if not pd.isna(trade.get('avg_down')):
-                    avg_down = eval(trade['avg_down'])
+            price_currernt = self.price_now(trade['Symbol'], "STO", 1)
+            avg_down = {}
+            if not pd.isna(trade.get('avg_down')):
+                avg_down = eval(trade['avg_down'])
                     
-                avg_down_list = eval(cfg['shorting']['avg_down'])
-                if not pd.isna(avg_down.get('avgs')):                    
-                    avg_down_list = avg_down.get('avgs')
+            avg_down_list = eval(cfg['shorting']['avg_down'])
+            if not pd.isna(avg_down.get('avgs')):                    
+                avg_down_list = avg_down.get('avgs')
                 
-                for avg in avg_down_list:
-                    avg_rat, avg_ratio = avg
-                    if avg_down.get(str(avg_rat)) == 'sent':
-                        continue
-                    price_ori = trade.get('original_price')
-                    price_ori = price_ori if not pd.isna(price_ori)  else trade['Price']
-                    qty_ori = trade.get('original_qty')
-                    qty_ori = qty_ori if not pd.isna(qty_ori) else trade['Qty']
-                    avg_price = price_ori*avg_rat
-                    if avg_price < price_currernt and avg_down.get(str(avg_rat)) is None:
-                        if self.update_paused:
-                            return
-                        order = {}
-                        order['action'] = "STO"
-                        order['Symbol'] = trade["Symbol"]                        
-                        order['Qty'] =  max(1, int(qty_ori*avg_ratio))
-                        order['price'] = price_currernt
-                        order_response, order_id = self.bksession.send_order(self.bksession.make_BTO_lim_order(**order))
-                        order_status, order_info = self.get_order_info(order_id)
+            for avg in avg_down_list:
+                avg_rat, avg_ratio = avg
+                if avg_down.get(str(avg_rat)) == 'sent':
+                    continue
+                price_ori = trade.get('original_price')
+                price_ori = price_ori if not pd.isna(price_ori)  else trade['Price']
+                qty_ori = trade.get('original_qty')
+                qty_ori = qty_ori if not pd.isna(qty_ori) else trade['Qty']
+                avg_price = price_ori*avg_rat
+                if avg_price < price_currernt and avg_down.get(str(avg_rat)) is None:
+                    order = {}
+                    order['action'] = "STO"
+                    order['Symbol'] = trade["Symbol"]                        
+                    order['Qty'] =  max(1, int(qty_ori*avg_ratio))
+                    order['price'] = price_currernt
+                    order_response, order_id = self.bksession.send_order(self.bksession.make_BTO_lim_order(**order))
+                    order_status, order_info = self.get_order_info(order_id)
                         
-                        if order_response is None:  # Assume trade not accepted                           
-                            print(Back.GREEN + "BTO avg not accepted by user")
-                            self.queue_prints.put(["BTO avg not accepted by user", "", "green"])
-                            continue
-                        elif order_status == "REJECTED":
-                            print(Back.GREEN + f"STO avg down {trade['Symbol']} Status: {order_status}")
-                            self.queue_prints.put([f"STO avg down {trade['Symbol']} Status: {order_status}", "", "green"])
-                            continue
+                    if order_response is None:  # Assume trade not accepted                           
+                        print(Back.GREEN + "BTO avg not accepted by user")
+                        self.queue_prints.put(["BTO avg not accepted by user", "", "green"])
+                        continue
+                    elif order_status == "REJECTED":
+                        print(Back.GREEN + f"STO avg down {trade['Symbol']} Status: {order_status}")
+                        self.queue_prints.put([f"STO avg down {trade['Symbol']} Status: {order_status}", "", "green"])
+                        continue
                         
-                        self.portfolio.loc[i,'BTO-avg-Status'] = order_status
-                        # if np.integer or int, turn to str
-                        if isinstance(self.portfolio.loc[i,"ordID"], (np.integer, float)):
-                            self.portfolio.loc[i,"ordID"] = str(self.portfolio.loc[i,"ordID"])                
-                        self.portfolio.loc[i,"ordID"] += f',{order_id}'
-
-                        if pd.isnull(self.portfolio.loc[i, "Avged"]):
-                            self.portfolio.loc[i, "Avged"] = 1
-                            self.portfolio.loc[i, "Avged-prices-alert"] = order['price']
-                            self.portfolio.loc[i, "Avged-prices"] = order_info["price"]
-                            self.portfolio.loc[i, "Avged-Qty"] = order_info['quantity']
-                        else:
-                            self.portfolio.loc[i, "Avged"] += 1
-                            al_pr = self.portfolio.loc[i, "Avged-prices-alert"]
-                            av_pr = self.portfolio.loc[i, "Avged-prices"]
-                            av_qt = self.portfolio.loc[i, "Avged-Qty"]
-                            self.portfolio.loc[i, "Avged-prices-alert"] = f"{al_pr},{order['price']}"
-                            self.portfolio.loc[i, "Avged-prices"] = f"{av_pr},{order_info['price']}"
-                            self.portfolio.loc[i, "Avged-Qty"] = f"{av_qt},{order_info['quantity']}"
-
-                        avg = self.portfolio.loc[i, "Avged"]
-
-                        self.portfolio.loc[i, "Qty"] += order_info['quantity']
-                        if  order_status in ["FILLED", "EXECUTED"]:
-                            or_price = self.portfolio.loc[i,"Price"]*self.portfolio.loc[i, "filledQty"]
-                            nw_price = order_info['price']*order_info['filledQuantity']
-                            avg_price = round((or_price + nw_price)/(self.portfolio.loc[i, "filledQty"] + order_info['filledQuantity']),2)
-                            self.portfolio.loc[i, "Price"] = avg_price
-
-                            self.portfolio.loc[i, "filledQty"] += order_info['filledQuantity']
-                            self.disc_notifier(order_info)
-                            self.close_open_exit_orders(i)
-                        str_msg =  f"BTO {avg} th AVG DOWN, {order['Symbol']} sent @{order_info['price']}. Status: {order_status}"
-                        print(Back.GREEN + str_msg)
-                        self.queue_prints.put([str_msg, "", "green"])
+                    self.portfolio.loc[i,'BTO-avg-Status'] = order_status
+                    # if np.integer or int, turn to str
+                    if isinstance(self.portfolio.loc[i,"ordID"], (np.integer, float)):
+                        self.portfolio.loc[i,"ordID"] = str(self.portfolio.loc[i,"ordID"])                
+                    self.portfolio.loc[i,"ordID"] += f',{order_id}'
+
+                    if pd.isnull(self.portfolio.loc[i, "Avged"]):
+                        self.portfolio.loc[i, "Avged"] = 1
+                        self.portfolio.loc[i, "Avged-prices-alert"] = order['price']
+                        self.portfolio.loc[i, "Avged-prices"] = order_info["price"]
+                        self.portfolio.loc[i, "Avged-Qty"] = order_info['quantity']
+                    else:
+                        self.portfolio.loc[i, "Avged"] += 1
+                        al_pr = self.portfolio.loc[i, "Avged-prices-alert"]
+                        av_pr = self.portfolio.loc[i, "Avged-prices"]
+                        av_qt = self.portfolio.loc[i, "Avged-Qty"]
+                        self.portfolio.loc[i, "Avged-prices-alert"] = f"{al_pr},{order['price']}"
+                        self.portfolio.loc[i, "Avged-prices"] = f"{av_pr},{order_info['price']}"
+                        self.portfolio.loc[i, "Avged-Qty"] = f"{av_qt},{order_info['quantity']}"
+
+                    avg = self.portfolio.loc[i, "Avged"]
+
+                    self.portfolio.loc[i, "Qty"] += order_info['quantity']
+                    if  order_status in ["FILLED", "EXECUTED"]:
+                        or_price = self.portfolio.loc[i,"Price"]*self.portfolio.loc[i, "filledQty"]
+                        nw_price = order_info['price']*order_info['filledQuantity']
+                        avg_price = round((or_price + nw_price)/(self.portfolio.loc[i, "filledQty"] + order_info['filledQuantity']),2)
+                        self.portfolio.loc[i, "Price"] = avg_price
+
+                        self.portfolio.loc[i, "filledQty"] += order_info['filledQuantity']
+                        self.disc_notifier(order_info)
+                        self.close_open_exit_orders(i)
+                    str_msg =  f"BTO {avg} th AVG DOWN, {order['Symbol']} sent @{order_info['price']}. Status: {order_status}"
+                    print(Back.GREEN + str_msg)
+                    self.queue_prints.put([str_msg, "", "green"])
                         
-                        self.portfolio.loc[i,'BTO-avg-Status'] = order_status
+                    self.portfolio.loc[i,'BTO-avg-Status'] = order_status
             
-                        avg_down[str(avg_rat)] = 'sent'
-                        self.portfolio.loc[i, "avg_down"] =  str(avg_down)
+                    avg_down[str(avg_rat)] = 'sent'
+                    self.portfolio.loc[i, "avg_down"] =  str(avg_down)
 
                     
-            if redo_orders:
-                self.close_open_exit_orders(i)
+        if redo_orders:
+            self.close_open_exit_orders(i)
+        self.exit_percent_to_price(i)
+        trade = self.portfolio.loc[i]
+        exit_plan = eval(trade["exit_plan"])
+        if exit_plan != {}:                
+            self.make_exit_orders(i, exit_plan)
             self.exit_percent_to_price(i)
-            trade = self.portfolio.iloc[i]
-            exit_plan = eval(trade["exit_plan"])
-            if exit_plan != {}:                
-                self.make_exit_orders(i, exit_plan)
-                self.exit_percent_to_price(i)
 
-            # Go over STC orders and check status
-            for ii in range(1, self.max_stc_orders):
-                if self.update_paused:
-                    return 
-                STC = f"STC{ii}"
-                trade = self.portfolio.iloc[i]
-                STC_ordID = trade.get(STC+"-ordID")
+        # Go over STC orders and check status
+        for ii in range(1, self.max_stc_orders):
+            STC = f"STC{ii}"
+            trade = self.portfolio.loc[i]
+            STC_ordID = trade.get(STC+"-ordID")
 
-                if pd.isnull(STC_ordID) or trade[STC+"-Status"] in ['FILLED', 'REJECTED']:
-                    continue
+            if pd.isnull(STC_ordID) or trade[STC+"-Status"] in ['FILLED', 'REJECTED']:
+                continue
 
-                # Get status exit orders
-                if isinstance(STC_ordID, str) and STC_ordID.isdigit():
-                    STC_ordID = int(float(STC_ordID))  # Might be read as a float
+            # Get status exit orders
+            if isinstance(STC_ordID, str) and STC_ordID.isdigit():
+                STC_ordID = int(float(STC_ordID))  # Might be read as a float
 
-                order_status, order_info =  self.get_order_info(STC_ordID)
-                if order_status is None:
-                    continue
+            order_status, order_info =  self.get_order_info(STC_ordID)
+            if order_status is None:
+                continue
 
-                if order_status == 'CANCELED' and self.bksession.name == 'tda' and \
-                    order_info['orderStrategyType'] == 'OCO':
-                    # Try next order number. OCO gets canceled when one of child ordergets filled.
-                    # This is for TDA OCO
-                    STC_ordID = int(STC_ordID)
-                    order_status, order_info =  self.get_order_info(int(STC_ordID) + 1)
+            if order_status == 'CANCELED' and self.bksession.name == 'tda' and \
+                order_info['orderStrategyType'] == 'OCO':
+                # Try next order number. OCO gets canceled when one of child ordergets filled.
+                # This is for TDA OCO
+                STC_ordID = int(STC_ordID)
+                order_status, order_info =  self.get_order_info(int(STC_ordID) + 1)
+                if order_status == 'FILLED':
+                    STC_ordID = STC_ordID + 1
+                    self.portfolio.loc[i, STC + "-ordID"] =  STC_ordID
+                else: # try the other one for tda
+                    order_status, order_info =  self.get_order_info(STC_ordID + 2)
                     if order_status == 'FILLED':
-                        STC_ordID = STC_ordID + 1
+                        STC_ordID = STC_ordID + 2
                         self.portfolio.loc[i, STC + "-ordID"] =  STC_ordID
-                    else: # try the other one for tda
-                        order_status, order_info =  self.get_order_info(STC_ordID + 2)
-                        if order_status == 'FILLED':
-                            STC_ordID = STC_ordID + 2
-                            self.portfolio.loc[i, STC + "-ordID"] =  STC_ordID
-
-                elif "PARTIAL" in order_status:
-                    # check if partial has changed since last time
-                    if order_info['filledQuantity'] == self.portfolio.loc[i, STC + "-Qty"]:
-                        continue
-                    # Update filled qty
-                    self.portfolio.loc[i, STC + "-Qty"] = order_info['filledQuantity']
-                    self.log_filled_STC(STC_ordID, i, STC)
-                    self.portfolio.loc[i, STC +"-xQty"] = np.nan
+
+            elif "PARTIAL" in order_status:
+                # check if partial has changed since last time
+                if order_info['filledQuantity'] == self.portfolio.loc[i, STC + "-Qty"]:
+                    continue
+                # Update filled qty
+                self.portfolio.loc[i, STC + "-Qty"] = order_info['filledQuantity']
+                self.log_filled_STC(STC_ordID, i, STC)
+                self.portfolio.loc[i, STC +"-xQty"] = np.nan
                 
-                self.portfolio.loc[i, STC+"-Status"] = order_status
-                trade = self.portfolio.iloc[i]
+            self.portfolio.loc[i, STC+"-Status"] = order_status
+            trade = self.portfolio.loc[i]
 
-                if order_status in ["FILLED", "EXECUTED"] and np.isnan(trade[STC+"-xQty"]):
-                    self.log_filled_STC(STC_ordID, i, STC)                    
-                    self.disc_notifier(order_info)
+            if order_status in ["FILLED", "EXECUTED"] and np.isnan(trade[STC+"-xQty"]):
+                self.log_filled_STC(STC_ordID, i, STC)                    
+                self.disc_notifier(order_info)
 
-        self.save_logs("port")
 
 
     def SL_below_market(self, order, new_SL_ratio=.95):
@@ -1603,7 +1881,7 @@ class AlertsTrader():
 
     def make_exit_orders(self, open_trade, exit_plan):
         i = open_trade
-        trade = self.portfolio.iloc[i]
+        trade = self.portfolio.loc[i]
 
         # Calculate x/Qty:
         Qty_bought = trade['filledQty']
@@ -1617,6 +1895,7 @@ class AlertsTrader():
 
         # Go over exit plans and make orders
         order = {'Symbol': trade['Symbol']}
+        new_exits = []  # (STC, order, brokerage order) of exit orders to send
         for ii in range(1, nPTs+1):
             STC = f"STC{ii}"           
 
@@ -1665,8 +1944,8 @@ class AlertsTrader():
                         print (Back.GREEN + str_prt)
                         self.queue_prints.put([str_prt,"", "green"])
                         self.portfolio.loc[i, STC+"-ordID"] = STC_ordID
-                        trade = self.portfolio.iloc[i]
-                        self.save_logs("port")
+                        trade = self.portfolio.loc[i]
+                        self.save_logs("port", rows=[open_trade])
                         self.order_update_rate = 5
                         
                 # Adjust if necessary Qty based on remaining shares
@@ -1704,7 +1983,7 @@ class AlertsTrader():
                     order['Qty'] = Qty[ii - 1]
                     order['xQty'] = xQty[ii - 1]
                     order['action'] = trade["Type"].replace("STO", "BTC").replace("BTO", "STC")
-                    if self.bksession.name not in ['tda', 'ts', 'cobra']:
+                    if self.bksession.name not in ['tda', 'ts', 'cobra', 'sim']:
                         str_prt = f"WARNING: {self.bksession.name} does not support OCO orders. Only the PT will be sent without SL. For OCO pass a PT as a string with 0%TS (e.g. 50%TS0%) and SL."            
                         print(Back.RED + str_prt)
                         self.queue_prints.put([str_prt,"", "red"])
@@ -1744,21 +2023,25 @@ class AlertsTrader():
 
                 if ord_func is not None and order['Qty'] > 0:
                     order = self.round_order_price(order, trade)
-                    _, STC_ordID = self.bksession.send_order(ord_func(**order))
-                    if STC_ordID is None:
-                        print('Sent order got None', order)
-                        continue
-                    if order.get("price"):
-                        str_prt = f"{STC} {order['Symbol']} @{order['price']}(Qty:{order['Qty']}) sent during order update"
-                    else:
-                        str_prt = f"{STC} {order['Symbol']} @PT:{order.get('PT')}/SL:{order.get('SL')} (Qty:{order['Qty']}) sent during order update"
-                    print (Back.GREEN + str_prt)
-                    self.queue_prints.put([str_prt,"", "green"])
-                    self.portfolio.loc[i, STC+"-ordID"] = STC_ordID
-                    trade = self.portfolio.iloc[i]
-                    self.save_logs("port")
+                    # sent together after the loop
+                    new_exits.append((STC, dict(order), ord_func(**order)))
                 else:
                     break
+        if len(new_exits):
+            sent = self.send_orders([bk_order for _, _, bk_order in new_exits])
+            for (STC, order, _), (_, STC_ordID) in zip(new_exits, sent):
+                if STC_ordID is None:
+                    print('Sent order got None', order)
+                    continue
+                if order.get("price"):
+                    str_prt = f"{STC} {order['Symbol']} @{order['price']}(Qty:{order['Qty']}) sent during order update"
+                else:
+                    str_prt = f"{STC} {order['Symbol']} @PT:{order.get('PT')}/SL:{order.get('SL')} (Qty:{order['Qty']}) sent during order update"
+                print (Back.GREEN + str_prt)
+                self.queue_prints.put([str_prt,"", "green"])
+                self.portfolio.loc[i, STC+"-ordID"] = STC_ordID
+            trade = self.portfolio.loc[i]
+            self.save_logs("port", rows=[open_trade])
         # no PTs but trailing stop
         if nPTs == 0 and exit_plan["SL"] is not None and pd.isnull(trade["STC1-ordID"]): 
             SL = exit_plan["SL"]
@@ -1786,8 +2069,8 @@ class AlertsTrader():
                 print(Back.GREEN + str_prt)
                 self.queue_prints.put([str_prt,"", "green"])
                 self.portfolio.loc[i, "STC1-ordID"] = STC_ordID
-                trade = self.portfolio.iloc[i]
-                self.save_logs("port")
+                trade = self.portfolio.loc[i]
+                self.save_logs("port", rows=[open_trade])
             except Exception as e:
                 str_prt = "error in making SL exit order "+ str(e)
                 print(Back.RED + str_prt)
@@ -1796,7 +2079,7 @@ class AlertsTrader():
 
     def close_expired(self, open_trade):
         i = open_trade
-        trade = self.portfolio.iloc[i]
+        trade = self.portfolio.loc[i]
         if trade["Asset"] != "option" or trade["isOpen"] == 0:
             return
         optdate = option_date(trade['Symbol'])
@@ -1826,7 +2109,7 @@ class AlertsTrader():
             self.portfolio.loc[open_trade, STC + "-xQty"] = 1
             self.portfolio.loc[open_trade, STC + "-Qty"] = trade['filledQty'] - usold
             self.portfolio.loc[open_trade, STC + "-PnL"] = pnl
-            self.portfolio.loc[open_trade, "isOpen"] = 0
+            self.close_trade(open_trade)
             
             bto_price = self.portfolio.loc[open_trade, "Price"]
             bto_price_alert = self.portfolio.loc[open_trade, "Price-alert"]
@@ -1854,7 +2137,7 @@ class AlertsTrader():
             str_prt = f"{trade['Symbol']} option expired -100% Qty: {trade['filledQty']}"
             print(Back.GREEN + str_prt)
             self.queue_prints.put([str_prt,"", "green"])
-            self.save_logs("port")
+            self.save_logs("port", rows=[open_trade])
 
     def calculate_stoploss(self, order, trade, SL:str):
         "Calculate stop loss price with increment, SL: e.g. '40%" 
@@ -1909,6 +2192,12 @@ class AlertsTrader():
             new_price = increment
         return new_price
     
+def order_key(order_id):
+    "Order id as str, ids read from csv can be floats"
+    if isinstance(order_id, float) and order_id.is_integer():
+        order_id = int(order_id)
+    return str(order_id)
+
 def option_date(opt_symbol):
     sym_inf = opt_symbol.split("_")[1]
     opt_date = re.split("C|P", sym_inf)[0]
@@ -54,12 +54,35 @@ class TDA(BaseBroker):
         order_status = 'REJECTED' | "FILLED" | "WORKING"
         """      
         order_info = self.session.get_orders(account=self.accountId, order_id=int(order_id))
+        return self.format_order(order_info)
+
+    def get_orders_info(self):
+        """Status and info of the account orders in one call, {str(order_id): (order_status, order_info)}
+        OCO orders are under the ids of the OCO and of its legs"""
+        orders_info = {}
+        orders = self.session.get_orders_query(account=self.accountId)
+        while len(orders):
+            order_info = orders.pop()
+            if order_info['orderStrategyType'] == "OCO":
+                info = self.format_order(order_info)
+                ord_ids = [order_info.get('orderId')] + [o.get('orderId') for o in order_info['childOrderStrategies']]
+                for ord_id in ord_ids:
+                    if ord_id is not None:
+                        orders_info[str(ord_id)] = info
+                continue
+            # trigger orders have their exits as children
+            orders.extend(order_info.get('childOrderStrategies', []))
+            orders_info[str(order_info['orderId'])] = self.format_order(order_info)
+        return orders_info
+
+    def format_order(self, order_info):
+        "Status and info of an order as returned by get_orders"
         if order_info['orderStrategyType'] == "OCO":
             order_status = [
                 order_info['childOrderStrategies'][0]['status'],
                 order_info['childOrderStrategies'][1]['status']]
             if not order_status[0]==order_status[1]:
-                print(f"OCO order status are different in ordID {order_id}: ",
+                print(f"OCO order status are different in ordID {order_info.get('orderId')}: ",
                       f"{order_status[0]} vs {order_status[1]}, will try to get the filled")
             # take the first one, if cancelled it will look for the filled later
             order_status = order_status[0] 
@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
 from ..configurator import cfg
 import time
+import asyncio
 import functools
+import threading
 
 def retry_on_exception(retries=2, do_raise=False, sleep=False):
     def decorator(func):
@@ -22,7 +24,47 @@ def retry_on_exception(retries=2, do_raise=False, sleep=False):
     return decorator
 
 
+class RequestBudget():
+    """Space out requests to at most `rate` per second, shared by threads
+
+    Call `wait` before each request, rate 0 for no limit
+    """
+    def __init__(self, rate):
+        self.interval = 1/rate if rate else 0
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# what an adapter does natively, advertised in its `capabilities`. The batch and since
+# methods are coroutines of AsyncBaseBroker, run with its `run`
+CAPABILITIES = {
+    "orders_info": "get_orders_info gets the status of all orders in one request",
+    "orders_since": "get_orders_since gets the orders placed or updated since a time in one request",
+    "batch_orders": "send_orders sends several orders at once",
+    "batch_cancel": "cancel_orders cancels several orders at once",
+    "stream_quotes": "stream() pushes quotes to quote_cache",
+    "stream_orders": "stream() pushes order updates to its order_callbacks",
+}
+
+
+def capabilities(bksession):
+    "Capabilities advertised by the brokerage adapter, see CAPABILITIES"
+    return getattr(bksession, "capabilities", frozenset())
+
+
 class BaseBroker(ABC):
+    capabilities = frozenset()
+
     @abstractmethod
     def __init__(self, api_key, secret_key, passphrase):
         pass
@@ -51,6 +93,84 @@ class BaseBroker(ABC):
     def get_order_info(self, order_id):
         pass
 
+    def get_orders_info(self):
+        """Status and info of all recent orders in one call, {str(order_id): (order_status, order_info)},
+        same format as get_order_info. None if not supported by the brokerage"""
+        return None
+
+
+class AsyncBaseBroker(ABC):
+    """Brokerage with async batch methods
+
+    Adapters implement the coroutines. The sync methods used by the trader
+    (get_quotes, send_order, cancel_order, get_order_info, get_orders_info) are
+    a shim running them in the adapter event loop, a daemon thread, so they can
+    be called from any thread. Quotes, orders info and orders have the same
+    format as in BaseBroker. Besides "orders_since", "batch_orders" and
+    "batch_cancel", the adapter can advertise other CAPABILITIES.
+    """
+    capabilities = frozenset(["orders_info", "orders_since", "batch_orders", "batch_cancel"])
+    _loop = None
+
+    @abstractmethod
+    def get_session(self):
+        pass
+
+    @abstractmethod
+    async def get_quotes_many(self, symbols:list):
+        "Quotes of symbols, {symbol: quote}"
+        pass
+
+    @abstractmethod
+    async def get_orders_since(self, since:float):
+        "Orders placed or updated since timestamp since, {str(order_id): (order_status, order_info)}"
+        pass
+
+    @abstractmethod
+    async def get_orders_by_id(self, order_ids:list):
+        "Orders with ids order_ids, {str(order_id): (order_status, order_info)}, missing ids are left out"
+        pass
+
+    @abstractmethod
+    async def send_orders(self, orders:list):
+        "Send orders at once, returns [(order_response, order_id), ...] in the same order, (None, None) if failed"
+        pass
+
+    @abstractmethod
+    async def cancel_orders(self, order_ids:list):
+        "Cancel orders at once, returns [cancel result, ...] in the same order"
+        pass
+
+    def run(self, coro, timeout=None):
+        "Run coroutine in the adapter event loop and wait for its result"
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name=f"{type(self).__name__}_loop",
+                             daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    # sync shim
+    def get_quotes(self, symbols:list):
+        return self.run(self.get_quotes_many(symbols))
+
+    def send_order(self, order:dict):
+        return self.run(self.send_orders([order]))[0]
+
+    def cancel_order(self, order_id):
+        return self.run(self.cancel_orders([order_id]))[0]
+
+    def get_orders_info(self):
+        return self.run(self.get_orders_since(0))
+
+    def get_order_info(self, order_id):
+        # ids read from csv can be floats
+        if isinstance(order_id, float) and order_id.is_integer():
+            order_id = int(order_id)
+        info = self.run(self.get_orders_by_id([order_id])).get(str(order_id))
+        if info is None:
+            return None, None
+        return info
+
 
 def get_brokerage(name=cfg['general']['BROKERAGE']):
     if name.lower() == 'tda':
@@ -97,4 +217,9 @@ def get_brokerage(name=cfg['general']['BROKERAGE']):
         accountId = None if len(accountId) == 0 else accountId
         ibkr = IBKR(accountId=accountId)
         ibkr.get_session()
-        return ibkr
\ No newline at end of file
+        return ibkr
+    elif name.lower() == 'sim':
+        from .sim_api import SimBroker
+        sim = SimBroker()
+        sim.get_session()
+        return sim
\ No newline at end of file
@@ -37,6 +37,8 @@ def retry_on_exception(retries=3, do_raise=False, fallback_method=None):
     return decorator
 
 class eTrade(BaseBroker):
+    capabilities = frozenset(["orders_info"])
+
     def __init__(self, account_n=0, accountId=None):
         self.name = 'etrade'
         self.base_url = cfg["etrade"]["PROD_BASE_URL"]
@@ -286,6 +288,15 @@ class eTrade(BaseBroker):
                 return order_status, order_info
         return None, None
 
+    def get_orders_info(self):
+        """ Status and info of recent orders in one call, {str(order_id): (order_status, order_info)}"""
+        orders = self.order_session.list_orders(self.accountIdKey, resp_format='json')
+        orders_info = {}
+        for order in orders['OrdersResponse']['Order']:
+            order_status = order['OrderDetail'][0]['status'].upper().replace('EXECUTED','FILLED').replace('OPEN','WORKING')
+            orders_info[str(order['orderId'])] = (order_status, self.format_order(order))
+        return orders_info
+
     def format_order(self, order:dict):
         """ output format for order_response.Order, mimicks the order_info from TDA API"""
         stopPrice= order['OrderDetail'][0]['Instrument'][0].get('stopPrice')
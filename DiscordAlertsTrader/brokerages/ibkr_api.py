@@ -7,13 +7,23 @@ from datetime import datetime
 import time
 import asyncio
 import random
+import threading
 
 class IBKR(BaseBroker):
+    capabilities = frozenset(["orders_info"])
+
     def __init__(self,accountId=None):
         self.name = 'ibkr'
         self.accountId = accountId
         self.ib = IB()
         self.ib2 = IB()
+        # live market data subscriptions, get_quotes reads the tickers
+        self.tickers = {}  # symbol: Ticker
+        self.last_asked = {}  # symbol: time last asked in get_quotes
+        self.con_ids = {}  # symbol: conId
+        self.mktdata_lock = threading.Lock()
+        self.max_lines = int(cfg['IBKR']['market_data_lines'])
+        self.idle_secs = float(cfg['IBKR']['market_data_idle'])
 
         nest_asyncio.apply()
 
@@ -172,6 +182,15 @@ class IBKR(BaseBroker):
             orders_inf.append(formatted_order)
         return orders_inf
     
+    def get_orders_info(self):
+        """ Status and info of session orders in one call, {str(order_id): (order_status, order_info)}"""
+        trades = self.connect_get('trades', {})
+        orders_info = {}
+        for trade in trades:
+            formatted_order = self.format_order(trade)
+            orders_info[str(trade.order.orderId)] = (formatted_order['status'], formatted_order)
+        return orders_info
+
     def get_order_info(self, order_id):        
         
         trades = self.connect_get('trades', {})
@@ -399,30 +418,67 @@ class IBKR(BaseBroker):
 
         return kwargs if kwargs['conId'] is not None else None
     
-    def get_quotes(self, symbols:list):
-        
-        quotes = {}
-        for symbol in symbols:
-            # print(symbol)
-            con_id = self.get_con_id(symbol)
-            # if symbol.startswith("SPXW"):
-            #     contract = Contract(conId=con_id, multiplier='100', exchange='SMART', currency='USD', tradingClass='SPXW')
-            # else:
-            contract = Contract(conId=con_id, exchange='SMART', currency='USD')
-            self.ib.sleep(0.1)
-            
-            quote = self.connect_get('reqTickers',contract, is_list=True)
-
-            self.ib.sleep(0.1)
-            quotes[symbol] = {
-                'symbol': symbol,
-                'midPrice': ((quote[-1].ask + quote[-1].bid) / 2) if quote[-1].ask and quote[-1].bid else float('nan'),
-                'bidPrice': quote[-1].bid,
-                'askPrice': quote[-1].ask,
-                'quoteTimeInLong': int(round(quote[-1].time.timestamp())) if quote[-1].time else None,
-            }
-        
+    def get_quotes(self, symbols:list, wait_first=2):
+        """Quotes from the live market data subscriptions, symbols not subscribed are
+        subscribed and waited for up to wait_first secs for their first quote"""
+        with self.mktdata_lock:
+            if not self.ib.isConnected():
+                # subscriptions are lost with the connection
+                self.tickers = {}
+                self.get_session()
+            now = time.time()
+            new = [s for s in symbols if s not in self.tickers]
+            for symbol in symbols:
+                self.last_asked[symbol] = now
+            self.release_mktdata(len(new), now)
+            for symbol in new:
+                self.subscribe_mktdata(symbol)
+
+            # let ib process the pending ticks
+            self.ib.sleep(0)
+            t0 = time.time()
+            while any(not has_quote(self.tickers.get(s)) for s in new) and time.time() - t0 < wait_first:
+                self.ib.sleep(0.05)
+
+            quotes = {}
+            for symbol in symbols:
+                ticker = self.tickers.get(symbol)
+                if ticker is None:
+                    continue
+                quotes[symbol] = {
+                    'symbol': symbol,
+                    'midPrice': ((ticker.ask + ticker.bid) / 2) if has_quote(ticker) else float('nan'),
+                    'bidPrice': ticker.bid,
+                    'askPrice': ticker.ask,
+                    'quoteTimeInLong': int(round(ticker.time.timestamp())) if ticker.time else None,
+                }
         return quotes
+
+    def subscribe_mktdata(self, symbol:str):
+        "Open a market data subscription for symbol, kept until released"
+        if symbol not in self.con_ids:
+            self.con_ids[symbol] = self.get_con_id(symbol)
+        con_id = self.con_ids[symbol]
+        if con_id is None:
+            print(f"IBKR no contract found for {symbol}, no quotes")
+            return
+        # if symbol.startswith("SPXW"):
+        #     contract = Contract(conId=con_id, multiplier='100', exchange='SMART', currency='USD', tradingClass='SPXW')
+        # else:
+        contract = Contract(conId=con_id, exchange='SMART', currency='USD')
+        self.tickers[symbol] = self.ib.reqMktData(contract, '', False, False)
+
+    def release_mktdata(self, n_new=0, now=None):
+        """Cancel subscriptions not asked for in idle_secs, and the least recently
+        asked ones if n_new more would go above the market data lines"""
+        now = time.time() if now is None else now
+        by_age = sorted(self.tickers, key=lambda s: self.last_asked.get(s, 0))
+        n_release = max(0, len(self.tickers) + n_new - self.max_lines)
+        for i, symbol in enumerate(by_age):
+            if i >= n_release and now - self.last_asked.get(symbol, 0) < self.idle_secs:
+                break
+            self.ib.cancelMktData(self.tickers.pop(symbol).contract)
+            self.last_asked.pop(symbol, None)
     
     def _convert_option_from_ibkr(self, ticker: Option):
         """
@@ -487,6 +543,11 @@ class IBKR(BaseBroker):
                                 exchange='SMART', currency='USD')
             
 
+def has_quote(ticker):
+    "True if the ticker got bid and ask, they are nan or -1 if not available"
+    return ticker is not None and ticker.bid > 0 and ticker.ask > 0
+
+
 ##### Uncomment for testing
 
 # if __name__ == '__main__':
@@ -0,0 +1,393 @@
+import os
+import time
+import random
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from DiscordAlertsTrader.configurator import cfg
+from DiscordAlertsTrader.brokerages import AsyncBaseBroker
+
+
+class QuoteReplay():
+    """Quotes of symbols at a given time, from data_dir/<dir_quotes>/<symbol>.csv files
+
+    Files have timestamp (secs), bid and ask columns, as saved in hist_quotes or
+    live_quotes. They are loaded once, the first time the symbol is asked.
+    """
+    def __init__(self, dir_quotes):
+        self.dir_quotes = dir_quotes
+        self.quotes = {}  # symbol: (timestamps, bids, asks) or None if no file
+
+    def add(self, symbol, quotes:pd.DataFrame):
+        "Add quotes of symbol, dataframe with timestamp, bid, ask columns in this order"
+        quotes = quotes.dropna().sort_values(quotes.columns[0])
+        self.quotes[symbol] = tuple(quotes.iloc[:, i].to_numpy(dtype=float) for i in range(3))
+
+    def load(self, symbol):
+        if symbol not in self.quotes:
+            fname = os.path.join(self.dir_quotes, f"{symbol}.csv")
+            if os.path.exists(fname):
+                self.add(symbol, pd.read_csv(fname, skipinitialspace=True).iloc[:, :3])
+            else:
+                self.quotes[symbol] = None
+        return self.quotes[symbol]
+
+    def at(self, symbol, t):
+        "Last (timestamp, bid, ask) at or before t, the first one if t is before the file. None if no quotes"
+        quotes = self.load(symbol)
+        if quotes is None or not len(quotes[0]):
+            return None
+        ix = max(0, np.searchsorted(quotes[0], t, side="right") - 1)
+        return quotes[0][ix], quotes[1][ix], quotes[2][ix]
+
+    def between(self, symbol, t0, t1):
+        "Quotes with t0 < timestamp <= t1, as list of (timestamp, bid, ask)"
+        quotes = self.load(symbol)
+        if quotes is None:
+            return []
+        i0 = np.searchsorted(quotes[0], t0, side="right")
+        i1 = np.searchsorted(quotes[0], t1, side="right")
+        return list(zip(quotes[0][i0:i1], quotes[1][i0:i1], quotes[2][i0:i1]))
+
+
+class SimBroker(AsyncBaseBroker):
+    """Paper brokerage filling orders with replayed quotes, BROKERAGE = sim
+
+    For offline runs and benchmarks of the trader without an account. Each
+    request waits `latency` secs plus a random `latency_jitter`, and requests
+    are spaced to `max_requests_per_sec`. Replay time starts at `start_time` and
+    runs `speed` times faster than real time, the replay harness can move it with `set_time`.
+
+    Working orders are matched against every quote since they were last checked:
+    limits fill at the ask (buy) or bid (sell) once reached, stops when crossed,
+    trailing stops when the price moves trail_stop_const from its best since
+    sent, and OCO orders fill one child and cancel the other. At most `max_fill`
+    units are filled per quote, giving partial fills, a partial fill of an OCO
+    child reduces the quantity of the other.
+
+    Orders and positions are only changed in the adapter event loop, sync
+    methods run there with `run`.
+    """
+    name = 'sim'
+    capabilities = frozenset(["orders_info", "orders_since", "batch_orders", "batch_cancel"])
+
+    def __init__(self, dir_quotes=None, start_time=None, speed=None, latency=None, latency_jitter=None,
+                 max_requests_per_sec=None, max_fill=None, cash=None):
+        sim_cfg = cfg['sim']
+        if dir_quotes is None:
+            dir_quotes = os.path.join(cfg['general']['data_dir'], sim_cfg['dir_quotes'])
+        if start_time is None and len(sim_cfg['start_time']):
+            start_time = datetime.strptime(sim_cfg['start_time'], "%Y-%m-%d %H:%M:%S").timestamp()
+        self.replay = QuoteReplay(dir_quotes)
+        self.speed = float(sim_cfg['speed']) if speed is None else speed
+        self.latency = float(sim_cfg['latency']) if latency is None else latency
+        self.latency_jitter = float(sim_cfg['latency_jitter']) if latency_jitter is None else latency_jitter
+        rate = float(sim_cfg['max_requests_per_sec']) if max_requests_per_sec is None else max_requests_per_sec
+        self.interval = 1/rate if rate else 0
+        self.max_fill = int(sim_cfg['max_fill']) if max_fill is None else max_fill
+        self.cash = float(sim_cfg['cash']) if cash is None else cash
+        self.accountId = "sim"
+        self.set_time(start_time)
+        self.orders = {}  # order_id: order
+        self.positions = {}  # symbol: qty
+        self.next_id = 1000
+        self.next_slot = 0
+        self.n_requests = 0
+
+    def get_session(self):
+        return True
+
+    def set_time(self, timestamp=None):
+        "Set replay time to timestamp (secs), None for current time"
+        self.t0_real = time.time()
+        self.t0_sim = self.t0_real if timestamp is None else timestamp
+
+    def now(self):
+        "Replay time in secs"
+        return self.t0_sim + (time.time() - self.t0_real) * self.speed
+
+    async def request(self):
+        "Wait the rate limit and the request latency"
+        self.n_requests += 1
+        if self.interval:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+        wait = self.latency + random.uniform(0, self.latency_jitter)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    ######################################################################
+    # QUOTES AND ORDERS
+
+    async def get_quotes_many(self, symbols:list):
+        await self.request()
+        t = self.now()
+        quotes = {}
+        for symbol in symbols:
+            quote = self.replay.at(symbol, t)
+            if quote is None:
+                quotes[symbol] = {'symbol': symbol,
+                                  'description': 'Symbol not found',
+                                  'askPrice': 0,
+                                  'bidPrice': 0,
+                                  'quoteTimeInLong': 0}
+                continue
+            quotes[symbol] = {'symbol': symbol,
+                              'description': "",
+                              'askPrice': float(quote[2]),
+                              'bidPrice': float(quote[1]),
+                              'quoteTimeInLong': int(quote[0]*1000)}
+        return quotes
+
+    async def get_orders_since(self, since:float):
+        await self.request()
+        self.match_orders()
+        return {str(oid): (order['status'], self.format_order(order))
+                for oid, order in self.orders.items() if order['updated'] >= since}
+
+    async def get_orders_by_id(self, order_ids:list):
+        await self.request()
+        out = {}
+        for order_id in order_ids:
+            order = self.orders.get(int(float(order_id)))
+            if order is None:
+                continue
+            if order['status'] in ["WORKING", "PARTIAL"]:
+                self.match_order(order, self.now())
+            out[str(order['order_id'])] = (order['status'], self.format_order(order))
+        return out
+
+    async def send_orders(self, orders:list):
+        await self.request()
+        out = []
+        for new_order in orders:
+            order = dict(new_order, order_id=self.next_id, status="WORKING", filled=0, fill_value=0,
+                         entered=self.now(), closed=None, checked=None, best=None, updated=time.time())
+            order['children'] = [dict(child, status="WORKING", filled=0, fill_value=0, closed=None, best=None)
+                                 for child in new_order.get('children', [])]
+            self.next_id += 1
+            self.orders[order['order_id']] = order
+            self.match_order(order, self.now())
+            out.append((self.format_order(order), order['order_id']))
+        return out
+
+    async def cancel_orders(self, order_ids:list):
+        await self.request()
+        self.match_orders()
+        out = []
+        for order_id in order_ids:
+            order = self.orders.get(int(float(order_id)))
+            if order is None or order['status'] not in ["WORKING", "PARTIAL"]:
+                out.append(False)
+                continue
+            self.close(order, "CANCELED")
+            for child in order['children']:
+                if child['status'] in ["WORKING", "PARTIAL"]:
+                    self.close(child, "CANCELED")
+            out.append("CANCELED")
+        return out
+
+    def match_orders(self):
+        "Fill working orders with the quotes since last checked"
+        t = self.now()
+        for order in self.orders.values():
+            if order['status'] in ["WORKING", "PARTIAL"]:
+                self.match_order(order, t)
+
+    def match_order(self, order, t):
+        if order['checked'] is None:
+            # quote at the time the order is sent counts
+            quote = self.replay.at(order['symbol'], order['entered'])
+            ticks = [] if quote is None else [quote]
+            ticks += self.replay.between(order['symbol'], order['entered'], t)
+        else:
+            ticks = self.replay.between(order['symbol'], order['checked'], t)
+        order['checked'] = t
+        for tick in ticks:
+            if order['orderType'] == "OCO":
+                self.match_oco(order, tick)
+            else:
+                self.match_tick(order, tick)
+            if order['status'] not in ["WORKING", "PARTIAL"]:
+                return
+
+    def match_oco(self, order, tick):
+        "Fill a child of OCO order, the other is reduced to the units left or canceled if none"
+        for child in order['children']:
+            if child['status'] in ["WORKING", "PARTIAL"] and self.match_tick(child, tick):
+                break
+        else:
+            return
+        left = order['quantity'] - sum(c['filled'] for c in order['children'])
+        for child in order['children']:
+            if child['status'] not in ["WORKING", "PARTIAL"]:
+                continue
+            if left <= 0:
+                # units filled before the other child filled the rest
+                child['quantity'] = child['filled']
+                self.close(child, "FILLED" if child['filled'] else "CANCELED")
+            else:
+                child['quantity'] = child['filled'] + left
+        if left <= 0:
+            self.close(order, "FILLED", tick[0])
+        else:
+            order['status'] = "PARTIAL"
+            order['updated'] = time.time()
+
+    def match_tick(self, order, tick):
+        "Fill order if the quote reaches its price, returns True if filled"
+        timestamp, bid, ask = tick
+        buy = order['instruction'].startswith("BUY")
+        price = ask if buy else bid
+        if not price > 0:
+            return False
+        if order['orderType'] == "LIMIT":
+            fill = price <= order['price'] if buy else price >= order['price']
+        elif order['orderType'] == "STOP":
+            fill = price >= order['stopPrice'] if buy else price <= order['stopPrice']
+        elif order['orderType'] == "TRAILING_STOP":
+            if order['best'] is None:
+                order['best'] = price
+            order['best'] = min(order['best'], price) if buy else max(order['best'], price)
+            trail = order['trail_stop_const']
+            fill = price >= order['best'] + trail if buy else price <= order['best'] - trail
+        else:
+            fill = False
+        if not fill:
+            return False
+
+        qty = order['quantity'] - order['filled']
+        if self.max_fill:
+            qty = min(qty, self.max_fill)
+        order['filled'] += qty
+        order['fill_value'] += qty * price
+        sign = 1 if buy else -1
+        self.positions[order['symbol']] = self.positions.get(order['symbol'], 0) + sign * qty
+        mult = 100 if "_" in order['symbol'] else 1
+        self.cash -= sign * qty * price * mult
+        if order['filled'] >= order['quantity']:
+            self.close(order, "FILLED", timestamp)
+        else:
+            order['status'] = "PARTIAL"
+            order['updated'] = time.time()
+        return True
+
+    def close(self, order, status, timestamp=None):
+        order['status'] = status
+        order['closed'] = self.now() if timestamp is None else timestamp
+        order['updated'] = time.time()
+
+    def format_order(self, order:dict):
+        """ output format for order_response.Order, mimicks the order_info from TDA API"""
+        if order['orderType'] == "OCO":
+            return {'status': order['status'],
+                    'orderStrategyType': 'OCO',
+                    "order_id": order['order_id'],
+                    "orderId": order['order_id'],
+                    'enteredTime': self.time_str(order['entered']),
+                    'childOrderStrategies': [self.format_order(dict(child, order_id=order['order_id'],
+                                                                    entered=order['entered']))
+                                             for child in order['children']]}
+        price = float(order['fill_value']/order['filled']) if order['filled'] else order.get('price')
+        if price is None:
+            price = order.get('stopPrice')
+        return {'status': order['status'],
+                'quantity': order['quantity'],
+                'filledQuantity': order['filled'],
+                'price': price,
+                'orderStrategyType': 'SINGLE',
+                "order_id": order['order_id'],
+                "orderId": order['order_id'],
+                "stopPrice": order.get('stopPrice'),
+                'orderType': order['orderType'],
+                'enteredTime': self.time_str(order['entered']),
+                "closeTime": self.time_str(order['closed']),
+                'orderLegCollection': [{
+                    'instrument': {'symbol': order['symbol']},
+                    'instruction': order['instruction'],
+                    'quantity': order['filled'],
+                }]
+                }
+
+    def time_str(self, timestamp):
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%dT%H:%M:%S+00")
+
+    def get_orders(self):
+        return self.run(self.orders_list())
+
+    async def orders_list(self):
+        self.match_orders()
+        return [self.format_order(order) for order in self.orders.values()]
+
+    def get_account_info(self):
+        return self.run(self.account_info())
+
+    async def account_info(self):
+        self.match_orders()
+        positions = []
+        for symbol, qty in self.positions.items():
+            if qty == 0:
+                continue
+            quote = self.replay.at(symbol, self.now())
+            mark = 0 if quote is None else (quote[1] + quote[2])/2
+            positions.append({"longQuantity": qty,
+                              "symbol": symbol,
+                              "marketValue": qty * mark * (100 if "_" in symbol else 1),
+                              "assetType": "OPTION" if "_" in symbol else "EQUITY",
+                              "averagePrice": None,
+                              "currentDayProfitLoss": None,
+                              "currentDayProfitLossPercentage": None,
+                              'instrument': {'symbol': symbol,
+                                             'assetType': "OPTION" if "_" in symbol else "EQUITY"}})
+        liquidation = self.cash + sum(p["marketValue"] for p in positions)
+        return {'securitiesAccount': {
+                    'positions': positions,
+                    'accountId': self.accountId,
+                    'currentBalances': {
+                        'liquidationValue': liquidation,
+                        'cashBalance': self.cash,
+                        'availableFunds': self.cash},
+                    'orderStrategies': [self.format_order(o) for o in self.orders.values()
+                                        if o['status'] in ["WORKING", "PARTIAL"]]}}
+
+    ######################################################################
+    # ORDER BUILDERS
+
+    def instruction(self, action):
+        return {"BTO": "BUY_TO_OPEN", "STC": "SELL_TO_CLOSE",
+                "STO": "SELL_TO_OPEN", "BTC": "BUY_TO_CLOSE"}[action]
+
+    def make_BTO_lim_order(self, Symbol:str, Qty:int, price:float, action="BTO", **kwarg):
+        "Buy with a limit order"
+        return {"symbol": Symbol, "quantity": int(Qty), "instruction": self.instruction(action),
+                "orderType": "LIMIT", "price": price}
+
+    def make_Lim_SL_order(self, Symbol:str, Qty:int, PT:float, SL:float, action="STC", **kwarg):
+        """Sell with a limit order and a stop loss order"""
+        limit = self.make_STC_lim(Symbol, Qty, PT, action)
+        stop = self.make_STC_SL(Symbol, Qty, SL, action)
+        return {"symbol": Symbol, "quantity": int(Qty), "instruction": self.instruction(action),
+                "orderType": "OCO", "children": [limit, stop]}
+
+    def make_STC_lim(self, Symbol:str, Qty:int, price:float, action="STC", **kwarg):
+        """Sell with a limit order"""
+        return {"symbol": Symbol, "quantity": int(Qty), "instruction": self.instruction(action),
+                "orderType": "LIMIT", "price": price}
+
+    def make_STC_SL(self, Symbol:str, Qty:int, SL:float, action="STC", **kwarg):
+        """Sell with a stop loss order"""
+        return {"symbol": Symbol, "quantity": int(Qty), "instruction": self.instruction(action),
+                "orderType": "STOP", "stopPrice": SL}
+
+    def make_STC_SL_trailstop(self, Symbol:str, Qty:int, trail_stop_const:float, action="STC", **kwarg):
+        "Trailing stop, trail_stop_const in price units"
+        return {"symbol": Symbol, "quantity": int(Qty), "instruction": self.instruction(action),
+                "orderType": "TRAILING_STOP", "trail_stop_const": trail_stop_const}
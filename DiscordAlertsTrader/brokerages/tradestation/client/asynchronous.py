@@ -4,7 +4,8 @@ This module defines the AsyncClient class to make asynchronous HTTP requests usi
 Classes:
     - AsyncClient: Manages asynchronous HTTP requests.
 """
-from typing import Any, Mapping, Optional
+import json
+from typing import Any, AsyncIterator, Mapping, Optional
 
 import httpx
 
@@ -74,4 +75,21 @@ class AsyncClient(BaseClient):
     async def get_accounts(self, user_id: str) -> httpx.Response:
         url, params = self._get_accounts(user_id)
         
-        return await self._get_request(url, params)
\ No newline at end of file
+        return await self._get_request(url, params)
+
+    async def stream_quotes(self, symbols: list[str], read_timeout: float = 30.0) -> AsyncIterator[dict]:
+        """
+        Stream quote changes of up to 100 symbols, yields each json message.
+
+        Reads until the caller stops iterating or the server closes the stream. As
+        heartbeats come every 5 secs, no message in read_timeout secs raises httpx.ReadTimeout.
+        """
+        url, headers = self._stream_quotes(symbols)
+        timeout = httpx.Timeout(10.0, read=read_timeout)
+
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            async with client.stream("GET", url, headers=headers) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
\ No newline at end of file
@@ -997,51 +997,36 @@ class BaseClient(ABC):
 
         return self._get_request(url=url_endpoint, params=params)
 
-    # def stream_quotes_changes(self, symbols=None):
-    #     """Streams quote changes for a list of symbols.
+    def _stream_quotes(self, symbols: list[str]) -> tuple[str, dict]:
+        """Endpoint and headers of the quote changes stream.
 
-    #     Arguments:
-    #     ----
-    #     symbol (List[str]): A list of ticker symbols.
-
-    #     Raises:
-    #     ----
-    #     ValueError: If no symbol is provided will raise an error.
-
-    #     Returns:
-    #     ----
-    #     (dict): A dictionary containing the symbol quotes.
-    #     """
-
-    #     # validate the token.
-    #     self._token_validation()
+        The stream is a chunked response with one json message per line: quotes
+        (the first one full, then only the changed fields and Symbol), heartbeats
+        `{"Heartbeat": n, "Timestamp": ...}` every 5 secs and errors `{"Error": ..., "Message": ...}`.
 
-    #     if symbols is None:
-    #         raise ValueError("You must pass through at least one symbol.")
-
-    #     symbols = ','.join(symbols)
+        Arguments:
+        ----
+        symbols (list[str]): List of valid symbols. No more than 100 symbols per request.
 
-    #     # define the endpoint.
-    #     url_endpoint = self._api_endpoint(
-    #         url='stream/quote/changes/{symbols}'.format(symbols=symbols))
+        Returns:
+        ----
+        (tuple): The endpoint url and the request headers.
+        """
+        if not 0 < len(symbols) <= 100:
+            raise ValueError("A minimum of 1 and no more than 100 symbols per request.")
 
-    #     # define the headers
-    #     headers = {
-    #         'Accept': 'application/vnd.tradestation.streams+json'
-    #     }
+        # validate the token.
+        self._token_validation()
 
-    #     # define the arguments.
-    #     params = {
-    #         'access_token': self._access_token
-    #     }
+        # define the endpoint.
+        url_endpoint = self._api_endpoint(f"marketdata/stream/quotes/{','.join(symbols)}")
 
-    #     return self._handle_requests(
-    #         url=url_endpoint,
-    #         method='get',
-    #         headers=headers,
-    #         params=params,
-    #         stream=True,
-    #     )
+        # define the headers.
+        headers = {
+            "Accept": "application/vnd.tradestation.streams.v2+json",
+            "Authorization": "Bearer " + self._access_token,
+        }
+        return url_endpoint, headers
 
     # def stream_bars_start_date(self, symbol: str, interval: int, unit: str, start_date: str, session: str) -> Response:
     #     """Stream bars for a certain data range.
@@ -11,6 +11,8 @@ from DiscordAlertsTrader.brokerages import BaseBroker, retry_on_exception
 
 
 class TS(BaseBroker):
+    capabilities = frozenset(["orders_info", "stream_quotes"])
+
     def __init__(self, accountId=None):
         """
         accountId: id of the account
@@ -49,6 +51,11 @@ class TS(BaseBroker):
             return True
         return False
     
+    def stream(self):
+        "TradeStation quote stream, see TSStream"
+        from DiscordAlertsTrader.brokerages.tradestation_stream import TSStream
+        return TSStream(self)
+
     @retry_on_exception(sleep=1)
     def get_quotes(self, symbol:list):
         symbol = [self._convert_option_tots(s) for s in symbol]
@@ -222,6 +229,20 @@ class TS(BaseBroker):
         order_status = order_info['status']
         return order_status, order_info
 
+    def get_orders_info(self):
+        """ Status and info of recent orders in one call, {str(order_id): (order_status, order_info)}
+        bracket orders are not included, they are asked with get_order_info"""
+        resp = self.session.get_orders([self.accountId]).json()
+        if resp is None or resp.get('Error'):
+            return None
+        orders_info = {}
+        for order in resp.get('Orders', []):
+            if order.get('ConditionalOrders') is not None:
+                continue
+            order_info = self.format_order(order)
+            orders_info[str(order['OrderID'])] = (order_info['status'], order_info)
+        return orders_info
+
     def format_order(self, order:dict):
         """ output format for order_response. Order, mimicks the order_info from TDA API"""
 
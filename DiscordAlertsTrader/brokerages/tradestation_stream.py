@@ -0,0 +1,161 @@
+import time
+import asyncio
+import threading
+from datetime import datetime
+
+from DiscordAlertsTrader.brokerages.tradestation.client.asynchronous import AsyncClient
+from DiscordAlertsTrader.live_quotes import quote_cache
+
+
+class TSStream():
+    """Live quotes streamed by TradeStation, published to quote_cache
+
+    Same interface as WebullStream. An asyncio loop in its own thread reads the
+    chunked quote streams (up to 100 symbols each) with the async client, so
+    the trader is never blocked. Streams are reopened when the symbols set with
+    `set_symbols` change, and on errors after a wait that doubles with each
+    consecutive failure. Meanwhile symbols are not live and are polled by the caller.
+
+    Parameters
+    ----------
+    ts : TS
+        logged in tradestation adapter, used for the session tokens and symbol format
+    stale_secs : float
+        a symbol is not live if no quote or heartbeat was received in stale_secs
+    max_symbols : int
+        symbols per stream, tradestation allows up to 100
+    """
+    def __init__(self, ts, stale_secs=10, max_symbols=100):
+        self.ts = ts
+        self.stale_secs = stale_secs
+        self.max_symbols = max_symbols
+        self.lock = threading.Lock()
+        self.wanted = set()  # symbols to stream
+        self.streamed = set()  # symbols in the open streams
+        self.invalid = set()  # symbols rejected by tradestation, not streamed until set again
+        self.last = {}  # symbol: last quote, pushes only have the changed fields
+        self.connected = False
+        self.running = False
+        self.failures = 0
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="ts_stream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def set_symbols(self, symbols):
+        "Symbols to stream, streams are reopened by the stream thread"
+        with self.lock:
+            self.wanted = set(symbols)
+            self.invalid &= self.wanted
+
+    def to_stream(self):
+        with self.lock:
+            return sorted(self.wanted - self.invalid)
+
+    def is_live(self, symbol):
+        "True if symbol is streamed and got a quote or heartbeat in the last stale_secs"
+        if not self.connected or symbol not in self.streamed:
+            return False
+        age = quote_cache.age(symbol)
+        return age is not None and age < self.stale_secs
+
+    def client(self):
+        "Async client with the tokens of the TS session, refreshed if about to expire"
+        session = self.ts.session
+        session._token_validation(nseconds=60)
+        return AsyncClient(session.client_id, session.client_secret, session.paper_trade,
+                           _access_token=session._access_token,
+                           _refresh_token=session._refresh_token,
+                           _access_token_expires_at=session._access_token_expires_at)
+
+    def run(self):
+        asyncio.run(self.stream_loop())
+
+    async def stream_loop(self):
+        while self.running:
+            symbols = self.to_stream()
+            if not len(symbols):
+                await asyncio.sleep(1)
+                continue
+            try:
+                await self.stream_symbols(symbols)
+                self.failures = 0
+            except Exception as e:
+                self.failures += 1
+                wait = min(60, 2**self.failures)
+                print(f"TradeStation quote stream disconnected, reconnecting in {wait} sec:", repr(e))
+                if "Unauthorized" in str(e) or "401" in str(e):
+                    try:
+                        self.ts.get_session()
+                    except Exception as ex:
+                        print("TradeStation new session failed:", ex)
+                await asyncio.sleep(wait)
+            finally:
+                self.connected = False
+                self.streamed = set()
+
+    async def stream_symbols(self, symbols):
+        "Stream symbols until they change or a stream fails"
+        client = self.client()
+        chunks = [symbols[i:i + self.max_symbols] for i in range(0, len(symbols), self.max_symbols)]
+        tasks = [asyncio.create_task(self.read_stream(client, chunk)) for chunk in chunks]
+        self.streamed = set(symbols)
+        self.last = {s: q for s, q in self.last.items() if s in self.streamed}
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+
+    async def read_stream(self, client, symbols):
+        ts_symbols = {self.ts._convert_option_tots(s): s for s in symbols}
+        async for msg in client.stream_quotes(list(ts_symbols)):
+            if "Error" in msg:
+                symbol = ts_symbols.get(msg.get("Symbol"))
+                if symbol is None:
+                    raise ConnectionError(f"{msg['Error']}: {msg.get('Message')}")
+                # bad symbol, the stream keeps going for the rest
+                print(f"TradeStation can not stream {symbol}:", msg['Error'])
+                with self.lock:
+                    self.invalid.add(symbol)
+            elif "Heartbeat" in msg:
+                # no changes, last quotes are still current
+                self.connected = True
+                quote_cache.publish({s: dict(self.last[s]) for s in symbols if s in self.last})
+            elif "Symbol" in msg:
+                self.connected = True
+                self.on_quote(self.ts._convert_option_fromts(msg["Symbol"]), msg)
+            if not self.running or self.to_stream() != sorted(self.streamed):
+                return
+        raise ConnectionError("stream closed by TradeStation")
+
+    def on_quote(self, symbol, msg):
+        "Merge the changed fields in the last quote and publish it"
+        quote = self.last.get(symbol)
+        if quote is None:
+            quote = {'symbol': symbol,
+                     'description': "",
+                     'askPrice': None,
+                     'bidPrice': None}
+            self.last[symbol] = quote
+        if msg.get("Ask") is not None:
+            quote['askPrice'] = float(msg["Ask"])
+        if msg.get("Bid") is not None:
+            quote['bidPrice'] = float(msg["Bid"])
+        if msg.get("Last") is not None:
+            quote['lastPrice'] = float(msg["Last"])
+        if msg.get("TradeTime"):
+            timestmp = datetime.fromisoformat(msg["TradeTime"].replace('Z', '+00:00'))
+            quote['quoteTimeInLong'] = int(timestmp.timestamp()*1000)
+        if quote['askPrice'] is None or quote['bidPrice'] is None:
+            return
+        quote.setdefault('quoteTimeInLong', int(time.time()*1000))
+        quote_cache.publish({symbol: dict(quote)})
@@ -1,16 +1,30 @@
 import re
+import os
+import json
 import time
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
 from DiscordAlertsTrader.brokerages.webull import webull, paper_webull
 from DiscordAlertsTrader.configurator import cfg
-from DiscordAlertsTrader.brokerages import retry_on_exception
+from DiscordAlertsTrader.brokerages import retry_on_exception, RequestBudget
 
 class weBull:
-    def __init__(self, paper_trading: bool = False) -> None:
+    capabilities = frozenset(["orders_info", "stream_quotes", "stream_orders"])
+
+    def __init__(self, paper_trading: bool = False, option_ids_fname=None) -> None:
         self._webull = paper_webull() if (paper_trading) else webull()
         self._loggedin = False
         self.name = 'webull'
-        self.option_ids = {}
+        # option symbol: webull tickerId, saved to disk to resolve ids without asking the chain
+        self.option_ids_fname = option_ids_fname or os.path.join(cfg['general']['data_dir'], "webull_option_ids.json")
+        self.option_ids_lock = threading.Lock()
+        self.option_ids = self.load_option_ids()
+        self.ticker_ids = {}
+        # quotes are asked in parallel, all market data requests share the budget
+        self.budget = RequestBudget(float(cfg['webull']['max_requests_per_sec']))
+        self.quote_pool = ThreadPoolExecutor(max_workers=max(1, int(cfg['webull']['quote_workers'])),
+                                             thread_name_prefix="webull_quotes")
 
     def get_session(self, use_workaround: bool = True) -> bool:
         wb = self._webull
@@ -90,6 +104,15 @@ class weBull:
                 return order_status, order_info
         return None, None
 
+    def get_orders_info(self):
+        """ Status and info of recent orders in one call, {str(order_id): (order_status, order_info)}"""
+        orders = self.session.get_history_orders()
+        orders_info = {}
+        for order in orders:
+            order_status = order['status'].upper().replace("CANCELLED", "CANCELED")
+            orders_info[str(order['orders'][0]['orderId'])] = (order_status, self.format_order(order))
+        return orders_info
+
     def format_order(self, order:dict):
         """ output format for order_response. Order, mimicks the order_info from TDA API"""
         stopPrice= order['orders'][0].get('stpPrice')
@@ -160,23 +183,80 @@ class weBull:
         otype = opt_info['direction'][0].upper()
         return f"{opt_info['ticker']}_{mnt}{day}{yer[2:]}{otype}{opt_info['strike']}"
 
+    def load_option_ids(self)->dict:
+        "Load saved option ids, expired options are dropped"
+        if not os.path.exists(self.option_ids_fname):
+            return {}
+        try:
+            with open(self.option_ids_fname, "r") as f:
+                option_ids = json.load(f)
+        except (ValueError, OSError) as e:
+            print("Could not load webull option ids:", e)
+            return {}
+        today = date.today().strftime("%Y-%m-%d")
+        return {symb: opt_id for symb, opt_id in option_ids.items()
+                if self.format_option(symb) and self.format_option(symb)['date'] >= today}
+
+    def save_option_ids(self):
+        with self.option_ids_lock:
+            option_ids = dict(self.option_ids)
+        tmp_fname = self.option_ids_fname + ".tmp"
+        try:
+            with open(tmp_fname, "w") as f:
+                json.dump(option_ids, f)
+            os.replace(tmp_fname, self.option_ids_fname)
+        except OSError as e:
+            print("Could not save webull option ids:", e)
+
+    def get_option_chain_ids(self, ticker:str, exp_date:str)->int:
+        """Get the option ids of all strikes, calls and puts, of ticker expiring on exp_date (year-month-day)
+
+        Returns number of option ids found, ids are saved to disk
+        """
+        self.budget.wait()
+        options_data = self.session.get_options(stock=ticker, direction='all', expireDate=exp_date)
+        chain_ids = {}
+        for option in options_data:
+            for direction in ['call', 'put']:
+                if direction not in option or option[direction]['expireDate'] != exp_date:
+                    continue
+                symb = self.reformat_option({'ticker': ticker, 'date': exp_date, 'direction': direction,
+                                             'strike': option['strikePrice']})
+                chain_ids[symb] = str(option[direction]['tickerId'])
+        if len(chain_ids):
+            with self.option_ids_lock:
+                self.option_ids.update(chain_ids)
+            self.save_option_ids()
+        return len(chain_ids)
+
+    def warm_option_ids(self, symbols:list):
+        "Get option chain ids for the expirations of option symbols not already known, e.g. alerted today"
+        chains = set()
+        for symb in symbols:
+            symb = self.fix_symbol(symb, "in")
+            if "_" not in symb or self.option_ids.get(symb) is not None:
+                continue
+            opt_info = self.format_option(symb)
+            if opt_info:
+                chains.add((opt_info['ticker'], opt_info['date']))
+        for ticker, exp_date in chains:
+            try:
+                self.get_option_chain_ids(ticker, exp_date)
+            except Exception as e:
+                print(f"Could not get option ids of {ticker} {exp_date}:", e)
+        return len(chains)
+
     def get_option_id(self, symb:str):
-        "Get option id from option symb with standard format"
+        "Get option id from option symb with standard format, the whole chain is fetched if not known"
         if self.option_ids.get(symb) is None:
             opt_info = self.format_option(symb)
             if opt_info:
-                options_data = self.session.get_options(stock=opt_info['ticker'],
-                                                        direction=opt_info['direction'],
-                                                        expireDate=opt_info['date'])
-                filtered_options_data = [option for option in options_data if option['strikePrice'] == opt_info['strike'] and \
-                    option[opt_info['direction']]['expireDate'] == opt_info['date']]
-                option_id = filtered_options_data[0][opt_info['direction']]['tickerId']
-                self.option_ids[symb] = str(option_id)
-                return option_id
+                self.get_option_chain_ids(opt_info['ticker'], opt_info['date'])
+                if self.option_ids.get(symb) is None:
+                    raise ValueError(f"Option id not found for {symb}")
             else:
                 return None
-        else:
-            return self.option_ids[symb]
+        return self.option_ids[symb]
 
     def fix_symbol(self, symbol:str, direction:str):
         "Fix symbol for options, direction in or out of webull format"
@@ -185,51 +265,73 @@ class weBull:
         elif direction == 'out':
             return symbol.replace("SPX", "SPXW").replace("NDX", "NDXP")
 
+    def stream(self):
+        "Webull mqtt quote and order stream, see WebullStream"
+        from DiscordAlertsTrader.brokerages.weBull_stream import WebullStream
+        return WebullStream(self)
+
+    def get_ticker_id(self, ticker:str)->str:
+        "Webull tickerId of the stock ticker, kept to avoid asking it again"
+        if self.ticker_ids.get(ticker) is None:
+            self.budget.wait()
+            self.ticker_ids[ticker] = str(self.session.get_ticker(ticker))
+        return self.ticker_ids[ticker]
+
     def get_quotes(self, symbol:list) -> dict:
-        resp = {}
-        for symb in symbol:
-            if "_" in symb:
-                symb = self.fix_symbol(symb, "in")
-                opt_info = self.format_option(symb)
-                if opt_info:
-                    try:
-                        option_id = self.get_option_id(symb)
-                        quote = self.session.get_option_quote(stock=opt_info['ticker'], optionId=option_id)
-
-                        ts = quote['data'][0]['tradeStamp']
-                        ask = eval(quote['data'][0]['askList'][0]['price'])
-                        bid = eval(quote['data'][0]['bidList'][0]['price'])
-                        ticker = self.fix_symbol(self.reformat_option(opt_info), 'out')
-
-                        resp[ticker] = {
-                                        'symbol' : ticker,
-                                        'description': option_id,
-                                        'askPrice': ask,
-                                        'bidPrice': bid,
-                                        'quoteTimeInLong': ts
-                                        }
-                    except Exception as e:
-                        sym_out = self.fix_symbol(symb, "out")
-                        print("Error getting quote for",  sym_out, e)
-                        resp[sym_out] = {'symbol': sym_out,
-                                        'description':'Symbol not found'
-                                        }
-            else:
-                quote = self.session.get_quote(symb)
-                if quote and quote['template']=='stock':
-                    resp[symb] = {
-                                'symbol' : quote['symbol'],
-                                'description': quote['disSymbol'],
-                                'askPrice': eval(quote['askList'][0]['price']),
-                                'bidPrice': eval(quote['bidList'][0]['price']),
-                                'quoteTimeInLong': round(time.time()*1000),
-                            }
-                else:
-                    print(symb, "not found", quote['template'])
-                    resp[symb] = {'symbol' :symb,
-                                    'description':'Symbol not found'
+        "Quotes of the symbols, asked in parallel by the quote pool"
+        if len(symbol) == 1:
+            quotes = [self.get_quote(symbol[0])]
+        else:
+            quotes = self.quote_pool.map(self.get_quote, symbol)
+        return {symb: quote for symb, quote in quotes if quote is not None}
+
+    def get_quote(self, symb:str) -> tuple:
+        "Quote of one symbol, returns (symbol, quote)"
+        if "_" in symb:
+            symb = self.fix_symbol(symb, "in")
+            opt_info = self.format_option(symb)
+            if opt_info:
+                try:
+                    option_id = self.get_option_id(symb)
+                    tId = self.get_ticker_id(opt_info['ticker'])
+                    self.budget.wait()
+                    quote = self.session.get_option_quote(tId=tId, optionId=option_id)
+
+                    ts = quote['data'][0]['tradeStamp']
+                    ask = eval(quote['data'][0]['askList'][0]['price'])
+                    bid = eval(quote['data'][0]['bidList'][0]['price'])
+                    ticker = self.fix_symbol(self.reformat_option(opt_info), 'out')
+
+                    return ticker, {
+                                    'symbol' : ticker,
+                                    'description': option_id,
+                                    'askPrice': ask,
+                                    'bidPrice': bid,
+                                    'quoteTimeInLong': ts
                                     }
-        return resp
+                except Exception as e:
+                    sym_out = self.fix_symbol(symb, "out")
+                    print("Error getting quote for",  sym_out, e)
+                    return sym_out, {'symbol': sym_out,
+                                     'description':'Symbol not found'
+                                     }
+            return symb, None
+        else:
+            self.budget.wait()
+            quote = self.session.get_quote(tId=self.get_ticker_id(symb))
+            if quote and quote['template']=='stock':
+                return symb, {
+                            'symbol' : quote['symbol'],
+                            'description': quote['disSymbol'],
+                            'askPrice': eval(quote['askList'][0]['price']),
+                            'bidPrice': eval(quote['bidList'][0]['price']),
+                            'quoteTimeInLong': round(time.time()*1000),
+                        }
+            else:
+                print(symb, "not found", quote['template'])
+                return symb, {'symbol' :symb,
+                              'description':'Symbol not found'
+                              }
 
     @retry_on_exception(sleep=1)
     def send_order(self, new_order:dict):
@@ -257,10 +359,15 @@ class weBull:
             order_id = order_response['data']['orderId']
         else:
             order_id = order_response['orderId']
-        time.sleep(3) # 3 secs to wait for order to show up in history
-        _, ord_inf = self.get_order_info(order_id)
-
-        order_response.update(ord_inf)
+        # wait for order to show up in history, up to 3 secs
+        ord_inf = None
+        for wait in [0.2, 0.3, 0.5, 1, 1]:
+            time.sleep(wait)
+            _, ord_inf = self.get_order_info(order_id)
+            if ord_inf is not None:
+                break
+        if ord_inf is not None:
+            order_response.update(ord_inf)
         return order_response, order_id
 
     @retry_on_exception(sleep=1)
@@ -0,0 +1,177 @@
+import time
+import threading
+
+from DiscordAlertsTrader.brokerages.webull import StreamConn
+from DiscordAlertsTrader.live_quotes import quote_cache
+
+
+class WebullStream():
+    """Live quotes and order updates pushed by the webull mqtt stream
+
+    Quotes are published to quote_cache, order updates call each function in
+    `order_callbacks` with (order_id, order_status).
+
+    The stream runs in its own thread, it subscribes the symbols set with
+    `set_symbols` (e.g. the watchlist) and unsubscribes the ones removed. All
+    StreamConn calls are done from the stream thread. If the connection drops
+    it reconnects, meanwhile symbols are not live and are polled by the caller.
+
+    Parameters
+    ----------
+    wb : weBull
+        logged in webull adapter, used for the session and ticker ids
+    stale_secs : float
+        a symbol is not live if no quote was received in stale_secs
+    level : int
+        webull push type, 104 is bid and ask
+    """
+    def __init__(self, wb, stale_secs=10, level=104):
+        self.wb = wb
+        self.stale_secs = stale_secs
+        self.level = level
+        self.conn = StreamConn()
+        self.conn.price_func = self.on_price
+        self.conn.order_func = self.on_order
+        self.order_callbacks = []
+        self.lock = threading.Lock()
+        self.wanted = set()  # symbols to stream
+        self.subscribed = {}  # symbol: tickerId
+        self.tid_symbols = {}  # tickerId: symbol
+        self.failed = {}  # symbol: time of failed subscription, retried after 60 sec
+        self.last = {}  # symbol: last quote, pushes can have only bid or ask
+        self.connected = False
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="webull_stream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        # order client has its own loop thread, quotes client is closed by the stream thread
+        self.close_order_client()
+
+    def close_order_client(self):
+        "Stop the loop thread and socket of the order updates client"
+        client, self.conn.client_order_upd = self.conn.client_order_upd, None
+        if client is not None:
+            try:
+                client.loop_stop()
+                client.disconnect()
+            except Exception as e:
+                print("error closing webull order stream:", e)
+
+    def close_clients(self):
+        self.close_order_client()
+        client, self.conn.client_streaming_quotes = self.conn.client_streaming_quotes, None
+        if client is not None:
+            try:
+                client.disconnect()
+            except Exception as e:
+                print("error closing webull quote stream:", e)
+
+    def set_symbols(self, symbols):
+        "Symbols to stream, subscriptions are updated by the stream thread"
+        with self.lock:
+            self.wanted = set(symbols)
+
+    def is_live(self, symbol):
+        "True if symbol is streamed and got a quote in the last stale_secs"
+        if not self.connected or symbol not in self.subscribed:
+            return False
+        age = quote_cache.age(symbol)
+        return age is not None and age < self.stale_secs
+
+    def ticker_id(self, symbol):
+        if "_" in symbol:
+            return self.wb.get_option_id(self.wb.fix_symbol(symbol, "in"))
+        return self.wb.get_ticker_id(symbol)
+
+    def connect(self):
+        session = self.wb.session
+        # clients of the last connection, or their threads and sockets are left open
+        self.close_clients()
+        self.conn.connect(session._did, access_token=session._access_token)
+        self.subscribed, self.tid_symbols = {}, {}
+        self.connected = True
+        print("Connected to webull quote stream")
+
+    def sync_subscriptions(self):
+        with self.lock:
+            wanted = set(self.wanted)
+        for symbol in wanted - set(self.subscribed):
+            if time.time() - self.failed.get(symbol, 0) < 60:
+                continue
+            try:
+                tId = self.ticker_id(symbol)
+            except Exception as e:
+                print(f"webull stream can not subscribe {symbol}:", e)
+                self.failed[symbol] = time.time()
+                continue
+            self.tid_symbols[str(tId)] = symbol
+            self.subscribed[symbol] = tId
+            self.conn.subscribe(tId=tId, level=self.level)
+        for symbol in set(self.subscribed) - wanted:
+            tId = self.subscribed.pop(symbol)
+            self.tid_symbols.pop(str(tId), None)
+            self.last.pop(symbol, None)
+            self.conn.unsubscribe(tId=tId, level=self.level)
+
+    def run(self):
+        while self.running:
+            if not self.connected:
+                try:
+                    self.connect()
+                except Exception as e:
+                    print("webull stream connection failed, retrying in 10 sec:", e)
+                    time.sleep(10)
+                    continue
+            try:
+                self.sync_subscriptions()
+                rc = self.conn.client_streaming_quotes.loop(timeout=1.0)
+            except Exception as e:
+                rc = e
+            if rc:
+                print("webull stream disconnected, reconnecting:", rc)
+                self.connected = False
+                time.sleep(5)
+        self.connected = False
+        self.close_clients()
+
+    def on_order(self, topic, data):
+        "StreamConn order callback, platpush has orderId, orderStatus and filledQuantity in data"
+        try:
+            payload = data.get('data', data)
+            order_id = payload.get('orderId')
+            if order_id is None:
+                return
+            for callback in self.order_callbacks:
+                callback(order_id, payload.get('orderStatus'))
+        except Exception as e:
+            print("error in webull order stream:", e)
+
+    def on_price(self, topic, data):
+        "StreamConn price callback, must not raise as StreamConn exits the process"
+        try:
+            symbol = self.tid_symbols.get(str(topic.get('tickerId')))
+            if symbol is None:
+                return
+            quote = self.last.get(symbol)
+            if quote is None:
+                quote = {'symbol': symbol,
+                         'description': str(topic.get('tickerId')),
+                         'askPrice': None,
+                         'bidPrice': None}
+                self.last[symbol] = quote
+            if data.get('askList'):
+                quote['askPrice'] = float(data['askList'][0]['price'])
+            if data.get('bidList'):
+                quote['bidPrice'] = float(data['bidList'][0]['price'])
+            if quote['askPrice'] is None or quote['bidPrice'] is None:
+                return
+            quote['quoteTimeInLong'] = int(data.get('tradeStamp') or time.time()*1000)
+            quote_cache.publish({symbol: dict(quote)})
+        except Exception as e:
+            print("error in webull quote stream:", e)
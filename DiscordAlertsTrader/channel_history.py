@@ -0,0 +1,66 @@
+import os
+import csv
+import threading
+from collections import deque
+
+import pandas as pd
+
+
+class ChannelHistory():
+    """Append-only message history of a channel.
+
+    Each message is written as a single csv row to the end of the file, the file
+    is never rewritten. Only the last `maxlen` messages are kept in memory.
+
+    Parameters
+    ----------
+    fname : str
+        path to the channel history csv, created with header if missing
+    columns : list
+        csv columns, used if the file does not exist yet
+    maxlen : int
+        number of messages kept in memory
+    """
+    def __init__(self, fname, columns, maxlen=1000):
+        self.fname = fname
+        self.lock = threading.Lock()
+        self.tail = deque(maxlen=maxlen)
+
+        if os.path.exists(fname) and os.path.getsize(fname):
+            with open(fname, "r", newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                self.columns = reader.fieldnames or list(columns)
+                self.tail.extend(reader)
+            self.handle = open(fname, "a", newline="", encoding="utf-8")
+        else:
+            self.columns = list(columns)
+            self.handle = open(fname, "w", newline="", encoding="utf-8")
+            csv.writer(self.handle).writerow(self.columns)
+            self.handle.flush()
+        self.writer = csv.DictWriter(self.handle, fieldnames=self.columns, extrasaction='ignore')
+
+    def __len__(self):
+        return len(self.tail)
+
+    def append(self, msg):
+        "Write msg (dict or Series) at the end of the file and keep it in the tail"
+        row = {c: ("" if msg.get(c) is None else msg.get(c)) for c in self.columns}
+        with self.lock:
+            self.writer.writerow(row)
+            self.handle.flush()
+            self.tail.append(row)
+
+    def last(self):
+        "Last message as a Series, None if empty"
+        if not len(self.tail):
+            return None
+        return pd.Series(self.tail[-1])
+
+    def to_frame(self):
+        "In-memory tail as a DataFrame"
+        return pd.DataFrame(list(self.tail), columns=self.columns)
+
+    def close(self):
+        with self.lock:
+            if not self.handle.closed:
+                self.handle.close()
@@ -1,18 +1,24 @@
 
 import os
 import time
+import asyncio
 import pandas as pd
 from datetime import datetime, timezone, date
 import threading
 from colorama import Fore, init
 import discord # this is discord.py-self package not discord
 
-from DiscordAlertsTrader.message_parser import parse_trade_alert
+from DiscordAlertsTrader.message_parser import alert_screen
 from DiscordAlertsTrader.configurator import cfg
 from DiscordAlertsTrader.configurator import channel_ids
 from DiscordAlertsTrader.alerts_trader import AlertsTrader
 from DiscordAlertsTrader.alerts_tracker import AlertsTracker
 from DiscordAlertsTrader.server_alert_formatting import server_formatting
+from DiscordAlertsTrader.channel_history import ChannelHistory
+from DiscordAlertsTrader.alert_dispatcher import AlertDispatcher
+from DiscordAlertsTrader.live_quotes import QuoteRecorder, Watchlist, quote_cache
+from DiscordAlertsTrader.latency import latency
+from DiscordAlertsTrader.brokerages import capabilities
 try:
     from .custom_msg_format import msg_custom_formated, msg_custom_formated2
     print("custom message format loaded")
@@ -44,6 +50,8 @@ class DiscordBot(discord.Client):
                  live_quotes=True, 
                  brokerage=None,
                  tracker_portfolio_fname=cfg['portfolio_names']["tracker_portfolio_name"],
+                 portfolio_fname=cfg['portfolio_names']["portfolio_fname"],
+                 alerts_log_fname=cfg['portfolio_names']["alerts_log_fname"],
                  cfg = cfg):
         super().__init__()
         self.channel_IDS = channel_ids
@@ -52,25 +60,65 @@ class DiscordBot(discord.Client):
         self.bksession = brokerage
         self.live_quotes = live_quotes
         self.cfg = cfg
+        # clock for alert age and option dte, replay sets it to the replayed time
+        self.now = datetime.now
+        # symbols for live quotes, updated by trader and tracker
+        self.watchlist = Watchlist(options_only=self.cfg['general'].getboolean('live_quotes_options_only'))
         if brokerage is not None:
-            self.trader = AlertsTrader(queue_prints=self.queue_prints, brokerage=brokerage, cfg=self.cfg)       
-        self.tracker = AlertsTracker(brokerage=brokerage, portfolio_fname=tracker_portfolio_fname, cfg=self.cfg)
+            self.trader = AlertsTrader(queue_prints=self.queue_prints, brokerage=brokerage, cfg=self.cfg,
+                                       watchlist=self.watchlist, portfolio_fname=portfolio_fname,
+                                       alerts_log_fname=alerts_log_fname)
+        self.tracker = AlertsTracker(brokerage=brokerage, portfolio_fname=tracker_portfolio_fname, cfg=self.cfg,
+                                     watchlist=self.watchlist)
         self.load_data()        
+        if brokerage is not None and brokerage.name == 'webull':
+            # get option ids of the open and today's alerted options before new alerts come
+            threading.Thread(target=brokerage.warm_option_ids, args=(list(self.watchlist.symbols()),),
+                             daemon=True).start()
+        # alerts are processed by workers, tracker and trader updates one at a time
+        self.alerts_lock = threading.Lock()
+        self.dispatcher = AlertDispatcher(self.new_msg_acts, 
+                                          n_workers=int(self.cfg['general']['alert_workers']),
+                                          warn_wait=float(self.cfg['general']['alert_wait_warn']))
+        # alert to order latency stats
+        if len(self.cfg['general']['latency_metrics_file']):
+            latency.start_writer(self.cfg['general']['latency_metrics_file'])
+        if int(self.cfg['general']['latency_metrics_port']):
+            latency.serve(int(self.cfg['general']['latency_metrics_port']))
+
+        # quotes and order updates pushed by the brokerage, symbols not streamed are polled
+        self.stream, self.quote_stream = None, None
+        stream_quotes = cfg['general'].getboolean('stream_quotes') and "stream_quotes" in capabilities(brokerage)
+        stream_orders = cfg['order_configs'].getboolean('stream_orders') and "stream_orders" in capabilities(brokerage)
+        if stream_quotes or stream_orders:
+            self.stream = brokerage.stream()
+            if stream_quotes:
+                self.quote_stream = self.stream
+            if stream_orders:
+                # fills and cancels update their trade right away, polling only reconciles
+                self.stream.order_callbacks.append(self.trader.on_order_event)
+                self.trader.order_reconcile_rate = float(cfg['order_configs']['order_reconcile_rate'])
+            self.stream.start()
 
         if (live_quotes and brokerage is not None and brokerage.name != 'webull') \
             or (brokerage is not None and brokerage.name == 'webull' and 
-                cfg['general'].getboolean('webull_live_quotes')):
+                cfg['general'].getboolean('webull_live_quotes')) or self.quote_stream is not None:
             self.thread_liveq =  threading.Thread(target=self.track_live_quotes)
             self.thread_liveq.start()
 
     def close_bot(self):
+        self.dispatcher.stop()
         if self.bksession is not None:
-            self.trader.update_portfolio = False
+            self.trader.stop()
             self.live_quotes = False
+            if self.stream is not None:
+                self.stream.stop()
+        for ch_hist in self.chn_hist.values():
+            ch_hist.close()
 
     def track_live_quotes(self):
         dir_quotes = self.cfg['general']['data_dir'] + '/live_quotes'
-        os.makedirs(dir_quotes, exist_ok=True)
+        recorder = QuoteRecorder(dir_quotes, float(self.cfg['general']['live_quotes_flush_rate']))
 
         while self.live_quotes:
             # Skip closed market
@@ -78,78 +126,61 @@ class DiscordBot(discord.Client):
             weekday, hour = now.weekday(), now.hour
             after_hr, before_hr = self.cfg['general']['off_hours'].split(",")
             if  weekday >= 5 or (hour < int(before_hr) or hour >= int(after_hr)):  
+                recorder.close()
                 time.sleep(60)
                 continue
 
-            # get unique symbols  from portfolios, either options or all, open or alerted today
-            tk_day = pd.to_datetime(self.tracker.portfolio['Date']).dt.date == date.today()
-            td_day = pd.to_datetime(self.trader.portfolio['Date']).dt.date == date.today()
-            msk_tk = ((self.tracker.portfolio['isOpen']==1) | tk_day) 
-            msk_td = ((self.trader.portfolio['isOpen']==1) | td_day) 
-            
-            if self.cfg['general'].getboolean('live_quotes_options_only'):
-                msk_tk = msk_tk & (self.tracker.portfolio['Asset']=='option')
-                msk_td = msk_td & (self.trader.portfolio['Asset']=='option')
-            
-            track_symb = set(self.tracker.portfolio.loc[msk_tk, 'Symbol'].to_list() + \
-                self.trader.portfolio.loc[msk_td, 'Symbol'].to_list())
+            # unique symbols from portfolios, either options or all, open or alerted today
+            track_symb = self.watchlist.symbols()
             if not len(track_symb):
                 time.sleep(5)
                 continue
-            # save quotes to file
-            try:
-                quote = self.bksession.get_quotes(track_symb)
-            except Exception as e:
-                print('error during live quote:', e)
-                continue
-            if quote is None:
+            # streamed symbols are taken from the quote cache, the rest are polled
+            quote, poll_symb = {}, list(track_symb)
+            if self.quote_stream is not None:
+                self.quote_stream.set_symbols(track_symb)
+                poll_symb = [s for s in track_symb if not self.quote_stream.is_live(s)]
+                for symb in track_symb:
+                    if symb not in poll_symb and quote_cache.get(symb) is not None:
+                        quote[symb] = quote_cache.get(symb)
+            if len(poll_symb):
+                try:
+                    polled = self.bksession.get_quotes(poll_symb)
+                except Exception as e:
+                    print('error during live quote:', e)
+                    continue
+                if polled is not None:
+                    quote_cache.publish(polled)
+                    quote.update(polled)
+            if not len(quote):
                 continue
             
+            # save quotes to file
             for q in quote: 
                 if quote[q].get('description') == 'Symbol not found' or q =='' or quote[q]['bidPrice'] == 0:
                     continue
                 timestamp = quote[q]['quoteTimeInLong']//1000  # in ms
-
-                # Read the last line of the file and get the last recorded timestamp for the symbol
-                file_path = f"{dir_quotes}/{quote[q]['symbol']}.csv"
-                last_line = ""
-                do_header = True
-                if os.path.exists(file_path):
-                    do_header = False
-                    with open(file_path, "r") as f:
-                        lines = f.readlines()
-                        if lines:
-                            last_line = lines[-1].strip()
-                
-                #if last recorded timestamp is the same as current, skip
-                if len(last_line) and float(last_line.split(",")[1] )== quote[q]['bidPrice'] and float(last_line.split(",")[2] )== quote[q]['askPrice']:
-                    continue
-                
-                # Write the new line to the file
-                with open(file_path, "a+") as f:
-                    if do_header:
-                        f.write(f"timestamp, quote, quote_ask\n")
-                    f.write(f"{timestamp}, {quote[q]['bidPrice']}, {quote[q]['askPrice']}\n")
+                # only saved if bid or ask changed
+                recorder.record(quote[q]['symbol'], quote[q]['bidPrice'], quote[q]['askPrice'], timestamp)
             
             # Sleep for up to X secs    
             toc = (datetime.now() - now).total_seconds()
             if toc < float(cfg['general']['sampling_rate_quotes']) and self.live_quotes:
                 time.sleep(float(cfg['general']['sampling_rate_quotes'])-toc)
+        recorder.close()
 
     def load_data(self):
         self.chn_hist= {}
         self.chn_hist_fname = {}
+        hist_cols = self.cfg['col_names']['chan_hist'].split(",")
         for ch in self.channel_IDS.keys():
             dt_fname = f"{self.cfg['general']['data_dir']}/{ch}_message_history.csv"
             if not os.path.exists(dt_fname):
-                ch_dt = pd.DataFrame(columns=self.cfg['col_names']['chan_hist'].split(","))
-                ch_dt.to_csv(dt_fname, index=False)
+                ch_dt = pd.DataFrame(columns=hist_cols)
                 ch_dt.to_csv(f"{self.cfg['general']['data_dir']}/{ch}_message_history_temp.csv", index=False)
-            else:
-                ch_dt = pd.read_csv(dt_fname)
 
             self.chn_hist_fname[ch] = dt_fname
-            self.chn_hist[ch]= ch_dt
+            self.chn_hist[ch]= ChannelHistory(dt_fname, hist_cols)
 
     async def on_ready(self):
         print('Logged on as', self.user , '\n loading previous messages')        
@@ -179,19 +210,20 @@ class DiscordBot(discord.Client):
         if message.content == 'ping':
             await message.channel.send('pong')
          
-        
-        message = server_formatting(message)
+        t_received = time.perf_counter()
+        with latency.span("format"):
+            message = server_formatting(message)
         if custom:
             await msg_custom_formated2(message)
             alert = msg_custom_formated(message, self.bksession)
             if alert is not None:
                 for msg in alert:
-                    self.new_msg_acts(msg, False)
+                    self.dispatch_msg(msg, t_received)
                 return
         
         if not len(message.content):
             return
-        self.new_msg_acts(message)
+        self.dispatch_msg(self.msg_to_series(message), t_received)
 
     # async def on_message_edit(self, before, after):
     #     # Ignore if the message is not from a user or if the bot itself edited the message
@@ -211,7 +243,7 @@ class DiscordBot(discord.Client):
                 continue
             
             if len(self.chn_hist[ch]):
-                msg_last = self.chn_hist[ch].iloc[-1]
+                msg_last = self.chn_hist[ch].last()
                 date_After = datetime.strptime(msg_last.Date, self.time_strf) 
                 iterator = channel.history(after=date_After, oldest_first=True)
             else:
@@ -227,29 +259,43 @@ class DiscordBot(discord.Client):
                     alert = msg_custom_formated(message)
                     if alert is not None:
                         for msg in alert:
-                            self.new_msg_acts(msg, False)
+                            self.dispatch_msg(msg)
                 else:
-                    self.new_msg_acts(message)
+                    self.dispatch_msg(self.msg_to_series(message))
                 # if custom:
                 #     await msg_custom_formated2(message)
+        # wait for the workers to process the history before closing expired
+        await asyncio.get_running_loop().run_in_executor(None, self.dispatcher.join)
         print("Done")        
         self.tracker.close_expired()
 
-    def new_msg_acts(self, message, from_disc=True):
+    def msg_to_series(self, message):
+        "Discord message to a Series with AuthorID, Author, Date, Content and Channel"
+        msg_date = message.created_at.replace(tzinfo=timezone.utc).astimezone(tz=None)
+        msg_date_f = msg_date.strftime(self.time_strf)    
+        if message.channel.id in self.channel_IDS.values():
+            chn_ix = list(self.channel_IDS.values()).index(message.channel.id)
+            chn = list(self.channel_IDS.keys())[chn_ix]
+        else:
+            chn = None
+        msg = pd.Series({'AuthorID': message.author.id,
+                        'Author': f"{message.author.name}#{message.author.discriminator}".replace("#0", ""),
+                        'Date': msg_date_f, 
+                        'Content': message.content,
+                        'Channel': chn
+                        })
+        return msg
+
+    def dispatch_msg(self, msg, t_received=None):
+        "Queue msg for new_msg_acts, parsed by the worker, alerts of the same channel are kept in order"
+        self.dispatcher.submit(msg['Channel'], msg, False, t_received, time.perf_counter())
+
+    def new_msg_acts(self, message, from_disc=True, t_received=None, t_queued=None):
+        "t_received and t_queued are perf_counter times of message arrival and dispatch, for latency stats"
+        if t_queued is not None:
+            latency.record("queue", time.perf_counter() - t_queued)
         if from_disc:
-            msg_date = message.created_at.replace(tzinfo=timezone.utc).astimezone(tz=None)
-            msg_date_f = msg_date.strftime(self.time_strf)    
-            if message.channel.id in self.channel_IDS.values():
-                chn_ix = list(self.channel_IDS.values()).index(message.channel.id)
-                chn = list(self.channel_IDS.keys())[chn_ix]
-            else:
-                chn = None
-            msg = pd.Series({'AuthorID': message.author.id,
-                            'Author': f"{message.author.name}#{message.author.discriminator}".replace("#0", ""),
-                            'Date': msg_date_f, 
-                            'Content': message.content,
-                            'Channel': chn
-                            })
+            msg = self.msg_to_series(message)
         else:
             msg = message
         chn = msg['Channel']
@@ -257,19 +303,20 @@ class DiscordBot(discord.Client):
         self.queue_prints.put([f"\n{shrt_date} {msg['Channel']}: \n\t{msg['Author']}: {msg['Content']} ", "blue"])
         print(Fore.BLUE + f"{shrt_date} \t {msg['Author']}: {msg['Content']} ")
 
-        pars, order =  parse_trade_alert(msg['Content'])
+        with latency.span("parse"):
+            # commentary is rejected by the screen without parsing
+            pars, order = alert_screen.parse(msg['Content'])
         if pars is None:
             if self.chn_hist.get(chn) is not None:
                 msg['Parsed'] = ""
-                self.chn_hist[chn] = pd.concat([self.chn_hist[chn], msg.to_frame().transpose()],axis=0, ignore_index=True)
-                self.chn_hist[chn].to_csv(self.chn_hist_fname[chn], index=False)
+                self.chn_hist[chn].append(msg)
             return
         else:
             if order['asset'] == "option":
                 try:
                     # get option date with year
                     if len(order['expDate'].split("/")) ==2:
-                        exp_dt = datetime.strptime(f"{order['expDate']}/{datetime.now().year}" , "%m/%d/%Y").date()
+                        exp_dt = datetime.strptime(f"{order['expDate']}/{self.now().year}" , "%m/%d/%Y").date()
                     else:
                         if len(order['expDate'].split("/")[-1]) == 2:
                             exp_dt = datetime.strptime(f"{order['expDate']}" , "%m/%d/%y").date()
@@ -281,11 +328,10 @@ class DiscordBot(discord.Client):
                     print(Fore.GREEN + f"\t {str_msg}")
                     msg['Parsed'] = str_msg
                     if self.chn_hist.get(chn) is not None:
-                        self.chn_hist[chn] = pd.concat([self.chn_hist[chn], msg.to_frame().transpose()],axis=0, ignore_index=True)
-                        self.chn_hist[chn].to_csv(self.chn_hist_fname[chn], index=False)
+                        self.chn_hist[chn].append(msg)
                     return
                     
-                dt = datetime.now().date()
+                dt = self.now().date()
                 order['dte'] =  (exp_dt - dt).days
                 if order['dte']<0:
                     str_msg = f"Option date in the past: {order['expDate']}"
@@ -293,13 +339,12 @@ class DiscordBot(discord.Client):
                     print(Fore.GREEN + f"\t {str_msg}")
                     msg['Parsed'] = str_msg
                     if self.chn_hist.get(chn) is not None:
-                        self.chn_hist[chn] = pd.concat([self.chn_hist[chn], msg.to_frame().transpose()],axis=0, ignore_index=True)
-                        self.chn_hist[chn].to_csv(self.chn_hist_fname[chn], index=False)
+                        self.chn_hist[chn].append(msg)
                     return
 
             order['Trader'], order["Date"] = msg['Author'], msg["Date"]
             order_date = datetime.strptime(order["Date"], "%Y-%m-%d %H:%M:%S.%f")
-            date_diff = abs(datetime.now() - order_date)
+            date_diff = abs(self.now() - order_date)
             print(f"time difference is {date_diff.total_seconds()}")
 
             live_alert = True if date_diff.seconds < 90 else False
@@ -323,27 +368,28 @@ class DiscordBot(discord.Client):
                         print(Fore.GREEN + f"\t {str_msg}")
                         msg['Parsed'] = str_msg
                         if self.chn_hist.get(chn) is not None:
-                            self.chn_hist[chn] = pd.concat([self.chn_hist[chn], msg.to_frame().transpose()],axis=0, ignore_index=True)
-                            self.chn_hist[chn].to_csv(self.chn_hist_fname[chn], index=False)
+                            self.chn_hist[chn].append(msg)
                         return
                 
                 str_msg += f" Actual:{quote}, diff {round(act_diff*100)}%"
             self.queue_prints.put([f"\t {str_msg}", "green"])
             print(Fore.GREEN + f"\t {str_msg}")
-            #Tracker
-            if chn != "GUI_user":
-                track_out = self.tracker.trade_alert(order, live_alert, chn)
-                self.queue_prints.put([f"{track_out}", "red"])
-            # Trader
-            do_trade, order = self.do_trade_alert(msg['Author'], msg['Channel'], order)
-            if do_trade and date_diff.seconds < 120:
-                order["Trader"] = msg['Author']
-                self.trader.new_trade_alert(order, pars, msg['Content'])
+            with self.alerts_lock:
+                #Tracker
+                if chn != "GUI_user":
+                    track_out = self.tracker.trade_alert(order, live_alert, chn)
+                    self.queue_prints.put([f"{track_out}", "red"])
+                # Trader
+                do_trade, order = self.do_trade_alert(msg['Author'], msg['Channel'], order)
+                if do_trade and date_diff.seconds < 120:
+                    order["Trader"] = msg['Author']
+                    self.trader.new_trade_alert(order, pars, msg['Content'])
+            if t_received is not None:
+                latency.record("total", time.perf_counter() - t_received)
         
         if self.chn_hist.get(chn) is not None:
             msg['Parsed'] = pars
-            self.chn_hist[chn] = pd.concat([self.chn_hist[chn], msg.to_frame().transpose()],axis=0, ignore_index=True)
-            self.chn_hist[chn].to_csv(self.chn_hist_fname[chn], index=False)
+            self.chn_hist[chn].append(msg)
     
     def do_trade_alert(self, author, channel, order):
         "Decide if alert should be traded"
@@ -0,0 +1,106 @@
+import importlib
+
+
+class FormatterRegistry():
+    """Map discord guild/channel IDs and historical author keys to message formatters.
+
+    Live formatters take a discord message and return the formatted message. They are
+    looked up by guild (priority guilds), then channel, then guild, falling back to
+    `default`.
+
+    Historical formatters take the exported message dict and its date and return
+    the alert content. They are looked up by author key, or by author key prefix.
+    """
+    def __init__(self, default=None):
+        self.default = default
+        self.guilds_first = {}
+        self.channels = {}
+        self.guilds = {}
+        self.authors = {}
+        self.author_prefixes = {}
+
+    def register(self, formatter, channels=(), guilds=(), guild_priority=False):
+        """Register a live formatter for channel and guild ids
+
+        Parameters
+        ----------
+        formatter : callable
+            formatter(message) -> message
+        channels : list
+            channel ids
+        guilds : list
+            guild ids, used for channels of the guild not registered
+        guild_priority : bool
+            if True, used for all channels of the guilds, even if registered
+        """
+        for chn in channels:
+            self.channels[int(chn)] = formatter
+        guild_dict = self.guilds_first if guild_priority else self.guilds
+        for gld in guilds:
+            guild_dict[int(gld)] = formatter
+        return formatter
+
+    def register_hist(self, formatter, authors=(), prefixes=()):
+        """Register a historical formatter for author keys
+
+        Parameters
+        ----------
+        formatter : callable
+            formatter(msg, msg_date) -> content, msg is the exported json message
+        authors : list
+            author keys, e.g. "kent"
+        prefixes : list
+            author key prefixes, e.g. "moneymotive" for "moneymotive_swing"
+        """
+        for author in authors:
+            self.authors[author] = formatter
+        for prefix in prefixes:
+            self.author_prefixes[prefix] = formatter
+        return formatter
+
+    def get(self, message):
+        "Formatter for the discord message"
+        guild_id = message.guild.id
+        formatter = self.guilds_first.get(guild_id)
+        if formatter is None:
+            formatter = self.channels.get(message.channel.id)
+        if formatter is None:
+            formatter = self.guilds.get(guild_id, self.default)
+        return formatter
+
+    def get_hist(self, author):
+        "Historical formatter for the author key, None if not registered"
+        formatter = self.authors.get(author)
+        if formatter is None:
+            for prefix, func in self.author_prefixes.items():
+                if author.startswith(prefix):
+                    return func
+        return formatter
+
+    def format(self, message):
+        "Format message with its registered formatter, DMs are returned unchanged"
+        if message.guild is None:
+            return message
+        formatter = self.get(message)
+        if formatter is None:
+            return message
+        return formatter(message)
+
+    def register_from_cfg(self, formatters_cfg):
+        """Register formatters from config, {"module:function": [channel ids]}
+
+        Guild ids can be given as "guild:<id>"
+        """
+        for func_path, ids in formatters_cfg.items():
+            module, func_name = func_path.split(":")
+            try:
+                formatter = getattr(importlib.import_module(module), func_name)
+            except (ImportError, AttributeError) as e:
+                print(f"Could not load formatter {func_path}:", e)
+                continue
+            channels = [i for i in ids if not str(i).startswith("guild:")]
+            guilds = [str(i).split(":")[1] for i in ids if str(i).startswith("guild:")]
+            self.register(formatter, channels=channels, guilds=guilds)
+
+
+formatters = FormatterRegistry()
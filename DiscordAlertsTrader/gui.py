@@ -21,6 +21,7 @@ from DiscordAlertsTrader.brokerages import get_brokerage
 from DiscordAlertsTrader import gui_generator as gg
 from DiscordAlertsTrader import gui_layouts as gl
 from DiscordAlertsTrader.discord_bot import DiscordBot
+from DiscordAlertsTrader.live_quotes import quote_cache, read_last_line
 from DiscordAlertsTrader.configurator import cfg, channel_ids
 from DiscordAlertsTrader.message_parser import parse_trade_alert, ordersymb_to_str
 # A fix for Macs
@@ -84,8 +85,11 @@ def split_alert_message(gui_msg):
     return author, msg
 
 def get_live_quotes(symbol, tracker, max_delay=2):
+    quote = quote_cache.get(symbol, max_delay)
+    if quote is not None:
+        return [quote['askPrice'], quote['bidPrice']]
+
     dir_quotes = cfg['general']['data_dir'] + '/live_quotes'
-    
     fquote = f"{dir_quotes}/{symbol}.csv"
     if not op.exists(fquote):
         quote = tracker.price_now(symbol, "both")
@@ -93,8 +97,7 @@ def get_live_quotes(symbol, tracker, max_delay=2):
             return None, None        
         return quote
     
-    with open(fquote, "r") as f:
-        quotes = f.readlines()
+    quotes = [read_last_line(fquote)]
     
     now = time.time()
     get_live = False
@@ -146,8 +149,9 @@ def quotes_plotting(symbol, trader=None, tracker=None):
     
     for tt in [trader, tracker]:
         if tt is not None:
-            tts  = tt.portfolio[(tt.portfolio['Symbol'] == symbol) &
-                                (pd.to_datetime(tt.portfolio['Date']).dt.date == datetime.now().date()) ]
+            port = tt.portfolio if tt is tracker else tt.snapshot()
+            tts  = port[(port['Symbol'] == symbol) &
+                        (pd.to_datetime(port['Date']).dt.date == datetime.now().date()) ]
             if len(tts):
                 for ix, row in tts.iterrows():
                     if str(tt.__class__) == "<class 'DiscordAlertsTrader.alerts_tracker.AlertsTracker'>":                        
@@ -13,6 +13,8 @@ import numpy as np
 from .configurator import cfg
 from .alerts_tracker import calc_stc_prices
 from .port_sim import filter_data
+from .live_quotes import quote_cache, read_last_line
+from .portfolio_store import read_table
 
 def short_date(datestr, infrm="%Y-%m-%d %H:%M:%S.%f", outfrm="%Y/%m/%d %H:%M"):
     return datetime.strptime(datestr, infrm).strftime(outfrm)
@@ -84,15 +86,15 @@ def get_portf_data(exclude={}, port_filt_author='', port_filt_date_frm='',
                      port_exc_author="", port_exc_chn="",
                      **kwargs ):
     fname_port = cfg['portfolio_names']['portfolio_fname']
-    if not op.exists(fname_port):
-        return [],[]
     try:
-        data = pd.read_csv(fname_port,sep=",")
+        data = read_table(fname_port)
     except:
         try:
-            data = pd.read_csv(fname_port,sep=",")
+            data = read_table(fname_port)
         except:
             return [],[] 
+    if data is None:
+        return [],[]
     try:
         data = filter_data(data, exclude, 
                             filt_author=port_filt_author,
@@ -188,13 +190,12 @@ def get_tracker_data(exclude={}, track_filt_author='', track_filt_date_frm='',
                      track_dte_max='',
                      track_dte_min='', **kwargs ):
     fname_port = cfg['portfolio_names']['tracker_portfolio_name']
-    if not op.exists(fname_port):
-        return [],[]
-        
     try:
-        data = pd.read_csv(fname_port, sep=",")
+        data = read_table(fname_port)
     except:
         return [[]],[] 
+    if data is None:
+        return [],[]
 
     try:
         data = filter_data(data,exclude, 
@@ -276,11 +277,14 @@ def get_stats_data(exclude={}, stat_filt_author='', stat_filt_date_frm='',
                      fname_port=None,
                      **kwargs ):
     if fname_port is None:
-        fname_port = cfg['portfolio_names']['tracker_portfolio_name']
-    if not op.exists(fname_port):
+        data = read_table(cfg['portfolio_names']['tracker_portfolio_name'])
+    elif op.exists(fname_port):
+        data = pd.read_csv(fname_port, sep=",")
+    else:
+        data = None
+    if data is None:
         return [],[]
     
-    data = pd.read_csv(fname_port, sep=",")
     data['Date'] = data['Date'].apply(lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S.%f").strftime("%Y/%m/%d"))
     exclude['Open'] = True
     try:
@@ -362,16 +366,19 @@ def get_live_quotes(portfolio, trader_port=False):
     
     track_symb = portfolio.loc[msk, 'Symbol'].to_list()
     
+    max_age = float(cfg['general']['quotes_max_age'])
     quotes_sym = {}
     for sym in track_symb: 
+        # fresh quotes from live quote thread, otherwise from file
+        quote = quote_cache.get(sym, max_age)
+        if quote is not None:
+            quotes_sym[sym] = {"ask": quote['askPrice'], "bid": quote['bidPrice']}
+            continue
         fquote = f"{dir_quotes}/{sym}.csv"
         if not op.exists(fquote):
             continue
         
-        with open(fquote, "r") as f:
-            quotes = f.readlines()
-        
-        quote_lst = quotes[-1].split(',')  # in ms
+        quote_lst = read_last_line(fquote).split(',')  # in ms
         try:
             quotes_sym[sym] = {"ask": float(quote_lst[2].replace('\n', '').replace(' ', '')),
                                "bid":float(quote_lst[1].replace('\n', '').replace(' ', ''))
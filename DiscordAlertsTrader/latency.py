@@ -0,0 +1,153 @@
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LatencyTracker():
+    """Durations of the alert to order stages, last `maxlen` of each stage
+
+    Stages recorded by the bot and trader:
+        format: server formatting of the discord message
+        parse: parse_trade_alert
+        queue: wait in the alert dispatcher
+        quote: price quote
+        risk: order checks (notify_alert), until the user is asked to confirm
+        build: make the brokerage order
+        send: send order until brokerage ack
+        fill: from ack to first filled status seen
+        total: from message received to trader done
+
+    Parameters
+    ----------
+    maxlen : int
+        durations kept per stage
+    sent_ttl : float
+        secs a sent order is waited for its fill, orders canceled, rejected or
+        expired are dropped when their status is seen
+    """
+    stages = ["format", "parse", "queue", "quote", "risk", "build", "send", "fill", "total"]
+    quantiles = [0.5, 0.95, 0.99]
+
+    closed = ["CANCELED", "CANCELLED", "REJECTED", "EXPIRED", "FAILED"]
+
+    def __init__(self, maxlen=1000, sent_ttl=6*3600):
+        self.maxlen = maxlen
+        self.sent_ttl = sent_ttl
+        self.spans = {}
+        self.sent = {}  # order id: time ack received, to time the first fill
+        self.lock = threading.Lock()
+
+    def record(self, stage, secs):
+        with self.lock:
+            if stage not in self.spans:
+                self.spans[stage] = deque(maxlen=self.maxlen)
+            self.spans[stage].append(secs)
+
+    @contextmanager
+    def span(self, stage):
+        "Record the duration of the with block"
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0)
+
+    def order_sent(self, order_id):
+        "Mark order as acked by the brokerage, see order_status"
+        now = time.perf_counter()
+        with self.lock:
+            # orders never seen filled or closed
+            self.sent = {k: t for k, t in self.sent.items() if now - t < self.sent_ttl}
+            self.sent[str(order_id)] = now
+
+    def order_status(self, order_id, status):
+        "Record fill time the first time a sent order is seen filled, forget it if closed"
+        if status in ["FILLED", "EXECUTED", "INDIVIDUAL_FILLS"]:
+            with self.lock:
+                t_sent = self.sent.pop(str(order_id), None)
+            if t_sent is not None:
+                self.record("fill", time.perf_counter() - t_sent)
+        elif str(status).upper() in self.closed:
+            with self.lock:
+                self.sent.pop(str(order_id), None)
+
+    def reset(self):
+        "Drop recorded durations, e.g. before a benchmark"
+        with self.lock:
+            self.spans = {}
+            self.sent = {}
+
+    def stats(self):
+        "Count, mean and quantiles in seconds of each recorded stage"
+        with self.lock:
+            spans = {k: sorted(v) for k, v in self.spans.items()}
+        out = {}
+        for stage in self.stages + [s for s in spans if s not in self.stages]:
+            vals = spans.get(stage)
+            if not vals:
+                continue
+            stats = {"count": len(vals), "mean": sum(vals)/len(vals)}
+            for q in self.quantiles:
+                stats[f"p{int(q*100)}"] = vals[min(len(vals) - 1, int(q*len(vals)))]
+            out[stage] = stats
+        return out
+
+    def to_prometheus(self):
+        "Stats in prometheus text format"
+        lines = ["# HELP alert_latency_seconds Alert to order stage latency",
+                 "# TYPE alert_latency_seconds summary"]
+        for stage, stats in self.stats().items():
+            for q in self.quantiles:
+                lines.append(f'alert_latency_seconds{{stage="{stage}",quantile="{q}"}} {stats[f"p{int(q*100)}"]:.6f}')
+            lines.append(f'alert_latency_seconds_sum{{stage="{stage}"}} {stats["mean"]*stats["count"]:.6f}')
+            lines.append(f'alert_latency_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, fname):
+        "Save stats to fname, prometheus text if extension is .prom, json otherwise"
+        if fname.endswith(".prom"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.stats(), indent=1)
+        with open(fname, "w") as f:
+            f.write(content)
+
+    def start_writer(self, fname, every=60):
+        "Write stats to fname every `every` secs in a daemon thread"
+        def writer():
+            while True:
+                time.sleep(every)
+                try:
+                    self.write(fname)
+                except Exception as e:
+                    print("error writing latency metrics:", e)
+        th = threading.Thread(target=writer, name="latency_writer", daemon=True)
+        th.start()
+        return th
+
+    def serve(self, port):
+        "Serve stats in prometheus text format at http://localhost:port/metrics"
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = tracker.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, name="latency_server", daemon=True).start()
+        return server
+
+
+# process-wide latency tracker
+latency = LatencyTracker()
@@ -0,0 +1,239 @@
+import os
+import time
+import threading
+from datetime import date
+
+import pandas as pd
+
+
+def read_last_line(file_path, block=1024):
+    "Read the last line of a file without reading the whole file"
+    with open(file_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if not size:
+            return ""
+        f.seek(max(0, size - block))
+        lines = f.read().decode("utf-8", errors="ignore").strip().splitlines()
+    return lines[-1].strip() if lines else ""
+
+
+class QuoteRecorder():
+    """Save live quotes to data_dir/live_quotes/{symbol}.csv
+
+    The last (bid, ask, timestamp) of each symbol is kept in memory to skip
+    repeated quotes, and files are kept open and flushed every `flush_rate` secs.
+
+    Parameters
+    ----------
+    dir_quotes : str
+        directory of the quote files
+    flush_rate : float
+        seconds between flushes to disk
+    """
+    header = "timestamp, quote, quote_ask\n"
+
+    def __init__(self, dir_quotes, flush_rate=10):
+        self.dir_quotes = dir_quotes
+        self.flush_rate = flush_rate
+        self.last = {}
+        self.handles = {}
+        self.last_flush = time.time()
+        self.lock = threading.Lock()
+        os.makedirs(dir_quotes, exist_ok=True)
+
+    def _open(self, symbol):
+        file_path = f"{self.dir_quotes}/{symbol}.csv"
+        if os.path.exists(file_path) and os.path.getsize(file_path):
+            # get last recorded quote from file, only once
+            last_line = read_last_line(file_path)
+            vals = last_line.split(",")
+            try:
+                self.last[symbol] = (float(vals[1]), float(vals[2]), int(vals[0]))
+            except (ValueError, IndexError):
+                pass
+            handle = open(file_path, "a")
+        else:
+            handle = open(file_path, "a")
+            handle.write(self.header)
+        self.handles[symbol] = handle
+        return handle
+
+    def record(self, symbol, bid, ask, timestamp):
+        """Append quote if bid or ask changed, returns True if recorded"""
+        with self.lock:
+            handle = self.handles.get(symbol)
+            if handle is None:
+                handle = self._open(symbol)
+            last = self.last.get(symbol)
+            recorded = last is None or last[0] != bid or last[1] != ask
+            if recorded:
+                handle.write(f"{timestamp}, {bid}, {ask}\n")
+                self.last[symbol] = (bid, ask, timestamp)
+        # also on repeated quotes, so rows of symbols that stopped changing are written
+        if time.time() - self.last_flush >= self.flush_rate:
+            self.flush()
+        return recorded
+
+    def flush(self):
+        with self.lock:
+            for handle in self.handles.values():
+                handle.flush()
+            self.last_flush = time.time()
+
+    def close(self):
+        with self.lock:
+            for handle in self.handles.values():
+                handle.close()
+            self.handles = {}
+
+
+class Watchlist():
+    """Symbols to track live quotes: open trades and trades alerted today
+
+    Updated by the tracker and trader when trades are opened or closed, so
+    `symbols` is ready without scanning the portfolios.
+
+    Parameters
+    ----------
+    options_only : bool
+        only watch options
+    """
+    def __init__(self, options_only=False):
+        self.options_only = options_only
+        self.open = {}  # (source, portfolio index): symbol
+        self.today = set()  # symbols alerted today
+        self.day = date.today()
+        self._symbols = frozenset()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self, source, portfolio):
+        "Add open trades and trades alerted today from a portfolio"
+        if not len(portfolio):
+            return
+        td_day = pd.to_datetime(portfolio['Date'], errors='coerce').dt.date == self.day
+        msk = (portfolio['isOpen'] == 1) | td_day
+        if self.options_only:
+            msk = msk & (portfolio['Asset'] == 'option')
+        with self.lock:
+            for ix in portfolio.index[msk & (portfolio['isOpen'] == 1)]:
+                self.open[(source, ix)] = portfolio.loc[ix, 'Symbol']
+            self.today.update(portfolio.loc[msk & td_day, 'Symbol'].to_list())
+            self.dirty = True
+
+    def add(self, source, ix, symbol, asset, trade_date=None):
+        "Add an open trade, trade_date is the alert date str"
+        if self.options_only and asset != 'option':
+            return
+        with self.lock:
+            self.open[(source, ix)] = symbol
+            trade_date = pd.to_datetime(trade_date, errors='coerce')
+            if pd.isnull(trade_date) or trade_date.date() == self.day:
+                self.today.add(symbol)
+            self.dirty = True
+
+    def close(self, source, ix):
+        "Remove a closed trade, kept if alerted today"
+        with self.lock:
+            if self.open.pop((source, ix), None) is not None:
+                self.dirty = True
+
+    def symbols(self):
+        "Set of symbols to track"
+        with self.lock:
+            if date.today() != self.day:
+                self.day = date.today()
+                self.today = set()
+                self.dirty = True
+            if self.dirty:
+                self._symbols = frozenset(self.open.values()) | frozenset(self.today)
+                self.dirty = False
+            return self._symbols
+
+
+class QuoteCache():
+    """In-process last quote of each symbol, shared by trader, tracker and gui
+
+    Quotes are published by the live quote thread (or a broker stream) in the
+    bksession.get_quotes format and read with a max age set by each caller.
+    Subscribers get a callback(symbol, quote) for each published quote.
+    """
+    def __init__(self):
+        self.quotes = {}  # symbol: (quote, time received)
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.sub_count = 0
+
+    def publish(self, quotes):
+        "Add quotes, dict of {symbol: quote} as returned by bksession.get_quotes"
+        now = time.time()
+        new = []
+        with self.lock:
+            for symbol, quote in quotes.items():
+                if not symbol or quote is None or quote.get('description') == 'Symbol not found':
+                    continue
+                self.quotes[symbol] = (quote, now)
+                new.append((symbol, quote))
+            subscribers = list(self.subscribers.values())
+        for callback, symbols in subscribers:
+            for symbol, quote in new:
+                if symbols is not None and symbol not in symbols:
+                    continue
+                try:
+                    callback(symbol, quote)
+                except Exception as e:
+                    print("error in quote subscriber:", e)
+
+    def get(self, symbol, max_age=None):
+        "Last quote of symbol if received less than max_age secs ago, None otherwise"
+        with self.lock:
+            item = self.quotes.get(symbol)
+        if item is None:
+            return None
+        quote, received = item
+        if max_age is not None and (max_age <= 0 or time.time() - received > max_age):
+            return None
+        return quote
+
+    def age(self, symbol):
+        "Seconds since last quote of symbol was received, None if never"
+        with self.lock:
+            item = self.quotes.get(symbol)
+        return None if item is None else time.time() - item[1]
+
+    def get_quotes(self, symbols, bksession=None, max_age=None):
+        """Quotes from cache, symbols without a fresh quote are asked to bksession
+
+        Returns dict in the bksession.get_quotes format, None if nothing found
+        """
+        quotes, missing = {}, []
+        for symbol in symbols:
+            quote = self.get(symbol, max_age)
+            if quote is None:
+                missing.append(symbol)
+            else:
+                quotes[symbol] = quote
+        if len(missing) and bksession is not None:
+            resp = bksession.get_quotes(missing)
+            if resp is not None:
+                self.publish(resp)
+                quotes.update(resp)
+        if not len(quotes):
+            return None
+        return quotes
+
+    def subscribe(self, callback, symbols=None):
+        "Call callback(symbol, quote) on new quotes of symbols (all if None), returns subscription id"
+        with self.lock:
+            self.sub_count += 1
+            self.subscribers[self.sub_count] = (callback, None if symbols is None else set(symbols))
+            return self.sub_count
+
+    def unsubscribe(self, sub_id):
+        with self.lock:
+            self.subscribers.pop(sub_id, None)
+
+
+# process-wide quote cache
+quote_cache = QuoteCache()
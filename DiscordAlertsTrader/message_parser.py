@@ -6,20 +6,67 @@ Created on Mon Feb  8 18:11:55 2021
 @author: adonay
 """
 import re
+import threading
 import pandas as pd
 from datetime import datetime
 import numpy as np
 
+# Alert patterns are compiled once. A message is scanned once for the positions of
+# the alert keywords (tokenize), each pattern is then only matched at its keyword positions
+_ALERT_STRIKE_DATE = re.compile(r'\b(BTO|STC|STO|BTC)\b\s*(\d+)?\s*([A-Z]+)\s*(\d+[.\d+]*[cp]?)?\s*(\d{1,2}\/\d{1,2}(?:\/\d{2,4})?)?\s*@\s*[$]*[ ]*(\d+(?:[,.]\d+)?|\.\d+)', re.IGNORECASE)
+_ALERT_DATE_STRIKE = re.compile(r'\b(BTO|STC|STO|BTC)\b\s*(\d+)?\s*([A-Z]+)\s*(\d{1,2}\/\d{1,2}(?:\/\d{2,4})?)?\s*(\d+[.\d+]*[CP]?)?\s*@*[$]*[ ]*(\d+(?:[,.]\d+)?|\.\d+)', re.IGNORECASE)
+_EXIT_UPDATE = re.compile(r'\b(exit[ ]?update)\b\s*([A-Z]+)\s*(\d+[.\d+]*[cp]?)?\s*(\d{1,2}\/\d{1,2})?(?:\/202\d|\/2\d)?\s*', re.IGNORECASE)
+_EXIT_VALUE = r"[:]?[ ]*[$]*(\d*[\.]*[\d]*[%]?)(TS[\d+\.]*[%]?)?"
+_EXITS = [re.compile(r"\s" + expr + _EXIT_VALUE, re.IGNORECASE) for expr in ["PT[1]?", "PT2", "PT3", "SL(?: below)?"]]
+_INV_TS = re.compile(r"invTSbuy [:]?\s*([\d]{1,2}[%]?)", re.IGNORECASE)
+_TS = [re.compile(exp + r"[:]?\s*([\d]{1,2}[%]?)", re.IGNORECASE)
+       for exp in ['tsbuy', 'trailstop', 'trailingstop', 'trailing stop']]
+_AVG = re.compile(r"(?:avg[.]?|new average)[ ]*[$]*(\d+(?:\.\d+)?)", re.IGNORECASE)
+# Keyword scan, only the first char is consumed so overlapping keywords are all found
+# (e.g. tsbuy in invTSbuy). Word boundaries are left to the patterns, the scan only has
+# to find every position they could match
+_TOKENS = re.compile(r"(?P<action>b(?=to|tc)|s(?=tc|to))|(?P<exit_update>e(?=xit[ ]?update))|(?P<exit>\s(?=pt|sl))"
+                     r"|(?P<inv_ts>i(?=nvtsbuy ))|(?P<ts>t(?=sbuy|rail))|(?P<avg>a(?=vg)|n(?=ew average))", re.IGNORECASE)
+# ascii messages are lowercased and scanned without groups nor IGNORECASE, several times
+# faster. The kind is given by the first char
+_TOKENS_ASCII = re.compile(r"b(?=to|tc)|s(?=tc|to)|e(?=xit[ ]?update)|\s(?=pt|sl)|i(?=nvtsbuy )|t(?=sbuy|rail)"
+                           r"|a(?=vg)|n(?=ew average)")
+_TOKEN_KINDS = {'b': 'action', 's': 'action', 'e': 'exit_update', 'i': 'inv_ts', 't': 'ts', 'a': 'avg', 'n': 'avg'}
+
+
+def tokenize(msg):
+    "Positions of the alert keywords in msg, {kind: [positions]}"
+    tokens = {}
+    if msg.isascii():
+        msg_lower = msg.lower()
+        for match in _TOKENS_ASCII.finditer(msg_lower):
+            pos = match.start()
+            tokens.setdefault(_TOKEN_KINDS.get(msg_lower[pos], 'exit'), []).append(pos)
+    else:
+        for match in _TOKENS.finditer(msg):
+            tokens.setdefault(match.lastgroup, []).append(match.start())
+    return tokens
+
+
+def match_at(pattern, msg, positions):
+    "First match of pattern at positions, same as pattern.search if positions has all its keyword positions"
+    for pos in positions:
+        match = pattern.match(msg, pos)
+        if match:
+            return match
+    return None
+
+
 def parse_trade_alert(msg, asset=None):
     # BTO 10 AAPL @ 120
     if msg is not None:
         msg = msg.replace("$", " ").replace("**", "")
-    pattern = r'\b(BTO|STC|STO|BTC)\b\s*(\d+)?\s*([A-Z]+)\s*(\d+[.\d+]*[cp]?)?\s*(\d{1,2}\/\d{1,2}(?:\/\d{2,4})?)?\s*@\s*[$]*[ ]*(\d+(?:[,.]\d+)?|\.\d+)'
-    match = re.search(pattern, msg, re.IGNORECASE)
+    tokens = tokenize(msg)
+    actions = tokens.get('action', [])
+    match = match_at(_ALERT_STRIKE_DATE, msg, actions)
     strike_date = True
     if match is None:
-        pattern = r'\b(BTO|STC|STO|BTC)\b\s*(\d+)?\s*([A-Z]+)\s*(\d{1,2}\/\d{1,2}(?:\/\d{2,4})?)?\s*(\d+[.\d+]*[CP]?)?\s*@*[$]*[ ]*(\d+(?:[,.]\d+)?|\.\d+)'
-        match = re.search(pattern, msg, re.IGNORECASE)
+        match = match_at(_ALERT_DATE_STRIKE, msg, actions)
         strike_date = False
     if match:
         if strike_date:
@@ -49,7 +96,8 @@ def parse_trade_alert(msg, asset=None):
             order['Symbol'] = fix_index_symbols(symbol)
             order['Symbol'] = make_optionID(**order)
 
-        risk_level = parse_risk(msg)
+        msg_lower = msg.lower()
+        risk_level = parse_risk(msg, msg_lower)
         order['risk'] = risk_level
 
         pars = []
@@ -63,22 +111,23 @@ def parse_trade_alert(msg, asset=None):
                 pars += f" {el}"
 
         if action.upper() in ["BTO", "STO"]:
-            if "avg" in msg.lower() or "average" in msg.lower():
-                avg_price, _ = parse_avg(msg)
+            if "avg" in msg_lower or "average" in msg_lower:
+                avg_price, _ = parse_avg(msg, tokens)
                 pars = pars + f"AVG to {avg_price} "
                 order["avg"] = avg_price
             else:
                 order["avg"] = None
 
-            order['open_trailingstop'] = trailingstop(msg)
+            order['open_trailingstop'] = trailingstop(msg, tokens)
             if order.get('open_trailingstop'):
                 pars += f" {order['open_trailingstop']}"
 
             try:
-                pt1_v, pt2_v, pt3_v, sl_v = parse_exits(msg)
+                exits = parse_exits(msg, tokens)
+                pt1_v, pt2_v, pt3_v, sl_v = exits
                 n_pts = 3 if pt3_v else 2 if pt2_v else 1 if pt1_v else 0
                 pts_qty = set_pt_qts(n_pts)
-                order, pars = make_order_exits(order, msg, pars, asset_type)
+                order, pars = make_order_exits(order, msg, pars, asset_type, exits)
                 order["n_PTs"] = n_pts
                 order["PTs_Qty"] = pts_qty
             except:
@@ -88,7 +137,7 @@ def parse_trade_alert(msg, asset=None):
                 order["SL"] = None
 
         elif action.upper() in ["STC", "BTC"]:
-            xamnt = parse_sell_ratio_amount(msg, asset_type)
+            xamnt = parse_sell_ratio_amount(msg, asset_type, msg_lower)
             if order["Qty"] is None:
                 pars = pars + f" xamount: {xamnt}"
             order["xQty"] = xamnt
@@ -96,8 +145,7 @@ def parse_trade_alert(msg, asset=None):
         return pars, order
     else:
         # try exit update
-        pattern = r'\b(exit[ ]?update)\b\s*([A-Z]+)\s*(\d+[.\d+]*[cp]?)?\s*(\d{1,2}\/\d{1,2})?(?:\/202\d|\/2\d)?\s*'
-        match = re.search(pattern, msg, re.IGNORECASE)
+        match = match_at(_EXIT_UPDATE, msg, tokens.get('exit_update', []))
         if match:
             action, ticker, strike, expDate = match.groups()
 
@@ -122,12 +170,13 @@ def parse_trade_alert(msg, asset=None):
                 order['Symbol'] = fix_index_symbols(symbol)
                 order['Symbol'] = make_optionID(**order)
                 str_ext += f"{strike.upper()} {expDate}"
-            order, str_ext = make_order_exits(order, msg, str_ext, asset_type)
+            order, str_ext = make_order_exits(order, msg, str_ext, asset_type, parse_exits(msg, tokens))
 
-            if "isopen:no" in msg.lower():
+            msg_lower = msg.lower()
+            if "isopen:no" in msg_lower:
                 order["isopen"] = False
                 str_ext += " isopen:no"
-            elif "cancelavg" in msg.lower():
+            elif "cancelavg" in msg_lower:
                 order["cancelavg"] = True
                 str_ext += " cancelAvg"
 
@@ -135,6 +184,60 @@ def parse_trade_alert(msg, asset=None):
         return None, None
 
 
+# parse_trade_alert only parses messages with an action word or exit update
+_SCREEN = re.compile(r"\b(?:bto|stc|sto|btc|exit[ ]?update)\b", re.IGNORECASE)
+_SCREEN_ASCII = re.compile(r"\b(?:bto|stc|sto|btc|exit[ ]?update)\b")
+
+
+class AlertScreen():
+    """Cheap check before parse_trade_alert, most channel messages are commentary
+
+    Messages without a BTO, STC, STO, BTC or exit update word are not alerts for
+    parse_trade_alert and are rejected without parsing. Counts screened, passed
+    and parsed (alert) messages, a low hit rate (alerts/passed) means the screen
+    lets through too much chatter.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.screened, self.passed, self.alerts = 0, 0, 0
+
+    def check(self, msg):
+        "False if msg can not be an alert, non str are left to parse_trade_alert"
+        if not isinstance(msg, str):
+            return True
+        # as in parse_trade_alert, "B**TO" is BTO
+        msg = msg.replace("$", " ").replace("**", "")
+        if msg.isascii():
+            return _SCREEN_ASCII.search(msg.lower()) is not None
+        return _SCREEN.search(msg) is not None
+
+    def parse(self, msg, asset=None):
+        "parse_trade_alert of screened messages, (None, None) if rejected"
+        passed = self.check(msg)
+        pars, order = parse_trade_alert(msg, asset) if passed else (None, None)
+        with self.lock:
+            self.screened += 1
+            self.passed += passed
+            self.alerts += pars is not None
+        return pars, order
+
+    def stats(self):
+        "Counts, pass rate (passed/screened) and hit rate (alerts/passed)"
+        with self.lock:
+            screened, passed, alerts = self.screened, self.passed, self.alerts
+        return {"screened": screened, "passed": passed, "alerts": alerts,
+                "pass_rate": passed/screened if screened else None,
+                "hit_rate": alerts/passed if passed else None}
+
+
+# process-wide screen, used by the bot and historical parsing
+alert_screen = AlertScreen()
+
+
 def fix_index_symbols(symbol):
     if symbol.upper() == "SPX":
         symbol = "SPXW"
@@ -143,24 +246,22 @@ def fix_index_symbols(symbol):
     return symbol
 
 
-def trailingstop(msg):
+def trailingstop(msg, tokens=None):
+    "Open trailing stop, invTSbuy or TSbuy (also trailstop, trailingstop), False if none"
+    if tokens is None:
+        tokens = tokenize(msg)
     # inverse TSbuy
-    expc = r"invTSbuy [:]?\s*([\d]{1,2}[%]?)"
-    match = re.search(expc, msg, re.IGNORECASE)
+    match = match_at(_INV_TS, msg, tokens.get('inv_ts', []))
     if match:
         ts = match.groups()[0]
         return f"invTSbuy {ts}"
-    exprs = ['tsbuy', 'trailstop', 'trailingstop', 'trailing stop']
-    for exp in exprs:
-        expc = exp + r"[:]?\s*([\d]{1,2}[%]?)"
-        match = re.search(expc, msg, re.IGNORECASE)
+    for expc in _TS:
+        match = match_at(expc, msg, tokens.get('ts', []))
         if match:
             ts = match.groups()[0]
             return f"TSbuy {ts}"
-
-
-
     return False
+
 def ordersymb_to_str(symbol):
     "Symbol format AAA_YYMMDDCCPXXX"
     if "_" in symbol:
@@ -173,8 +274,9 @@ def ordersymb_to_str(symbol):
     return symbol
 
 
-def make_order_exits(order, msg, str_prt, asset):
-    pt1_v, pt2_v, pt3_v, sl_v = parse_exits(msg)
+def make_order_exits(order, msg, str_prt, asset, exits=None):
+    "exits: (pt1, pt2, pt3, sl) as from parse_exits, parsed from msg if None"
+    pt1_v, pt2_v, pt3_v, sl_v = parse_exits(msg) if exits is None else exits
     if asset == "option":
         order["PT1"] =  set_exit_price_type(pt1_v, order)
         order["PT2"] = set_exit_price_type(pt2_v, order)
@@ -342,34 +444,30 @@ def parse_date(msg):
     date = date_inf.groups()[0]
     return date
 
-def parse_exits(msg):
-    pt1_v = parse_exits_vals(msg, "PT[1]?")
-    pt2_v = parse_exits_vals(msg, "PT2")
-    pt3_v = parse_exits_vals(msg, "PT3")
-    sl_v = parse_exits_vals(msg, "SL(?: below)?")
-    return pt1_v, pt2_v, pt3_v, sl_v
-
-def parse_avg(msg):
-    re_avg = re.compile("(?:avg[.]?|new average)[ ]*[$]*(\d+(?:\.\d+)?)", re.IGNORECASE)
-    avg_inf = re_avg.search(msg.lower())
+def parse_exits(msg, tokens=None):
+    "PT1, PT2, PT3 and SL values, None if not in msg"
+    if tokens is None:
+        tokens = tokenize(msg)
+    positions = tokens.get('exit', [])
+    return tuple(exit_value(match_at(expc, msg, positions)) for expc in _EXITS)
+
+def parse_avg(msg, tokens=None):
+    if tokens is None:
+        tokens = tokenize(msg)
+    avg_inf = match_at(_AVG, msg, tokens.get('avg', []))
     if avg_inf is None:
         return None, None
     avg = float(avg_inf.groups()[-1])
     return avg, avg_inf.span()
 
 def parse_exits_vals(msg, expr):
-    re_comp= re.compile("\s" +expr + "[:]?[ ]*[$]*(\d*[\.]*[\d]*[%]?)(TS[\d+\.]*[%]?)?", re.IGNORECASE)
-    exit_inf = re_comp.search(msg)
+    re_comp= re.compile("\s" +expr + _EXIT_VALUE, re.IGNORECASE)
+    return exit_value(re_comp.search(msg))
 
+def exit_value(exit_inf):
+    "Exit value with its TS if any, from a _EXITS match"
     if exit_inf is None:
-        re_comp= re.compile("(\s" + expr.lower() + "[:]?[ ]*[$]*(\d*[\.]*[\d]*[%]?))", re.IGNORECASE)
-        exit_inf = re_comp.search(msg)
-
-        if exit_inf is None or exit_inf.groups()[-1] =='':
-            return None
-        elif "%" in exit_inf.groups()[-1]:
-            return exit_inf.groups()[-1]
-        return float(exit_inf.groups()[-1].replace("..", ""))
+        return None
     exit_v = exit_inf.group(1) + (exit_inf.group(2) if exit_inf.group(2) else "")
     return exit_v
 
@@ -384,7 +482,22 @@ def parse_unit_amount(msg):
         return round(eval(amnt_inf.groups()[0]), 2)
     return
 
-def parse_sell_ratio_amount(msg, asset):
+_SELL_FRACTION = re.compile(r"(?:sold|sell) (\d\/\d)", re.IGNORECASE)
+_SELL_OF = re.compile(r"(?:sold|sell)(\d of \d)", re.IGNORECASE)
+_SELL_PERCENT = re.compile(r"(?:sold|sell) (\d{1,2})%", re.IGNORECASE)
+_FRACTION_PAREN = re.compile(r"\((\d(?:\/| of )\d)\)")
+_RISKS = {'very high risk':"very high",
+          'risk very high':"very high",
+          'very risky':"very high",
+          'risk high': "high",
+          'high': "high",
+          'lotto': "lotto",
+          'risky': "medium",
+          'yolo':"yolo"}
+
+def parse_sell_ratio_amount(msg, asset, msg_lower=None):
+    if msg_lower is None:
+        msg_lower = msg.lower()
     if "1/3 POS" in msg:
         return .33
     if "1/2 POS" in msg:
@@ -392,41 +505,33 @@ def parse_sell_ratio_amount(msg, asset):
     if "1/4 POS" in msg:
         return .25
     
-    exprs = "(?:sold|sell) (\d\/\d)"
-    re_comp= re.compile(exprs, re.IGNORECASE)
-    amnt_inf = re_comp.search(msg)
+    amnt_inf = _SELL_FRACTION.search(msg)
     if amnt_inf is not None:
         return round(eval(amnt_inf.groups()[0]), 2)
 
-    exprs = "(?:sold|sell)(\d of \d)"
-    re_comp= re.compile(exprs, re.IGNORECASE)
-    amnt_inf = re_comp.search(msg)
+    amnt_inf = _SELL_OF.search(msg)
     if amnt_inf is not None:
         return round(eval(amnt_inf.groups()[0].replace(" of ", "/")), 2)
 
-    exprs = "(?:sold|sell) (\d{1,2})%"
-    re_comp= re.compile(exprs, re.IGNORECASE)
-    amnt_inf = re_comp.search(msg)
+    amnt_inf = _SELL_PERCENT.search(msg)
     if amnt_inf is not None:
         return round(float(amnt_inf.groups()[0])/100, 2)
 
-    if any(subs in msg.lower() for subs in ["half off my remaining position", "selling half off"]):
+    if any(subs in msg_lower for subs in ["half off my remaining position", "selling half off"]):
         return 0.25
 
-    if any(subs in msg.lower() for subs in ["sold half", "sold another half", "half"]):
+    if any(subs in msg_lower for subs in ["sold half", "sold another half", "half"]):
         return 0.5
 
-    exprs = "\((\d(?:\/| of )\d)\)"
-    re_comp= re.compile(exprs)
-    amnt_inf = re_comp.search(msg)
+    amnt_inf = _FRACTION_PAREN.search(msg)
     if amnt_inf is not None:
         return round(eval(amnt_inf.groups()[0].replace(" of ", "/")), 2)
 
     partial = ['scaling out', 'selling more', 'trimming more off', "selling some more", 'trim']
-    if any([True if m in msg.lower() else False for m in partial]):
+    if any(m in msg_lower for m in partial):
         return .25
 
-    if "partial" in msg.lower():
+    if "partial" in msg_lower:
         if asset == "stock":
             amnt = .33
         elif asset == "option":
@@ -435,19 +540,13 @@ def parse_sell_ratio_amount(msg, asset):
         amnt = 1
     return amnt
 
-def parse_risk(msg):
-    risk = {'very high risk':"very high",
-            'risk very high':"very high",
-            'very risky':"very high",
-            'risk high': "high",
-            'high': "high",
-            'lotto': "lotto",
-            'risky': "medium",
-            'yolo':"yolo"}
+def parse_risk(msg, msg_lower=None):
     risk_level = None
     if "BTO" in msg:
-        for k, rsk in risk.items():
-            if k in msg.lower():
+        if msg_lower is None:
+            msg_lower = msg.lower()
+        for k, rsk in _RISKS.items():
+            if k in msg_lower:
                 risk_level = rsk
                 break
     return risk_level
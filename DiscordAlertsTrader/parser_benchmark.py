@@ -0,0 +1,356 @@
+"""Throughput and allocation benchmark of the alert parser and message formatters
+
+Targets:
+    parser: parse_trade_alert of alerts and chatter
+    screen: alert_screen.parse, as used by the bot
+    live: server_formatting + alert_screen.parse of messages of the registered channels
+    formatter:<name>: each registered live formatter
+    hist: parse_hist_msg of an export per registered historical author, also hist:<author>
+
+Messages/sec are normalized by a fixed python/regex workload (calibration), timed
+between the runs of each target, so
+results of different machines can be compared with a saved baseline. A target
+with a normalized score below the baseline by more than the tolerance, or
+allocating more per message, is a regression. The check is not part of the unit
+tests, timing depends on the machine load, run the CLI or set PARSER_BENCHMARK=1.
+Allocations depend on the python version, they are only checked against a baseline
+of the same version.
+
+Usage:
+    python -m DiscordAlertsTrader.parser_benchmark            # report and check baseline
+    python -m DiscordAlertsTrader.parser_benchmark --save     # save median of 3 runs as new baseline
+"""
+import io
+import os
+import re
+import gc
+import copy
+import json
+import time
+import random
+import statistics
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime, timezone
+
+from DiscordAlertsTrader.configurator import cfg
+from DiscordAlertsTrader.message_parser import parse_trade_alert, AlertScreen
+from DiscordAlertsTrader.formatter_registry import formatters
+from DiscordAlertsTrader.server_alert_formatting import server_formatting
+from DiscordAlertsTrader.read_hist_msg import parse_hist_msg
+from DiscordAlertsTrader.port_sim import CustomMessage
+
+baseline_fname = os.path.normpath(os.path.join(cfg['root']['dir'], "..", "tests", "data", "parser_benchmark_baseline.json"))
+
+# alerts as in tests/test_msg_parsed.py and channel styles
+ALERTS = [
+    "BTO DPW @3.7 PT1: 3.72 PT2: 4.39 PT3:5.96 SL: 3.01",
+    "BTO 1 AAPL 190C 07/21 @ 3 PT: 85%TS10% SL: 50%",
+    "BTO 1 TSLA 190C 07/21 @ 3 PT: 3.9TS10% SL: 50%",
+    "BTO 200 CHSN @ 2.57 <@&1050033416185335808> (playing the momentum to upside off VWAP, High Risk low float) ",
+    "BTO 1 COIN 73c 04/06 @ 1.03 @here (Swing) @Cblast Alert",
+    "BTO 10 TSLA 282.5C 07/14 @ 0.96 PT: 125%TS30% SL: 75%",
+    "STC  2 QQQ 297c 3/8 @ .7 @here",
+    "STC 2 SPY 393c 3/20 @ 1.0 @here @EM Alert",
+    "STC 300 POLA @ 1.7",
+    "STC PNC 140c 07/21/2023 @ 1.4 <@&1037722002145935360> ( 79%)",
+    "BTO 5 **SPY** 450P 12/15 @ $1.25 avg 1.1 lotto",
+    "BTO 3 NVDA 500c 1/19 @ 4.5 tsbuy 10% PT1: 6 SL: 3",
+    "STC 1/2 POS AMD 120c 2/2 @ 2.1 sold half",
+    "exit update SPY 400c 3/20 PT1: 2 SL: 1",
+]
+CHATTER_WORDS = ["good", "morning", "watching", "SPY", "level", "stop", "loss", "best", "stock", "today", "market",
+                 "choppy", "until", "FOMC", "stay", "safe", "trade", "small", "nice", "congrats", "calls", "puts",
+                 "@here", "lol", "story", "breakout", "support", "resistance", "VWAP", "entry", "soon", "risk"]
+EMBEDS = [
+    {"title": "Open", "description": "SPY 3/20 400c @ 1.5", "author": {"name": "bot"},
+     "fields": [{"name": "Symbol", "value": "SPY", "inline": True}]},
+    {"title": "ENTRY", "description": "$TSLA 250c @ 3.2 lotto", "author": {"name": "bot"}, "fields": []},
+    {"title": "Trimming", "description": "STC AAPL 190c 7/21 @ 4 trim 1/3", "author": {"name": "bot"}, "fields": []},
+    {"title": "Update", "description": "market looks strong, holding my calls", "author": {"name": "bot"}, "fields": []},
+]
+
+
+def make_corpus(n_chatter=40, seed=0):
+    "Alerts and chatter contents, chatter is 3/4 as in most channels"
+    rnd = random.Random(seed)
+    chatter = [" ".join(rnd.choice(CHATTER_WORDS) for _ in range(rnd.randint(3, 20))) for _ in range(n_chatter)]
+    return ALERTS + chatter
+
+
+def make_messages(contents, channel_id, guild_id=1):
+    "Content and embed messages of a channel"
+    created_at = datetime(2024, 3, 1, 15, tzinfo=timezone.utc)
+    msgs = [CustomMessage(created_at, channel_id, 1, "trader", "0", c, [], guild_id=guild_id) for c in contents]
+    msgs += [CustomMessage(created_at, channel_id, 2, "bot", "0", "", [e], guild_id=guild_id) for e in EMBEDS]
+    return msgs
+
+
+def make_export(contents):
+    "DiscordChatExporter messages"
+    msgs = [{"timestamp": "2024-03-01T15:00:00.000+00:00", "content": c, "embeds": [],
+             "author": {"id": "1", "name": "trader", "discriminator": "0000"}} for c in contents]
+    msgs += [{"timestamp": "2024-03-01T15:00:00.000+00:00", "content": "",
+              "author": {"id": "2", "name": "bot", "discriminator": "0000"},
+              "embeds": [dict(e, fields=[{"name": f["name"], "value": f["value"], "isInline": f["inline"]}
+                                         for f in e["fields"]])]} for e in EMBEDS]
+    return {"guild": {"id": "1"}, "channel": {"id": "2", "name": "benchmark"}, "messages": msgs}
+
+
+def live_formatters():
+    "Registered live formatters with a channel and guild id that selects them"
+    targets = {}
+    for gld, func in formatters.guilds_first.items():
+        targets.setdefault(func, (1, gld))
+    for chn, func in formatters.channels.items():
+        targets.setdefault(func, (chn, 1))
+    for gld, func in formatters.guilds.items():
+        targets.setdefault(func, (1, gld))
+    if formatters.default is not None:
+        targets.setdefault(formatters.default, (1, 1))
+    return targets
+
+
+def handled(func, items):
+    "Items func does not raise on, and number of errors"
+    ok = []
+    for item in items:
+        try:
+            func(copy.deepcopy(item))
+        except Exception:
+            continue
+        ok.append(item)
+    return ok, len(items) - len(ok)
+
+
+_CALIBRATION = re.compile(r"(\d+)\s*([a-z]+)\s*(\d+[cp])?")
+_CALIBRATION_TEXT = "bto 10 aapl 190c 07/21 @ 3 pt1: 4"
+
+
+def _calibration_op(i):
+    match = _CALIBRATION.search(_CALIBRATION_TEXT)
+    fields = {"qty": match.group(1), "words": _CALIBRATION_TEXT.split()}
+    return f"{i} {fields['qty']} {len(fields['words'])}".lower()
+
+
+def timed(func, items, loops, repeat, fresh=None):
+    """Best items/sec of `repeat` runs of `loops` passes over items
+
+    fresh(item) makes the item passed to func before the clock starts, e.g. a copy
+    of messages that func modifies.
+    """
+    best = 0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            run = [fresh(item) for _ in range(loops) for item in items] if fresh else list(items)*loops
+            t0 = time.perf_counter()
+            for item in run:
+                func(item)
+            best = max(best, len(run)/(time.perf_counter() - t0))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best
+
+
+def allocated(func, items, fresh=None):
+    "Mean peak bytes allocated per item"
+    tracemalloc.start()
+    try:
+        total = 0
+        for item in items:
+            item = fresh(item) if fresh else item
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func(item)
+            total += tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+    return total/len(items)
+
+
+def scored(func, items, loops, repeat, fresh=None):
+    """Best items/sec and score, its ratio to the best ops/sec of the calibration workload
+
+    Calibration runs between the timed runs so a busy or throttled machine slows both.
+    """
+    rate = calibration = 0
+    for _ in range(repeat):
+        calibration = max(calibration, timed(_calibration_op, range(1000), 2, 1))
+        rate = max(rate, timed(func, items, loops, 1, fresh))
+    return rate, rate/calibration
+
+
+def measure(func, items, loops, repeat, fresh=None):
+    rate, score = scored(func, items, loops, repeat, fresh)
+    return {"msgs_per_sec": rate, "score": score, "bytes_per_msg": allocated(func, items, fresh),
+            "messages": len(items)}
+
+
+def run_benchmark(targets=None, loops=4, repeat=15):
+    """Measure the targets, all if None
+
+    Parameters
+    ----------
+    targets : list
+        target names, "formatter" and "hist" prefixes select all formatters or authors
+    loops : int
+        passes over the messages per timed run
+    repeat : int
+        timed runs, the best is kept, many short runs are less noisy
+
+    Returns
+    -------
+    results : dict
+        calibration ops/sec and targets {name: msgs_per_sec, score, bytes_per_msg, messages, errors}
+    """
+    def wanted(name):
+        return targets is None or name in targets or name.split(":")[0] in targets
+
+    # warm up, first runs are slower
+    timed(_calibration_op, range(1000), 20, repeat)
+    contents = make_corpus()
+    out = {}
+    # formatters print their matches, not part of the benchmark, and modify the messages, timed on copies
+    with contextlib.redirect_stdout(io.StringIO()):
+        if wanted("parser"):
+            out["parser"] = measure(parse_trade_alert, contents, loops, repeat)
+        if wanted("screen"):
+            out["screen"] = measure(AlertScreen().parse, contents, loops, repeat)
+
+        live_msgs = []
+        for func, (chn, gld) in live_formatters().items():
+            msgs, errors = handled(func, make_messages(contents, chn, gld))
+            live_msgs += msgs
+            name = f"formatter:{func.__name__}"
+            if wanted(name) and len(msgs):
+                out[name] = dict(measure(func, msgs, loops, repeat, copy.deepcopy), errors=errors)
+        if wanted("live"):
+            screen = AlertScreen()
+            def live(message):
+                message = server_formatting(message)
+                if message is not None and message.content:
+                    screen.parse(message.content)
+            out["live"] = measure(live, live_msgs, max(1, loops//4), repeat, copy.deepcopy)
+
+        if targets is None or any(t.split(":")[0] == "hist" for t in targets):
+            out.update(hist_benchmark(contents, targets, max(1, loops//4), repeat))
+
+    return {"calibration": timed(_calibration_op, range(1000), 20, repeat), "targets": out,
+            "python": ".".join(platform.python_version_tuple()[:2])}
+
+
+def hist_benchmark(contents, targets, loops, repeat):
+    "parse_hist_msg of an export per registered author, with the messages its formatter handles"
+    export = make_export(contents)
+    msg_date = datetime(2024, 3, 1, 15)
+    authors = list(formatters.authors) + [f"{p}_benchmark" for p in formatters.author_prefixes]
+    tmp_dir = tempfile.mkdtemp(prefix="parser_benchmark_")
+    out, files = {}, []
+    try:
+        for author in authors:
+            formatter = formatters.get_hist(author)
+            msgs, errors = handled(lambda m: formatter(m, msg_date), export["messages"])
+            if not len(msgs):
+                continue
+            fname = os.path.join(tmp_dir, f"{author}.json")
+            with open(fname, "w", encoding="utf-8") as f:
+                json.dump(dict(export, messages=msgs), f)
+            files.append((fname, author, len(msgs)))
+            name = f"hist:{author}"
+            if targets is not None and name not in targets:
+                continue
+            res = measure(lambda a: parse_hist_msg(fname, a), [author], loops, repeat)
+            out[name] = {"msgs_per_sec": res["msgs_per_sec"]*len(msgs), "score": res["score"]*len(msgs),
+                         "bytes_per_msg": res["bytes_per_msg"]/len(msgs), "messages": len(msgs), "errors": errors}
+        if len(files) and (targets is None or "hist" in targets):
+            n_msgs = sum(n for _, _, n in files)
+            rate, score = scored(lambda fls: [parse_hist_msg(fn, a) for fn, a, _ in fls], [files], loops, repeat)
+            bytes_per_file = allocated(lambda fl: parse_hist_msg(fl[0], fl[1]), files)
+            out["hist"] = {"msgs_per_sec": rate*n_msgs, "score": score*n_msgs,
+                           "bytes_per_msg": bytes_per_file*len(files)/n_msgs, "messages": n_msgs}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out
+
+
+def median_results(runs):
+    "Results with the median of each target value over runs of run_benchmark"
+    out = copy.deepcopy(runs[0])
+    out["calibration"] = statistics.median(r["calibration"] for r in runs)
+    for name, res in out["targets"].items():
+        for key in ["msgs_per_sec", "score", "bytes_per_msg"]:
+            res[key] = statistics.median(r["targets"][name][key] for r in runs)
+    return out
+
+
+def compare(results, baseline, tolerance=0.3, alloc_tolerance=0.5, alloc_slack=1024):
+    """Regressions of results against baseline, as list of str
+
+    A target regresses if its score is below baseline score*(1 - tolerance), or
+    its bytes per message above baseline*(1 + alloc_tolerance) + alloc_slack.
+    Allocations are only compared if both are of the same python version.
+    Targets not in both are ignored.
+    """
+    same_python = results.get("python") == baseline.get("python")
+    regressions = []
+    for name, res in results["targets"].items():
+        base = baseline["targets"].get(name)
+        if base is None:
+            continue
+        if res["score"] < base["score"]*(1 - tolerance):
+            regressions.append(f"{name}: {res['score']/base['score']:.0%} of baseline speed")
+        max_bytes = base["bytes_per_msg"]*(1 + alloc_tolerance) + alloc_slack
+        if same_python and res["bytes_per_msg"] > max_bytes:
+            regressions.append(f"{name}: {res['bytes_per_msg']:.0f} bytes/msg, baseline {base['bytes_per_msg']:.0f}")
+    return regressions
+
+
+def load_baseline(fname=baseline_fname):
+    with open(fname, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(results, fname=baseline_fname):
+    with open(fname, "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+
+def print_results(results, baseline=None):
+    print(f"calibration: {results['calibration']:.0f} ops/sec")
+    print(f"{'target':<42} {'msgs/sec':>10} {'score':>7} {'vs base':>8} {'bytes/msg':>10}")
+    for name, res in results["targets"].items():
+        base = None if baseline is None else baseline["targets"].get(name)
+        vs = f"{res['score']/base['score']:.0%}" if base else ""
+        print(f"{name:<42} {res['msgs_per_sec']:>10.0f} {res['score']:>7.3f} {vs:>8} {res['bytes_per_msg']:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parser and formatters throughput benchmark')
+    parser.add_argument('--baseline', default=baseline_fname, help='baseline json')
+    parser.add_argument('--save', action='store_true', help='save results as new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='fraction slower than baseline that fails')
+    parser.add_argument('--runs', type=int, default=None, help='median of runs, default 3 with --save, else 1')
+    parser.add_argument('--targets', default=None, help='comma separated targets, default all')
+    args = parser.parse_args()
+
+    targets = None if args.targets is None else [t.strip() for t in args.targets.split(",")]
+    n_runs = args.runs or (3 if args.save else 1)
+    results = median_results([run_benchmark(targets) for _ in range(n_runs)])
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else None
+    print_results(results, baseline)
+    if args.save:
+        save_baseline(results, args.baseline)
+        print("baseline saved to", args.baseline)
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for reg in regressions:
+            print("REGRESSION", reg)
+        if len(regressions):
+            raise SystemExit(1)
@@ -629,10 +629,12 @@ def custom_msg_fromdict(message_dict):
 
 #`discord.Message` as `message`
 class CustomMessage:
-    def __init__(self, created_at, channel_id, author_id, author_name, author_discriminator, content, embeds):
+    def __init__(self, created_at, channel_id, author_id, author_name, author_discriminator, content, embeds,
+                 guild_id=None, author_bot=False):
         self.created_at = created_at
         self.channel = CustomChannel(channel_id)
-        self.author = CustomUser(author_id, author_name, author_discriminator)
+        self.guild = CustomGuild(guild_id) if guild_id is not None else None
+        self.author = CustomUser(author_id, author_name, author_discriminator, author_bot)
         self.content = content
         self.embeds = [Customembed(e) for e in embeds]
 
@@ -640,28 +642,36 @@ class CustomChannel:
     def __init__(self, id):
         self.id = id
 
+class CustomGuild:
+    def __init__(self, id):
+        self.id = id
+
 class CustomUser:
-    def __init__(self, id, name, discriminator):
+    def __init__(self, id, name, discriminator, bot=False):
         self.id = id
         self.name = name
         self.discriminator = discriminator
+        self.bot = bot
 
 class Customembed:
+    "Embed from a dict, keys as in discord or DiscordChatExporter (iconUrl, isInline)"
     def __init__(self, embed):
-        self.embed.title = embed['title']
-        self.embed.description = embed['description']
-        self.embed.author = emebed_author(embed['author'])
-        self.embed.fields = [embed_field(f) for f in embed['fields']]
-        
+        self.title = embed.get('title')
+        self.description = embed.get('description')
+        self.author = emebed_author(embed.get('author') or {})
+        self.fields = [embed_field(f) for f in embed.get('fields', [])]
+
 class emebed_author:
-    def __init__(self, embed):
-        self.embed.author.name = embed['name']
-        self.embed.author.url = embed['url']
-        self.embed.author.icon_url = embed['icon_url']
+    def __init__(self, author):
+        self.name = author.get('name')
+        self.url = author.get('url')
+        self.icon_url = author.get('icon_url', author.get('iconUrl'))
+        self.id = None
+        self.discriminator = None
+        self.bot = True
 
 class embed_field:
     def __init__(self, field):
         self.name = field['name']
         self.value = field['value']
-        self.inline = field['inline']
-        
\ No newline at end of file
+        self.inline = field.get('inline', field.get('isInline'))
@@ -0,0 +1,225 @@
+import os
+import os.path as op
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from DiscordAlertsTrader.configurator import cfg
+
+# columns indexed in sqlite tables, if present
+INDEX_COLS = ["Trader", "Symbol", "isOpen", "Date"]
+
+
+def table_name(fname):
+    "Table name from the csv file name, e.g. trader_portfolio"
+    return op.splitext(op.basename(fname))[0]
+
+
+def _sql_value(val):
+    if val is None or (not isinstance(val, str) and pd.isnull(val)):
+        return None
+    if isinstance(val, np.generic):
+        return val.item()
+    if isinstance(val, (pd.Timestamp, datetime)):
+        return str(val)
+    return val
+
+
+class CSVTable():
+    """Portfolio or log stored in a csv, rewritten on each save
+
+    Parameters
+    ----------
+    fname : str
+        path to the csv
+    columns : list
+        columns of the table if the csv does not exist
+    """
+    def __init__(self, fname, columns):
+        self.fname = fname
+        self.columns = list(columns)
+
+    def load(self):
+        "Read the table, created empty if missing"
+        if op.exists(self.fname):
+            return pd.read_csv(self.fname, na_values=[''])
+        df = pd.DataFrame(columns=self.columns)
+        self.save(df)
+        return df
+
+    def save(self, df, rows=None):
+        "Rewrite the csv, rows are ignored"
+        df.to_csv(self.fname, index=False)
+
+
+class SQLiteTable():
+    """Portfolio or log stored in a sqlite table (WAL mode)
+
+    Rows are keyed by the DataFrame index. On save only the rows given as changed
+    and the new rows are upserted, so saving does not rewrite the table. Without
+    changed rows all rows are upserted.
+    The first time a table is opened it is imported from its csv, if it exists.
+
+    Parameters
+    ----------
+    db_fname : str
+        path to the sqlite database
+    fname : str
+        path to the csv of the table, used for the table name and first import
+    columns : list
+        columns of the table if the csv does not exist
+    """
+    def __init__(self, db_fname, fname, columns):
+        self.db_fname = db_fname
+        self.fname = fname
+        self.table = table_name(fname)
+        self.columns = list(columns)
+        self.saved_index = None  # index and columns of the last save, to find new and removed rows
+        self.saved_columns = None
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(db_fname, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+
+    def exists(self):
+        cur = self.con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (self.table,))
+        return cur.fetchone() is not None
+
+    def load(self):
+        "Read the table, imported from csv or created empty if missing"
+        with self.lock:
+            if not self.exists():
+                if op.exists(self.fname):
+                    df = pd.read_csv(self.fname, na_values=[''])
+                else:
+                    df = pd.DataFrame(columns=self.columns)
+                self._create(df)
+            else:
+                df = read_sql_table(self.con, self.table)
+            self.saved_index, self.saved_columns = df.index, list(df.columns)
+        return df
+
+    def _create(self, df):
+        cols = ", ".join(f'"{c}"' for c in df.columns)
+        with self.con:
+            self.con.execute(f'CREATE TABLE "{self.table}" (ix INTEGER PRIMARY KEY, {cols})')
+            for col in INDEX_COLS:
+                if col in df.columns:
+                    self.con.execute(f'CREATE INDEX IF NOT EXISTS "{self.table}_{col}" ON "{self.table}" ("{col}")')
+            self._upsert(df, df.index)
+
+    def _upsert(self, df, rows):
+        if not len(rows):
+            return
+        cols = ", ".join(f'"{c}"' for c in df.columns)
+        marks = ", ".join(["?"] * (len(df.columns) + 1))
+        values = [[int(ix)] + [_sql_value(v) for v in df.loc[ix].values] for ix in rows]
+        self.con.executemany(f'INSERT OR REPLACE INTO "{self.table}" (ix, {cols}) VALUES ({marks})', values)
+
+    def save(self, df, rows=None):
+        """Upsert rows and the new rows, delete rows no longer in df
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            the table
+        rows : list
+            index of the rows changed since last save, None to upsert all rows
+        """
+        with self.lock:
+            if self.saved_index is None:
+                self.saved_index = pd.Index([r[0] for r in self.con.execute(f'SELECT ix FROM "{self.table}"')])
+                self.saved_columns = [r[1] for r in self.con.execute(f'PRAGMA table_info("{self.table}")')
+                                      if r[1] != "ix"]
+            new_cols = [c for c in df.columns if c not in self.saved_columns]
+            with self.con:
+                for col in new_cols:
+                    self.con.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{col}"')
+                if rows is None or len(new_cols) or list(df.columns) != self.saved_columns:
+                    rows = df.index
+                else:
+                    rows = df.index.difference(self.saved_index).union(
+                        pd.Index([r for r in rows if r is not None and r in df.index]))
+                self._upsert(df, rows)
+                removed = self.saved_index.difference(df.index)
+                if len(removed):
+                    self.con.executemany(f'DELETE FROM "{self.table}" WHERE ix=?', [(int(i),) for i in removed])
+            self.saved_index, self.saved_columns = df.index.copy(), list(df.columns)
+
+    def query(self, where="", params=()):
+        """Rows matching a sql where clause, e.g. query('"isOpen"=1 AND "Trader"=?', (trader,))"""
+        with self.lock:
+            return read_sql_table(self.con, self.table, where, params)
+
+
+def read_sql_table(con, table, where="", params=()):
+    sql = f'SELECT * FROM "{table}"'
+    if where:
+        sql += f" WHERE {where}"
+    df = pd.read_sql_query(sql + " ORDER BY ix", con, params=params, index_col="ix")
+    df.index.name = None
+    return df.where(pd.notnull(df), np.nan).infer_objects()
+
+
+def db_path(cfg=cfg):
+    return op.join(cfg['general']['data_dir'], cfg['general']['portfolio_db'])
+
+
+def use_sqlite(cfg=cfg):
+    return cfg['general'].get('portfolio_storage', 'csv').lower() == 'sqlite'
+
+
+def open_table(fname, columns, cfg=cfg):
+    "Table for the portfolio or log csv fname, stored as set in config general.portfolio_storage"
+    if use_sqlite(cfg):
+        return SQLiteTable(db_path(cfg), fname, columns)
+    return CSVTable(fname, columns)
+
+
+def read_table(fname, where="", params=(), cfg=cfg):
+    """Read a portfolio or log without opening it for writing, None if it does not exist
+
+    With sqlite storage, `where` and `params` filter the rows in the query
+    """
+    if use_sqlite(cfg):
+        db_fname = db_path(cfg)
+        if not op.exists(db_fname):
+            return None
+        con = sqlite3.connect(db_fname)
+        try:
+            cur = con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name(fname),))
+            if cur.fetchone() is None:
+                return None
+            return read_sql_table(con, table_name(fname), where, params)
+        finally:
+            con.close()
+    if not op.exists(fname):
+        return None
+    return pd.read_csv(fname, sep=",")
+
+
+def export_csv(out_dir=None, cfg=cfg):
+    """Export the sqlite portfolios and log to csv
+
+    Saved with the configured portfolio names, in out_dir if given
+    """
+    for name in ["portfolio_fname", "alerts_log_fname", "tracker_portfolio_name"]:
+        fname = cfg['portfolio_names'][name]
+        df = read_table(fname, cfg=cfg)
+        if df is None:
+            print(f"{table_name(fname)} not found in {db_path(cfg)}")
+            continue
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+            fname = op.join(out_dir, op.basename(fname))
+        df.to_csv(fname, index=False)
+        print(f"exported {len(df)} rows to {fname}")
+
+
+if __name__ == "__main__":
+    # python -m DiscordAlertsTrader.portfolio_store [out_dir]
+    import sys
+    export_csv(sys.argv[1] if len(sys.argv) > 1 else None)
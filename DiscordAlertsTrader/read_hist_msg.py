@@ -2,7 +2,8 @@ import pandas as pd
 import re
 import json
 from datetime import datetime, timezone, timedelta
-from DiscordAlertsTrader.message_parser import parse_trade_alert
+from DiscordAlertsTrader.message_parser import parse_trade_alert, AlertScreen
+from DiscordAlertsTrader.formatter_registry import formatters
 from DiscordAlertsTrader.server_alert_formatting import (
     format_alert_date_price,
 )
@@ -473,12 +474,65 @@ def theta_warrior_elite(message):
             alert = format_0dte_weeklies(alert, message, False)
     return alert
 
+def demon_formatting(message, message_date):
+    if message['content'].startswith("STC") and "@" not in message['content']:
+        message['content'] += " @ 1"
+    contract = format_0dte_weeklies(message["content"].replace("@Demon alerts", ''), message_date, False)
+    return format_alert_date_price(contract)
+
+def lower_author_formatting(message, message_date=None):
+    message["author"]["name"] = message["author"]["name"].lower()
+    return message["content"]
+
+def vader_formatting(message, message_date=None):
+    message["author"]["name"] = "vader"
+    return message["content"]
+
+
+# Historical formatters by author key, formatter(msg, msg_date) -> content
+def _no_date(formatter):
+    return lambda message, message_date=None: formatter(message)
+
+def _set_author(formatter, name):
+    def wrapper(message, message_date=None):
+        content = formatter(message)
+        message["author"]["name"] = name
+        return content
+    return wrapper
+
+formatters.register_hist(demon_formatting, authors=['demon', 'bryce', 'moustache'])
+formatters.register_hist(_no_date(kent_formatting), authors=["kent"])
+formatters.register_hist(_no_date(sirgoldman_formatting), authors=["sirgoldman"])
+formatters.register_hist(_no_date(flohai_formatting), authors=["flohai_0dte", "flohai_weely"])
+formatters.register_hist(_no_date(tradir_formatting), authors=["tradir"])
+formatters.register_hist(_no_date(bishop_formatting), authors=["bishop"])
+formatters.register_hist(_no_date(flint_formatting), authors=["flint"])
+formatters.register_hist(moneymotive_formatting, prefixes=["moneymotive"])
+formatters.register_hist(_no_date(eclipse_formatting), authors=["eclipse"])
+formatters.register_hist(diesel_formatting, authors=["diesel"])
+formatters.register_hist(oculus_formatting, authors=["oculus"])
+formatters.register_hist(_no_date(bear_formatting), authors=["bear"])
+formatters.register_hist(_no_date(gandalf_formatting), authors=["gandalf"])
+formatters.register_hist(_no_date(jpm_formatting), authors=["jpm"])
+formatters.register_hist(_no_date(theta_warrior_elite), authors=["theta_warrior_elite"])
+formatters.register_hist(makeplays_main_formatting, authors=["makeplays"])
+formatters.register_hist(kingmaker_main_formatting, authors=["kingmaker"])
+formatters.register_hist(lower_author_formatting, authors=["em_alerts", "tpe_team", "em_challenge"])
+formatters.register_hist(vader_formatting, authors=["vader"])
+formatters.register_hist(_set_author(pbt_formatting, "pbt"), authors=["pbt"])
+formatters.register_hist(_set_author(rough_formatting, "rough"), authors=["rough"])
+
+
 def parse_hist_msg(fname, author):
+    formatter = formatters.get_hist(author)
+    if formatter is None:
+        raise ValueError(f"No historical formatter registered for author: {author}")
 
     with open(fname, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
     msgs = []
+    screen = AlertScreen()
     for msg in data["messages"]:
         try:
             msg_date = datetime.strptime(msg['timestamp'], '%Y-%m-%dT%H:%M:%S.%f%z')
@@ -486,59 +540,14 @@ def parse_hist_msg(fname, author):
             msg_date = datetime.strptime(msg['timestamp'], '%Y-%m-%dT%H:%M:%S%z')
         dt_in_est = msg_date.strftime('%m/%d/%Y %H:%M:%S.%f')
         msg_date_ob = datetime.strptime(dt_in_est, '%m/%d/%Y %H:%M:%S.%f')
-        if author in ['demon', 'bryce', 'moustache']:
-            if msg['content'].startswith("STC") and "@" not in msg['content']:
-                msg['content'] += " @ 1"
-            contract = format_0dte_weeklies(msg["content"].replace("@Demon alerts", ''), msg_date_ob, False)
-            content = format_alert_date_price(contract)
-        elif author == "kent":
-            content = kent_formatting(msg)
-        elif author == "sirgoldman":
-            content = sirgoldman_formatting(msg)
-        elif author in ["flohai_0dte", "flohai_weely"]:
-            content = flohai_formatting(msg)
-        elif author == "tradir":
-            content = tradir_formatting(msg)
-        elif author == "bishop":
-            content = bishop_formatting(msg)
-        elif author == "flint":
-            content = flint_formatting(msg)
-        elif author.startswith("moneymotive"):
-            content = moneymotive_formatting(msg, msg_date_ob)
-        elif author == "eclipse":
-            content = eclipse_formatting(msg)
-        elif author == "diesel":
-            content = diesel_formatting(msg, msg_date_ob)
-        elif author == "oculus":
-            content = oculus_formatting(msg, msg_date_ob)
-        elif author == "bear":
-            content = bear_formatting(msg)
-        elif author == "gandalf":
-            content = gandalf_formatting(msg)
-        elif author == "jpm":
-            content = jpm_formatting(msg)
-        elif author == "theta_warrior_elite":
-            content = theta_warrior_elite(msg)
-        elif author == "makeplays":
-            content = makeplays_main_formatting(msg, msg_date_ob)
-        elif author == "kingmaker":
-            content = kingmaker_main_formatting(msg, msg_date_ob)
-        elif author in ["em_alerts", "tpe_team", "em_challenge"]:
-            content = msg["content"]
-            msg["author"]["name"] = msg["author"]["name"].lower()
-        elif author == "vader":
-            content = msg["content"]
-            msg["author"]["name"] = "vader"
-        elif author == "pbt":
-            content = pbt_formatting(msg)
-            msg["author"]["name"] = "pbt"
-        elif author == "rough":
-            content = rough_formatting(msg)
-            msg["author"]["name"] = "rough"
-
-        pars, order = parse_trade_alert(content)
+        content = formatter(msg, msg_date_ob)
+        pars, order = screen.parse(content)
         msgs.append([msg_date.strftime('%m/%d/%Y %H:%M:%S.%f'), msg["author"]["name"], content, pars, msg['content']])
 
+    stats = screen.stats()
+    if stats["screened"]:
+        print(f"{author}: {stats['alerts']} alerts in {stats['screened']} messages, screen passed "
+              f"{stats['passed']} ({stats['pass_rate']:.0%}), hit rate {stats['hit_rate'] or 0:.0%}")
     df = pd.DataFrame(msgs, columns=['Date', 'Author', 'Content', 'parsed', 'original'])
     return df
 
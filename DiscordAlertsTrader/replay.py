@@ -0,0 +1,226 @@
+"""Replay a DiscordChatExporter channel export through the bot, tracker and trader
+
+Messages go through server_formatting and DiscordBot.dispatch_msg/new_msg_acts as if
+received live, orders are sent to the simulated brokerage (see [sim] in config) which
+fills them with the quotes of that time. Reports messages per second, latency of each
+stage and memory growth, used as regression benchmark before upgrades or new channels.
+
+Option alerts without year get the current year in parse_trade_alert, so the quote
+files of exports from past years have to be named with the current year.
+
+Usage:
+    python -m DiscordAlertsTrader.replay export.json --speed 0
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import configparser
+from datetime import datetime, timezone
+
+from DiscordAlertsTrader.configurator import cfg
+from DiscordAlertsTrader.discord_bot import DiscordBot, dummy_queue
+from DiscordAlertsTrader.brokerages.sim_api import SimBroker
+from DiscordAlertsTrader.port_sim import CustomMessage
+from DiscordAlertsTrader.server_alert_formatting import server_formatting
+from DiscordAlertsTrader.latency import latency
+from DiscordAlertsTrader.message_parser import alert_screen
+
+
+def load_export(fname):
+    """Messages of a DiscordChatExporter json export
+
+    Returns
+    -------
+    messages : list
+        CustomMessage oldest first, created_at in UTC
+    channel : str
+        channel name in the export
+    """
+    with open(fname, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    guild_id = data.get('guild', {}).get('id')
+    guild_id = int(guild_id) if guild_id else None
+    channel_id = int(data['channel']['id'])
+    messages = []
+    for msg in data['messages']:
+        author = msg['author']
+        # DiscordChatExporter uses 0000 for users without discriminator
+        discriminator = "0" if author.get('discriminator') in [None, "0000"] else author['discriminator']
+        created_at = datetime.fromisoformat(msg['timestamp']).astimezone(timezone.utc)
+        messages.append(CustomMessage(created_at, channel_id, int(author['id']), author['name'], discriminator,
+                                      msg['content'], msg.get('embeds', []), guild_id=guild_id,
+                                      author_bot=author.get('isBot', False)))
+    messages.sort(key=lambda m: m.created_at)
+    return messages, data['channel'].get('name', str(channel_id))
+
+
+def replay_cfg(out_dir, channel, trade=True):
+    "Copy of cfg writing to out_dir, trading without confirmation or discord notifications"
+    rcfg = configparser.ConfigParser(interpolation=None)
+    rcfg.read_dict({s: dict(cfg.items(s, raw=True)) for s in cfg.sections()})
+    rcfg['general']['data_dir'] = out_dir
+    rcfg['general']['latency_metrics_file'] = ""
+    rcfg['general']['latency_metrics_port'] = "0"
+    rcfg['general']['stream_quotes'] = "false"
+    # cached quotes age in real time, always ask the sim brokerage for the replayed time
+    rcfg['general']['quotes_max_age'] = "0"
+    rcfg['order_configs']['stream_orders'] = "false"
+    rcfg['order_configs']['auto_trade'] = "true"
+    rcfg['discord']['notify_alerts_to_discord'] = "false"
+    if trade:
+        subs = rcfg['discord']['channelwise_subscription']
+        rcfg['discord']['channelwise_subscription'] = f"{subs},{channel}" if len(subs.strip()) else channel
+        rcfg['general']['DO_BTO_TRADES'] = "true"
+        rcfg['general']['DO_STC_TRADES'] = "true"
+    for k, v in rcfg['portfolio_names'].items():
+        rcfg['portfolio_names'][k] = os.path.join(out_dir, os.path.basename(v))
+    return rcfg
+
+
+def replay(fname, speed=0, channel=None, limit=None, dir_quotes=None, out_dir=None, trade=True,
+           trace_memory=True):
+    """Replay exported messages and return the benchmark report
+
+    Parameters
+    ----------
+    fname : str
+        DiscordChatExporter json export of a channel
+    speed : float
+        0 for max speed, 1 for real time, N for N times faster, message waits are divided by speed
+    channel : str
+        channel name for the bot, default is the exported channel name
+    limit : int
+        replay only the first limit messages
+    dir_quotes : str
+        quotes of the sim brokerage, default as in [sim] config
+    out_dir : str
+        portfolios and channel history are saved here, default is a temporary dir removed after
+    trade : bool
+        trade the channel alerts, if False only the tracker and traders subscribed in config
+    trace_memory : bool
+        measure memory growth with tracemalloc, it slows down the replay
+
+    Returns
+    -------
+    report : dict
+        messages, secs, msgs_per_sec, latency and alert screen stats, memory in MB, sim requests,
+        trades and tracked
+    """
+    messages, exp_channel = load_export(fname)
+    if limit is not None:
+        messages = messages[:limit]
+    if not len(messages):
+        raise ValueError(f"No messages in {fname}")
+    channel = exp_channel if channel is None else channel
+    keep_out = out_dir is not None
+    out_dir = tempfile.mkdtemp(prefix="replay_") if out_dir is None else out_dir
+    os.makedirs(out_dir, exist_ok=True)
+    rcfg = replay_cfg(out_dir, channel, trade)
+
+    t0_msg = messages[0].created_at.timestamp()
+    sim = SimBroker(dir_quotes=dir_quotes, start_time=t0_msg, speed=speed or 1)
+    sim.get_session()
+    if trace_memory:
+        tracemalloc.start()
+    bot = DiscordBot(queue_prints=dummy_queue(maxsize=10), live_quotes=False, brokerage=sim,
+                     tracker_portfolio_fname=rcfg['portfolio_names']['tracker_portfolio_name'],
+                     portfolio_fname=rcfg['portfolio_names']['portfolio_fname'],
+                     alerts_log_fname=rcfg['portfolio_names']['alerts_log_fname'],
+                     cfg=rcfg)
+    try:
+        # alert age and dte relative to the replayed time
+        bot.now = lambda: datetime.fromtimestamp(sim.now())
+        for ch_hist in bot.chn_hist.values():
+            ch_hist.close()
+        bot.channel_IDS = {channel: messages[0].channel.id}
+        bot.load_data()
+        if speed:
+            bot.trader.order_update_rate = max(0.5, bot.trader.order_update_rate/speed)
+        latency.reset()
+        alert_screen.reset()
+        mem_start = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+
+        t_start = time.perf_counter()
+        for message in messages:
+            msg_time = message.created_at.timestamp()
+            if speed:
+                wait = (msg_time - t0_msg)/speed - (time.perf_counter() - t_start)
+                if wait > 0:
+                    time.sleep(wait)
+            else:
+                # queued alerts are processed at their time before moving the clock
+                bot.dispatcher.join()
+            sim.set_time(msg_time)
+            t_received = time.perf_counter()
+            with latency.span("format"):
+                message = server_formatting(message)
+            if message is None or not message.content:
+                continue
+            bot.dispatch_msg(bot.msg_to_series(message), t_received)
+        bot.dispatcher.join()
+        # fills of the last orders
+        bot.trader.update_orders()
+        secs = time.perf_counter() - t_start
+
+        report = {"messages": len(messages),
+                  "secs": secs,
+                  "msgs_per_sec": len(messages)/secs,
+                  "latency": latency.stats(),
+                  "screen": alert_screen.stats(),
+                  "sim_requests": sim.n_requests,
+                  "trades": len(bot.trader.snapshot()),
+                  "tracked": len(bot.tracker.portfolio)}
+        if trace_memory:
+            mem_end, mem_peak = tracemalloc.get_traced_memory()
+            report["memory"] = {"start": mem_start/1e6, "end": mem_end/1e6,
+                                "growth": (mem_end - mem_start)/1e6, "peak": mem_peak/1e6}
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        bot.close_bot()
+        if not keep_out:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    return report
+
+
+def print_report(report):
+    print(f"{report['messages']} messages in {report['secs']:.2f} secs, {report['msgs_per_sec']:.1f} msgs/sec")
+    print(f"trades: {report['trades']}, tracked: {report['tracked']}, sim requests: {report['sim_requests']}")
+    screen = report['screen']
+    if screen['screened']:
+        print(f"alert screen: passed {screen['passed']}/{screen['screened']} ({screen['pass_rate']:.0%}), "
+              f"hit rate {screen['hit_rate'] or 0:.0%}")
+    print("stage      count     mean      p50      p95      p99 (ms)")
+    for stage, st in report['latency'].items():
+        print(f"{stage:<8} {st['count']:>7} {st['mean']*1e3:>8.2f} {st['p50']*1e3:>8.2f} "
+              f"{st['p95']*1e3:>8.2f} {st['p99']*1e3:>8.2f}")
+    if "memory" in report:
+        mem = report["memory"]
+        print(f"memory MB: start {mem['start']:.1f}, end {mem['end']:.1f}, "
+              f"growth {mem['growth']:.1f}, peak {mem['peak']:.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a DiscordChatExporter json export against the sim brokerage')
+    parser.add_argument('fname', help='channel export json')
+    parser.add_argument('--speed', type=float, default=0, help='0 max speed, 1 real time, N times faster')
+    parser.add_argument('--channel', default=None, help='channel name, default as in the export')
+    parser.add_argument('--limit', type=int, default=None, help='replay only the first messages')
+    parser.add_argument('--dir_quotes', default=None, help='sim quotes dir, default as in [sim] config')
+    parser.add_argument('--out_dir', default=None, help='keep portfolios and history in this dir')
+    parser.add_argument('--no_trade', action='store_true', help='only track the channel alerts')
+    parser.add_argument('--no_memory', action='store_true', help='do not trace memory, faster')
+    parser.add_argument('--json', default=None, help='also save the report to this json file')
+    args = parser.parse_args()
+
+    report = replay(args.fname, speed=args.speed, channel=args.channel, limit=args.limit,
+                    dir_quotes=args.dir_quotes, out_dir=args.out_dir, trade=not args.no_trade,
+                    trace_memory=not args.no_memory)
+    print_report(report)
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
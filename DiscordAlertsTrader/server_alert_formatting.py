@@ -1,87 +1,13 @@
+import json
 import re
 from datetime import datetime, timedelta
+from DiscordAlertsTrader.configurator import cfg
+from DiscordAlertsTrader.formatter_registry import formatters
 
 def server_formatting(message):
-    """Format server messages to standard alert format"""
-    if  message.guild is None:  # DM
-        return message
-    if message.guild.id == 542224582317441034:
-        message = xtrades_formatting(message)
-    elif message.guild.id in [836435995854897193, 1208184842441719828]:
-        message = tradeproelite_formatting(message)
-    elif message.channel.id in [1235324287703973998, 1235324289222443008, 1235324286437163129]:
-        message = prosperitytrades_formatting(message)
-    elif message.channel.id in [1144658745822035978, 1196385162490032128, 1176558956123013230,
-                                1213995695237763145, 1224336566907044032, 1167905511711178953]:
-        message = eclipse_alerts(message)
-    elif message.channel.id in [1005221780941709312, 1176559103431168001, 1222679083155193867]:
-        message = oculus_alerts(message)
-    elif message.channel.id in [989674163331534929]:
-        message = rough_alerts(message)
-    elif message.channel.id in [1221951275998908527]:
-        message = clutch_trades(message)
-    elif message.channel.id in [972620961004269598]:
-        message = kent_formatting(message)
-    elif message.channel.id in [894421928968871986, 1184315998980022342, 1186220832226283560, 1184315998980022342]:
-        message = sirgoldman_formatting(message)
-    elif message.channel.id in [1090673126527996004, 1132799545491869857, 1106356727294726156,
-                                1135628574511079505, 1184315961726226502, 1184286853734600704, 1225021701281021994]:
-        message = flint_formatting(message)
-    elif message.channel.id in [904543469266161674, 1209644125477933088, 1221952610987147284, ]:
-        message = jpm_formatting(message)
-    elif message.channel.id in [911389167169191946, 1158799914290139188, 1221952209542053949]:
-        message = nitro_formatting(message)
-    elif message.channel.id in [1189288104545226773, 1012144319282556928, 1214378575554150440]:
-        message = moneymotive(message)
-    elif message.channel.id in [728711121128652851]:
-        message = owl_formatting(message)
-    elif message.channel.id in [979906463487103006]:
-        message = bear_alerts(message)
-    elif message.channel.id in [1107395495460081754, 1209855407636488212]:
-        message = diesel_formatting(message)
-    elif message.channel.id in [1204586438679863326,1204586623015067698, 1175535656915705959, 1049137689062035487]:
-        message = makeplays_challenge_formatting(message)
-    elif message.channel.id in [1188201803783876638, 1164747583638491156, 1204596671636443223]:
-        message = makeplays_main_formatting(message)
-    elif message.channel.id in [1195073059770605568, 1175925024503378070, 1168198165250441256]:
-        message = bishop_formatting(message)
-    elif message.channel.id in [897625103020490773]:
-        message = theta_warrior_elite(message)
-    elif message.channel.id in [1152082112032292896, 884971446802219048, 1209855531758395423,1210140760800763914, 1132823605688938567 ]:
-        message = kingmaker_main_formatting(message)
-    elif message.channel.id in [1139700590339969036, 1184315907376431114, 1183711389777399808]:
-        message = ddking_formatting(message)
-    elif message.channel.id in [1102753361566122064, 977025121292259328]:
-        message = crimson_formatting(message)
-    elif message.channel.id in [1209854873344938044]:
-        message = prophet_formatting(message)
-    elif message.channel.id in [1214652173171040256]:
-        message = jpa_formatting(message)
-    elif message.channel.id in [1216951944933933137]:
-        message = prophi_alerts(message)
-    elif message.channel.id in [1272519008180240464]:
-        message = clark_alerts(message)
-    elif message.channel.id in [968629663394058270, 1141877368877760552, 1239936855370108948]:
-        message = wolfwebull_formatting(message)
-    elif message.channel.id in [1187162844362448896, 1189180874265210961]:
-        message = nvstly_alerts(message)
-    elif message.channel.id in [1244040902582865937]:
-        message = cblast_alerts(message)
-    elif message.channel.id in [1286022517869514874]:
-        message = brando_trades(message)
-    elif message.channel.id in [1235324290426081423]:
-        message = chis_formatting(message)
-    elif message.channel.id in [986816019295252500]:
-        message = abi_formatting(message)
-    elif message.channel.id in [872226993557606440]:   
-        message = mikeinvesting_trades(message)
-    elif message.channel.id in [140295293546659840,815942180945920020,1188480300381110272]:
-        message = jb_trades(message)
-    elif message.guild.id in  [826258453391081524, 1093339706260979822,1072553858053701793, 898981804478980166, 682259216861626378]:
-        message = aurora_trading_formatting(message)
-    else:
-        message = embed_to_content(message)
-    return message
+    """Format server messages to standard alert format, formatters are registered
+    by guild and channel id at the end of the module"""
+    return formatters.format(message)
 
 def embed_to_content(message_):
     """Convert embed message to content message"""
@@ -1309,3 +1235,63 @@ class EmbedCopy:
         self.title = original_embed.title
         self.description = original_embed.description
         self.fields = [EmbedFieldCopy(field) for field in original_embed.fields]
+
+
+# Server formatters, guild formatters with priority are used for all the guild channels
+formatters.default = embed_to_content
+formatters.register(xtrades_formatting, guilds=[542224582317441034], guild_priority=True)
+formatters.register(tradeproelite_formatting, guilds=[836435995854897193, 1208184842441719828], guild_priority=True)
+formatters.register(prosperitytrades_formatting, channels=[1235324287703973998,
+                                                           1235324289222443008, 1235324286437163129])
+formatters.register(eclipse_alerts, channels=[1144658745822035978, 1196385162490032128,
+                                              1176558956123013230, 1213995695237763145,
+                                              1224336566907044032, 1167905511711178953])
+formatters.register(oculus_alerts, channels=[1005221780941709312, 1176559103431168001, 1222679083155193867])
+formatters.register(rough_alerts, channels=[989674163331534929])
+formatters.register(clutch_trades, channels=[1221951275998908527])
+formatters.register(kent_formatting, channels=[972620961004269598])
+formatters.register(sirgoldman_formatting, channels=[894421928968871986, 1184315998980022342,
+                                                     1186220832226283560])
+formatters.register(flint_formatting, channels=[1090673126527996004, 1132799545491869857,
+                                                1106356727294726156, 1135628574511079505,
+                                                1184315961726226502, 1184286853734600704,
+                                                1225021701281021994])
+formatters.register(jpm_formatting, channels=[904543469266161674, 1209644125477933088, 1221952610987147284])
+formatters.register(nitro_formatting, channels=[911389167169191946, 1158799914290139188, 1221952209542053949])
+formatters.register(moneymotive, channels=[1189288104545226773, 1012144319282556928, 1214378575554150440])
+formatters.register(owl_formatting, channels=[728711121128652851])
+formatters.register(bear_alerts, channels=[979906463487103006])
+formatters.register(diesel_formatting, channels=[1107395495460081754, 1209855407636488212])
+formatters.register(makeplays_challenge_formatting, channels=[1204586438679863326,
+                                                              1204586623015067698,
+                                                              1175535656915705959,
+                                                              1049137689062035487])
+formatters.register(makeplays_main_formatting, channels=[1188201803783876638, 1164747583638491156,
+                                                         1204596671636443223])
+formatters.register(bishop_formatting, channels=[1195073059770605568, 1175925024503378070,
+                                                 1168198165250441256])
+formatters.register(theta_warrior_elite, channels=[897625103020490773])
+formatters.register(kingmaker_main_formatting, channels=[1152082112032292896, 884971446802219048,
+                                                         1209855531758395423, 1210140760800763914,
+                                                         1132823605688938567])
+formatters.register(ddking_formatting, channels=[1139700590339969036, 1184315907376431114,
+                                                 1183711389777399808])
+formatters.register(crimson_formatting, channels=[1102753361566122064, 977025121292259328])
+formatters.register(prophet_formatting, channels=[1209854873344938044])
+formatters.register(jpa_formatting, channels=[1214652173171040256])
+formatters.register(prophi_alerts, channels=[1216951944933933137])
+formatters.register(clark_alerts, channels=[1272519008180240464])
+formatters.register(wolfwebull_formatting, channels=[968629663394058270, 1141877368877760552,
+                                                     1239936855370108948])
+formatters.register(nvstly_alerts, channels=[1187162844362448896, 1189180874265210961])
+formatters.register(cblast_alerts, channels=[1244040902582865937])
+formatters.register(brando_trades, channels=[1286022517869514874])
+formatters.register(chis_formatting, channels=[1235324290426081423])
+formatters.register(abi_formatting, channels=[986816019295252500])
+formatters.register(mikeinvesting_trades, channels=[872226993557606440])
+formatters.register(jb_trades, channels=[140295293546659840, 815942180945920020, 1188480300381110272])
+formatters.register(aurora_trading_formatting, guilds=[826258453391081524, 1093339706260979822,
+                                                       1072553858053701793, 898981804478980166,
+                                                       682259216861626378])
+# extra formatters from config, {"module:function": [channel ids]}
+formatters.register_from_cfg(json.loads(cfg['discord']['channel_formatters']))
@@ -2,7 +2,10 @@ from datetime import datetime
 from DiscordAlertsTrader.alerts_tracker import AlertsTracker
 from DiscordAlertsTrader.message_parser import parse_trade_alert
 import unittest
+from unittest.mock import MagicMock
 import os
+import shutil
+import tempfile
 
 root_dir  =  os.path.abspath(os.path.dirname(__file__))
 
@@ -38,5 +41,24 @@ class TestAlertsTracker(unittest.TestCase):
         self.assertTrue(round(trade['PnL$']) == 150)
 
 
+    def test_rows_saved(self):
+        data_dir = tempfile.mkdtemp()
+        tracker = AlertsTracker(brokerage=None,
+                                portfolio_fname=os.path.join(data_dir, "tracker_portfolio.csv"),
+                                dir_quotes=root_dir+'/data/live_quotes'
+                                )
+        tracker.portfolio_store = MagicMock()
+        for alert in ["BTO 3 AAPL 100c 8/5 @1.5", "BTO 1 TSLA 200c 8/5/23 @2", "STC 3 AAPL 100c 8/5 @2"]:
+            pars, order =  parse_trade_alert(alert)
+            order["Trader"] = 'test'
+            order['Date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+            tracker.trade_alert(order, live_alert=False, channel=None)
+        # new rows are saved without listing them, only the sold row changed
+        self.assertEqual([c.args[1] for c in tracker.portfolio_store.save.call_args_list], [[], [], [0]])
+        tracker.close_expired()
+        self.assertEqual(tracker.portfolio_store.save.call_args.args[1], [1])
+        shutil.rmtree(data_dir)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -61,6 +61,26 @@ class TestTDA(unittest.TestCase):
         self.assertEqual(order_status, 'FILLED')
         self.assertEqual(order_info['orderStrategyType'], 'SINGLE')
 
+    def test_get_orders_info(self):
+        self.tda.session = MagicMock(spec=TDClient)
+        self.tda.session.get_orders_query.return_value = [
+            {'orderStrategyType': 'SINGLE', 'status': 'WORKING', 'orderId': 1},
+            {'orderStrategyType': 'TRIGGER', 'status': 'FILLED', 'orderId': 2,
+             'orderActivityCollection': [{'quantity': 2, 'executionLegs': [{'price': 1.5}]}],
+             'childOrderStrategies': [{'orderStrategyType': 'SINGLE', 'status': 'WORKING', 'orderId': 3}]},
+            {'orderStrategyType': 'OCO', 'childOrderStrategies': [
+                {'orderStrategyType': 'SINGLE', 'status': 'WORKING', 'orderId': 4},
+                {'orderStrategyType': 'SINGLE', 'status': 'WORKING', 'orderId': 5}]},
+        ]
+        orders_info = self.tda.get_orders_info()
+        # one call for all orders
+        self.tda.session.get_orders_query.assert_called_once()
+        self.tda.session.get_orders.assert_not_called()
+        self.assertEqual({k: v[0] for k, v in orders_info.items()},
+                         {'1': 'WORKING', '2': 'FILLED', '3': 'WORKING', '4': 'WORKING', '5': 'WORKING'})
+        self.assertEqual(orders_info['2'][1]['price'], 1.5)
+        self.assertIs(orders_info['4'][1], orders_info['5'][1])
+
     def test_get_quotes(self):
         self.tda.session = MagicMock(spec=TDClient)
         self.tda.session.get_quotes.return_value = {'symbol': 'AAPL', 'price': 150}
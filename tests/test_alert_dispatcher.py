@@ -0,0 +1,49 @@
+import unittest
+import time
+from unittest.mock import patch
+from DiscordAlertsTrader.alert_dispatcher import AlertDispatcher
+
+
+class TestAlertDispatcher(unittest.TestCase):
+    def test_order_per_key(self):
+        processed = []
+        def handler(key, i):
+            if i % 3 == 0:
+                time.sleep(0.01)
+            processed.append((key, i))
+
+        dispatcher = AlertDispatcher(handler, n_workers=3)
+        keys = [("chan1", "AI"), ("chan1", "SPY"), ("chan2", "AI")]
+        for i in range(30):
+            key = keys[i % 3]
+            dispatcher.submit(key, key, i)
+        dispatcher.join()
+        stats = dispatcher.wait_stats()
+        dispatcher.stop()
+
+        self.assertEqual(len(processed), 30)
+        for key in keys:
+            vals = [i for k, i in processed if k == key]
+            self.assertEqual(vals, sorted(vals))
+        self.assertEqual(stats['count'], 30)
+        self.assertEqual(stats['queued'], 0)
+
+    def test_handler_error(self):
+        processed = []
+        def handler(i):
+            if i == 0:
+                raise ValueError("bad alert")
+            processed.append(i)
+
+        dispatcher = AlertDispatcher(handler, n_workers=1)
+        with patch("traceback.print_exc") as print_exc:
+            dispatcher.submit("chan1", 0)
+            dispatcher.submit("chan1", 1)
+            dispatcher.join()
+        dispatcher.stop()
+        # traceback printed and the next alerts are still processed
+        print_exc.assert_called_once()
+        self.assertEqual(processed, [1])
+
+if __name__ == '__main__':
+    unittest.main()
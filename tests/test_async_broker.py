@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import MagicMock
+import asyncio
+import os
+import queue
+import shutil
+import tempfile
+
+from DiscordAlertsTrader.brokerages import AsyncBaseBroker, capabilities
+from DiscordAlertsTrader.alerts_trader import AlertsTrader
+from DiscordAlertsTrader.configurator import cfg
+
+
+class FakeBroker(AsyncBaseBroker):
+    def __init__(self):
+        self.orders = {"7": ("WORKING", {"order_id": 7}), "8": ("FILLED", {"order_id": 8})}
+        self.calls = []
+
+    def get_session(self):
+        return True
+
+    async def get_quotes_many(self, symbols):
+        self.calls.append(("quotes", symbols))
+        return {s: {"symbol": s, "askPrice": 1.1, "bidPrice": 1.0} for s in symbols}
+
+    async def get_orders_since(self, since):
+        self.calls.append(("since", since))
+        return dict(self.orders)
+
+    async def get_orders_by_id(self, order_ids):
+        self.calls.append(("by_id", order_ids))
+        return {str(o): self.orders[str(o)] for o in order_ids if str(o) in self.orders}
+
+    async def send_orders(self, orders):
+        await asyncio.sleep(0)
+        return [({"status": "WORKING"}, i) for i, _ in enumerate(orders)]
+
+    async def cancel_orders(self, order_ids):
+        self.calls.append(("cancel", order_ids))
+        return ["CANCELED" for _ in order_ids]
+
+
+class TestAsyncBroker(unittest.TestCase):
+    def test_sync_shim(self):
+        bk = FakeBroker()
+        self.assertEqual(bk.get_quotes(["SPY"])["SPY"]["askPrice"], 1.1)
+        self.assertEqual(bk.send_order({"Symbol": "SPY"}), ({"status": "WORKING"}, 0))
+        self.assertEqual(bk.cancel_order(7), "CANCELED")
+        self.assertEqual(bk.get_order_info(8.0), ("FILLED", {"order_id": 8}))
+        self.assertEqual(bk.get_order_info(9), (None, None))
+        # one order asked, not all
+        self.assertEqual([c for c in bk.calls if c[0] in ["since", "by_id"]], [("by_id", [8]), ("by_id", [9])])
+        self.assertIn("batch_cancel", capabilities(bk))
+        self.assertEqual(capabilities(MagicMock(spec=[])), frozenset())
+
+    def test_trader_uses_batch(self):
+        data_dir = tempfile.mkdtemp()
+        bk = FakeBroker()
+        trader = AlertsTrader(bk,
+                              portfolio_fname=os.path.join(data_dir, "test_trader_portfolio.csv"),
+                              alerts_log_fname=os.path.join(data_dir, "test_trader_log.csv"),
+                              update_portfolio=False,
+                              queue_prints=queue.Queue(maxsize=50),
+                              cfg=cfg)
+        try:
+            trader.fetch_orders_info()
+            self.assertEqual(trader.get_order_info(7.0), ("WORKING", {"order_id": 7}))
+            self.assertEqual(trader.cancel_orders([7, 8]), ["CANCELED", "CANCELED"])
+            self.assertNotIn("7", trader.orders_snapshot)
+            self.assertEqual(bk.calls, [("since", -5), ("cancel", [7, 8])])
+        finally:
+            trader.stop()
+            shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
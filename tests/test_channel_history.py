@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+from DiscordAlertsTrader.channel_history import ChannelHistory
+
+
+columns = ["AuthorID", "Author", "Date", "Content", "Parsed"]
+
+class TestChannelHistory(unittest.TestCase):
+    def setUp(self):
+        self.dir_hist = tempfile.mkdtemp()
+        self.fname = os.path.join(self.dir_hist, "channel_1_message_history.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_hist)
+
+    def msg(self, n):
+        return pd.Series({"AuthorID": 123, "Author": "JonP", "Date": f"2023-12-01 10:00:0{n}.000000",
+                          "Content": f"BTO {n} AI 25c 12/09 @ 1, swinging", "Parsed": None})
+
+    def test_header_created(self):
+        hist = ChannelHistory(self.fname, columns)
+        hist.close()
+        self.assertEqual(len(hist), 0)
+        self.assertIsNone(hist.last())
+        with open(self.fname, newline="") as f:
+            self.assertEqual(f.readlines(), ["AuthorID,Author,Date,Content,Parsed\r\n"])
+
+    def test_append_after_reopen(self):
+        hist = ChannelHistory(self.fname, columns)
+        hist.append(self.msg(1))
+        hist.close()
+
+        hist = ChannelHistory(self.fname, columns)
+        self.assertEqual(hist.last()["Date"], "2023-12-01 10:00:01.000000")
+        hist.append(self.msg(2))
+        hist.close()
+
+        hist_file = pd.read_csv(self.fname)
+        self.assertEqual(hist_file.columns.tolist(), columns)
+        self.assertEqual(hist_file["Content"].tolist(), ["BTO 1 AI 25c 12/09 @ 1, swinging",
+                                                         "BTO 2 AI 25c 12/09 @ 1, swinging"])
+        self.assertTrue(hist_file["Parsed"].isnull().all())
+
+    def test_bounded_tail(self):
+        hist = ChannelHistory(self.fname, columns, maxlen=3)
+        for n in range(5):
+            hist.append(self.msg(n))
+        hist.close()
+        self.assertEqual(len(hist), 3)
+        self.assertEqual(hist.to_frame()["Date"].tolist(), [f"2023-12-01 10:00:0{n}.000000" for n in range(2, 5)])
+        # all messages are in the file, only the tail is loaded
+        self.assertEqual(len(pd.read_csv(self.fname)), 5)
+        hist = ChannelHistory(self.fname, columns, maxlen=2)
+        hist.close()
+        self.assertEqual(hist.to_frame()["Date"].tolist(), [f"2023-12-01 10:00:0{n}.000000" for n in range(3, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
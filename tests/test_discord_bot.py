@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import pandas as pd
 import os
 from datetime import datetime, timedelta
@@ -93,5 +93,32 @@ class TestDiscordBot(unittest.TestCase):
         # Delete the generated file
         os.remove(self.tracker_portfolio_fname)
 
+    def test_dispatch_msg_parses_in_worker(self):
+        self.tracker_portfolio_fname=root_dir+"/data/test_tracker_portfolio.csv"
+        queue_prints = MagicMock()
+        bot = DiscordBot(queue_prints=queue_prints, live_quotes=False, brokerage=None,
+                         tracker_portfolio_fname=self.tracker_portfolio_fname)
+        expdate = datetime.now().strftime("%m/%d")
+        message = pd.Series({'AuthorID': None,
+                            'Author': "JonP",
+                            'Date': "2022-01-01 10:00:00.000000",
+                            'Content': f'BTO 5 AI 25c {expdate} @ 1 <@&940418825235619910> swinging',
+                            'Channel': "channel 1"
+                            })
+        with patch.object(bot.dispatcher, "submit") as submit, \
+                patch("DiscordAlertsTrader.discord_bot.alert_screen.parse") as parse:
+            bot.dispatch_msg(message)
+        # the event loop only queues, the worker parses
+        parse.assert_not_called()
+        self.assertEqual(submit.call_args[0][0], "channel 1")
+
+        bot.dispatch_msg(message)
+        bot.dispatcher.join()
+        self.assertEqual(bot.tracker.portfolio['Symbol'].iloc[-1], f"AI_{expdate.replace('/', '')}{datetime.now().strftime('%y')}C25")
+        bot.dispatcher.stop()
+
+        # Delete the generated file
+        os.remove(self.tracker_portfolio_fname)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from types import SimpleNamespace
+from DiscordAlertsTrader.formatter_registry import FormatterRegistry
+from DiscordAlertsTrader import server_alert_formatting as saf
+from DiscordAlertsTrader.read_hist_msg import parse_hist_msg, moneymotive_formatting
+
+
+def make_msg(guild_id, channel_id):
+    guild = None if guild_id is None else SimpleNamespace(id=guild_id)
+    return SimpleNamespace(guild=guild, channel=SimpleNamespace(id=channel_id))
+
+def first(message):
+    return "first"
+
+def channel(message):
+    return "channel"
+
+def guild(message):
+    return "guild"
+
+def default(message):
+    return "default"
+
+
+class TestFormatterRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = FormatterRegistry(default=default)
+        self.registry.register(channel, channels=[10, 20])
+        self.registry.register(guild, guilds=[2])
+        self.registry.register(first, guilds=[1], guild_priority=True)
+
+    def test_priority(self):
+        # guilds_first > channels > guilds > default
+        self.assertEqual(self.registry.format(make_msg(1, 10)), "first")
+        self.assertEqual(self.registry.format(make_msg(2, 10)), "channel")
+        self.assertEqual(self.registry.format(make_msg(2, 11)), "guild")
+        self.assertEqual(self.registry.format(make_msg(3, 11)), "default")
+        # DMs are not formatted
+        dm = make_msg(None, 10)
+        self.assertIs(self.registry.format(dm), dm)
+
+    def test_server_priority(self):
+        # xtrades guild is used over kent channel
+        self.assertIs(saf.formatters.get(make_msg(542224582317441034, 972620961004269598)), saf.xtrades_formatting)
+        self.assertIs(saf.formatters.get(make_msg(3, 972620961004269598)), saf.kent_formatting)
+        self.assertIs(saf.formatters.get(make_msg(3, 11)), saf.embed_to_content)
+
+    def test_cfg_override(self):
+        self.registry.register_from_cfg({
+            "DiscordAlertsTrader.server_alert_formatting:kent_formatting": [20, "guild:1"],
+            "DiscordAlertsTrader.server_alert_formatting:missing": [11],
+            "not_a_module:channel": [11],
+            })
+        self.assertIs(self.registry.get(make_msg(3, 20)), saf.kent_formatting)
+        self.assertEqual(self.registry.format(make_msg(3, 10)), "channel")
+        # cfg guilds do not take priority over guilds_first
+        self.assertEqual(self.registry.format(make_msg(1, 11)), "first")
+        self.assertIs(self.registry.guilds[1], saf.kent_formatting)
+        # formatters that can not be loaded are skipped
+        self.assertNotIn(11, self.registry.channels)
+
+    def test_hist_lookup(self):
+        self.assertIs(saf.formatters.get_hist("moneymotive_swing"), moneymotive_formatting)
+        self.assertIsNone(saf.formatters.get_hist("nobody"))
+        with self.assertRaises(ValueError):
+            parse_hist_msg("not_read.json", "nobody")
+
+
+if __name__ == '__main__':
+    unittest.main()
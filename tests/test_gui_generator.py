@@ -1,9 +1,12 @@
 import os
-
+import shutil
+import tempfile
 import unittest
 import pandas as pd
 import numpy as np
-from DiscordAlertsTrader.gui_generator import get_stats_data
+from datetime import datetime
+from DiscordAlertsTrader.gui_generator import get_stats_data, get_live_quotes
+from DiscordAlertsTrader.live_quotes import quote_cache
 from DiscordAlertsTrader.configurator import cfg
 from DiscordAlertsTrader.alerts_tracker import calc_stc_prices
 
@@ -61,5 +64,27 @@ class TestConfigurator(unittest.TestCase):
         # Delete the generated file
         os.remove(fname_port)
 
+    def test_get_live_quotes_stale_cache(self):
+        data_dir = cfg['general']['data_dir']
+        cfg['general']['data_dir'] = tempfile.mkdtemp()
+        os.makedirs(cfg['general']['data_dir'] + '/live_quotes')
+        sym = "AI_120923C25"
+        with open(cfg['general']['data_dir'] + f'/live_quotes/{sym}.csv', "w") as f:
+            f.write("timestamp, quote, quote_ask\n1700000000, 1.0, 1.1\n")
+        port = pd.DataFrame({"Date": [datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")],
+                             "Symbol": [sym], "Type": ["BTO"], "isOpen": [0]})
+        try:
+            # fresh quote from cache
+            quote_cache.publish({sym: {"askPrice": 2.1, "bidPrice": 2.0}})
+            self.assertEqual(get_live_quotes(port.copy()).loc[0, 'Live'], 2.0)
+            # stale quote, read from file
+            quote, received = quote_cache.quotes[sym]
+            quote_cache.quotes[sym] = (quote, received - float(cfg['general']['quotes_max_age']) - 1)
+            self.assertEqual(get_live_quotes(port.copy()).loc[0, 'Live'], 1.0)
+        finally:
+            quote_cache.quotes.pop(sym, None)
+            shutil.rmtree(cfg['general']['data_dir'])
+            cfg['general']['data_dir'] = data_dir
+
 if __name__ == '__main__':
     unittest.main()
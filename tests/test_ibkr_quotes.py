@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import MagicMock
+from types import SimpleNamespace
+from datetime import datetime
+from DiscordAlertsTrader.brokerages.ibkr_api import IBKR
+
+
+class TestIBKRQuotes(unittest.TestCase):
+    def setUp(self):
+        self.ibkr = IBKR()
+        self.ibkr.ib = MagicMock()
+        self.ibkr.ib.isConnected.return_value = True
+        self.ibkr.ib.reqMktData.side_effect = lambda contract, *args: SimpleNamespace(
+            contract=contract, bid=1.0, ask=1.2, time=datetime(2024, 5, 1, 15))
+        self.ibkr.get_con_id = MagicMock(side_effect=lambda symbol: hash(symbol))
+        self.ibkr.max_lines = 2
+
+    def test_subscriptions_kept(self):
+        quotes = self.ibkr.get_quotes(["NFLX_051724C450"])
+        self.assertEqual(quotes["NFLX_051724C450"]["askPrice"], 1.2)
+        self.assertAlmostEqual(quotes["NFLX_051724C450"]["midPrice"], 1.1)
+        self.ibkr.get_quotes(["NFLX_051724C450"])
+        self.assertEqual(self.ibkr.ib.reqMktData.call_count, 1)
+        self.assertEqual(self.ibkr.get_con_id.call_count, 1)
+
+    def test_release_least_recent(self):
+        self.ibkr.get_quotes(["SPY"])
+        self.ibkr.get_quotes(["QQQ"])
+        self.ibkr.get_quotes(["SPY"])
+        # over the lines limit, QQQ was asked last the longest ago
+        self.ibkr.get_quotes(["AAPL"])
+        self.assertEqual(set(self.ibkr.tickers), {"SPY", "AAPL"})
+        self.ibkr.ib.cancelMktData.assert_called_once()
+
+        # idle subscriptions released
+        self.ibkr.last_asked["SPY"] -= self.ibkr.idle_secs + 1
+        self.ibkr.get_quotes(["AAPL"])
+        self.assertEqual(set(self.ibkr.tickers), {"AAPL"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from DiscordAlertsTrader.latency import LatencyTracker
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_stats(self):
+        tracker = LatencyTracker(maxlen=100)
+        for i in range(200):
+            tracker.record("parse", i/1000)
+        stats = tracker.stats()["parse"]
+        # only last 100 kept
+        self.assertEqual(stats["count"], 100)
+        self.assertEqual(stats["p50"], 0.15)
+        self.assertEqual(stats["p99"], 0.199)
+
+    def test_fill_recorded_once(self):
+        tracker = LatencyTracker()
+        tracker.order_status(1, "FILLED")
+        self.assertNotIn("fill", tracker.stats())
+        tracker.order_sent(1.0)
+        tracker.order_status(1.0, "WORKING")
+        tracker.order_status(1.0, "FILLED")
+        tracker.order_status(1.0, "FILLED")
+        self.assertEqual(tracker.stats()["fill"]["count"], 1)
+
+    def test_sent_evicted(self):
+        tracker = LatencyTracker(sent_ttl=60)
+        tracker.order_sent(1)
+        tracker.order_sent(2)
+        tracker.order_status(1, "CANCELED")
+        tracker.order_status(2, "Cancelled")
+        self.assertEqual(tracker.sent, {})
+        tracker.order_sent(3)
+        tracker.sent["3"] -= 61
+        tracker.order_sent(4)
+        self.assertEqual(list(tracker.sent), ["4"])
+
+    def test_write(self):
+        tracker = LatencyTracker()
+        with tracker.span("send"):
+            pass
+        out_dir = tempfile.mkdtemp()
+        try:
+            tracker.write(os.path.join(out_dir, "latency.json"))
+            with open(os.path.join(out_dir, "latency.json")) as f:
+                self.assertEqual(json.load(f)["send"]["count"], 1)
+            tracker.write(os.path.join(out_dir, "latency.prom"))
+            with open(os.path.join(out_dir, "latency.prom")) as f:
+                self.assertIn('alert_latency_seconds_count{stage="send"} 1', f.read())
+        finally:
+            shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+from datetime import datetime
+from unittest.mock import MagicMock
+from DiscordAlertsTrader.live_quotes import QuoteRecorder, Watchlist, QuoteCache
+
+
+class TestQuoteRecorder(unittest.TestCase):
+    def setUp(self):
+        self.dir_quotes = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_quotes)
+
+    def test_record_skips_repeated(self):
+        recorder = QuoteRecorder(self.dir_quotes, flush_rate=0)
+        self.assertTrue(recorder.record("AI_120923C25", 1.0, 1.1, 1700000000))
+        self.assertFalse(recorder.record("AI_120923C25", 1.0, 1.1, 1700000005))
+        self.assertTrue(recorder.record("AI_120923C25", 1.05, 1.1, 1700000010))
+        recorder.close()
+
+        with open(os.path.join(self.dir_quotes, "AI_120923C25.csv")) as f:
+            lines = f.readlines()
+        self.assertEqual(lines, ["timestamp, quote, quote_ask\n",
+                                 "1700000000, 1.0, 1.1\n",
+                                 "1700000010, 1.05, 1.1\n"])
+
+        # last quote is read from file when reopened
+        recorder = QuoteRecorder(self.dir_quotes, flush_rate=0)
+        self.assertFalse(recorder.record("AI_120923C25", 1.05, 1.1, 1700000015))
+        recorder.close()
+
+    def test_flush_on_repeated(self):
+        recorder = QuoteRecorder(self.dir_quotes, flush_rate=60)
+        self.assertTrue(recorder.record("AI_120923C25", 1.0, 1.1, 1700000000))
+        fname = os.path.join(self.dir_quotes, "AI_120923C25.csv")
+        self.assertEqual(os.path.getsize(fname), 0)
+        # quote stopped changing, buffered rows are written at the next flush time
+        recorder.last_flush -= 60
+        self.assertFalse(recorder.record("AI_120923C25", 1.0, 1.1, 1700000005))
+        with open(fname) as f:
+            self.assertEqual(f.readlines(), ["timestamp, quote, quote_ask\n", "1700000000, 1.0, 1.1\n"])
+        recorder.close()
+
+class TestWatchlist(unittest.TestCase):
+    def test_open_close(self):
+        today = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+        port = pd.DataFrame({"Date": ["2022-01-01 10:00:00.000000", "2022-01-01 10:00:00.000000", today],
+                             "Symbol": ["AI_120923C25", "SPY", "QQQ_051223C327"],
+                             "Asset": ["option", "stock", "option"],
+                             "isOpen": [1, 0, 0]})
+        watchlist = Watchlist(options_only=True)
+        watchlist.load("tracker", port)
+        self.assertEqual(watchlist.symbols(), {"AI_120923C25", "QQQ_051223C327"})
+
+        watchlist.add("trader", 0, "TSLA_120923C250", "option", "2022-01-01 10:00:00.000000")
+        watchlist.add("trader", 1, "TSLA", "stock", today)
+        self.assertEqual(watchlist.symbols(), {"AI_120923C25", "QQQ_051223C327", "TSLA_120923C250"})
+
+        watchlist.close("tracker", 0)
+        watchlist.close("trader", 0)
+        self.assertEqual(watchlist.symbols(), {"QQQ_051223C327"})
+
+class TestQuoteCache(unittest.TestCase):
+    def test_cache_and_subscribe(self):
+        cache = QuoteCache()
+        received = []
+        cache.subscribe(lambda sym, q: received.append(sym), symbols=["AI"])
+        cache.publish({"AI": {"symbol": "AI", "askPrice": 1.1, "bidPrice": 1.0},
+                       "SPY": {"symbol": "SPY", "askPrice": 400.1, "bidPrice": 400.0},
+                       "XX": {"symbol": "XX", "description": "Symbol not found"}})
+        self.assertEqual(received, ["AI"])
+        self.assertIsNone(cache.get("XX"))
+
+        bksession = MagicMock()
+        bksession.get_quotes.return_value = {"QQQ": {"symbol": "QQQ", "askPrice": 300.1, "bidPrice": 300.0}}
+        quotes = cache.get_quotes(["AI", "QQQ"], bksession, max_age=5)
+        bksession.get_quotes.assert_called_once_with(["QQQ"])
+        self.assertEqual(quotes["AI"]["bidPrice"], 1.0)
+        self.assertEqual(quotes["QQQ"]["bidPrice"], 300.0)
+        # expired quote is asked again
+        self.assertIsNone(cache.get("AI", max_age=0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ Created on Wed Jun  9 09:36:51 2021
 
 @author: adonay
 """
-from DiscordAlertsTrader.message_parser import parse_trade_alert
+from DiscordAlertsTrader.message_parser import parse_trade_alert, tokenize, AlertScreen
 
 import unittest
 import os
@@ -78,7 +78,51 @@ class TestMessageParser(unittest.TestCase):
 
         for msg, exp in zip(msgs,expect):
             self.assertEqual(parse_trade_alert(msg), exp)
-        
-    
+
+    def test_exits_avg_trailingstop(self):
+        msgs = [
+            "BTO 100 AMD @ 3.2 avg 3.5 invTSbuy 10% PT1: 4 SL: 2.5 lotto",
+            "BTO 50 AMD @ 1.5 TSbuy:5% PT1 2 PT2: 2.5",
+            "STC 30 AMD @ 4.1 sold 1/3",
+            "exit update AMD PT1: 5 SL: 3 isopen:no",
+            "good morning, BTO soon",
+        ]
+        expect = [
+            ('BTO 100 AMD @3.2 lotto AVG to 3.5  invTSbuy 10%, PT1:4, PT2:None, PT3:None, SL:2.5',
+            {'action': 'BTO', 'Symbol': 'AMD', 'Qty': 100, 'price': 3.2, 'asset': 'stock', 'risk': 'lotto', 'avg': 3.5,
+            'open_trailingstop': 'invTSbuy 10%', 'PT1': '4', 'PT2': None, 'PT3': None, 'SL': '2.5', 'n_PTs': 1, 'PTs_Qty': [1]}),
+            ('BTO 50 AMD @1.5  TSbuy 5%, PT1:2, PT2:2.5, PT3:None, SL:None',
+            {'action': 'BTO', 'Symbol': 'AMD', 'Qty': 50, 'price': 1.5, 'asset': 'stock', 'risk': None, 'avg': None,
+            'open_trailingstop': 'TSbuy 5%', 'PT1': '2', 'PT2': '2.5', 'PT3': None, 'SL': None, 'n_PTs': 2, 'PTs_Qty': [0.5, 0.5]}),
+            ('STC 30 AMD @4.1 ',
+            {'action': 'STC', 'Symbol': 'AMD', 'Qty': 30, 'price': 4.1, 'asset': 'stock', 'risk': None, 'xQty': 0.33}),
+            ('ExitUpdate: AMD , PT1:5, PT2:None, PT3:None, SL:3 isopen:no',
+            {'action': 'ExitUpdate', 'Symbol': 'AMD', 'asset': 'stock', 'PT1': '5', 'PT2': None, 'PT3': None, 'SL': '3', 'isopen': False}),
+            (None, None),
+            ]
+        for msg, exp in zip(msgs,expect):
+            self.assertEqual(parse_trade_alert(msg), exp)
+
+    def test_tokenize(self):
+        msg = "BTO 1 AMD @ 2 invTSbuy 10% PT1: 3 SL: 1"
+        # same positions for non ascii messages, scanned with IGNORECASE
+        for m in [msg, msg + " ñ"]:
+            tokens = tokenize(m)
+            self.assertEqual(tokens['action'], [0])
+            self.assertEqual(tokens['inv_ts'], [14])
+            self.assertEqual(tokens['ts'], [17])
+            self.assertEqual(tokens['exit'], [26, 33])
+
+    def test_screen(self):
+        screen = AlertScreen()
+        msgs = ["good morning, stocks look strong", "stop loss hit", "B**TO 5 AMD @ 2", "exit update AMD SL: 3",
+                "STC all, bto later?"]
+        for msg in msgs:
+            self.assertEqual(screen.parse(msg), parse_trade_alert(msg))
+        stats = screen.stats()
+        self.assertEqual((stats["screened"], stats["passed"], stats["alerts"]), (5, 3, 2))
+        self.assertAlmostEqual(stats["hit_rate"], 2/3)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import unittest
+import os
+import copy
+from DiscordAlertsTrader.parser_benchmark import run_benchmark, compare, load_baseline, baseline_fname
+
+# timing depends on the machine load, the baseline check only runs if asked, e.g. PARSER_BENCHMARK=1,
+# the CLI `python -m DiscordAlertsTrader.parser_benchmark` checks all targets
+run_check = os.environ.get("PARSER_BENCHMARK", "") not in ["", "0"]
+tolerance = float(os.environ.get("PARSER_BENCHMARK_TOLERANCE", 0.4))
+
+
+class TestParserBenchmark(unittest.TestCase):
+    def test_compare(self):
+        baseline = {"calibration": 1, "python": "3.11", "targets": {"parser": {"score": 1, "bytes_per_msg": 1000}}}
+        results = copy.deepcopy(baseline)
+        self.assertEqual(compare(results, baseline), [])
+        results["targets"]["parser"]["score"] = 0.5
+        results["targets"]["parser"]["bytes_per_msg"] = 4000
+        self.assertEqual(len(compare(results, baseline)), 2)
+        # allocations differ between python versions
+        results["python"] = "3.12"
+        self.assertEqual(len(compare(results, baseline)), 1)
+
+    @unittest.skipUnless(run_check, "set PARSER_BENCHMARK=1 to check the parser speed baseline")
+    def test_no_regression(self):
+        baseline = load_baseline(baseline_fname)
+        targets = ["parser", "screen", "live", "hist"]
+        results = run_benchmark(targets)
+        self.assertEqual(set(results["targets"]), set(targets))
+        self.assertEqual(compare(results, baseline, tolerance), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+from DiscordAlertsTrader.portfolio_store import SQLiteTable
+
+
+class TestSQLiteTable(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.db_fname = os.path.join(self.data_dir, "portfolios.db")
+        self.fname = os.path.join(self.data_dir, "trader_portfolio.csv")
+        self.columns = ["Date", "Symbol", "Trader", "isOpen", "Price"]
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def count_rows(self):
+        con = sqlite3.connect(self.db_fname)
+        n = con.execute('SELECT COUNT(*) FROM "trader_portfolio"').fetchone()[0]
+        con.close()
+        return n
+
+    def test_import_csv_and_reload(self):
+        port = pd.DataFrame({"Date": ["2023-12-01 10:00:00.000000", "2023-12-01 11:00:00.000000"],
+                             "Symbol": ["AI_120923C25", "SPY"],
+                             "Trader": ["me#1", "you#2"],
+                             "isOpen": [1, 0],
+                             "Price": [1.5, np.nan]})
+        port.to_csv(self.fname, index=False)
+
+        table = SQLiteTable(self.db_fname, self.fname, self.columns)
+        loaded = table.load()
+        self.assertEqual(self.count_rows(), 2)
+
+        reloaded = SQLiteTable(self.db_fname, self.fname, self.columns).load()
+        pd.testing.assert_frame_equal(reloaded, loaded, check_dtype=False)
+
+    def test_save_changed_rows(self):
+        table = SQLiteTable(self.db_fname, self.fname, self.columns)
+        port = table.load()
+        self.assertEqual(len(port), 0)
+
+        port = pd.DataFrame({"Date": ["2023-12-01 10:00:00.000000", "2023-12-01 11:00:00.000000"],
+                             "Symbol": ["AI_120923C25", "SPY"],
+                             "Trader": ["me#1", "you#2"],
+                             "isOpen": [1, 1],
+                             "Price": [1.5, np.nan]})
+        table.save(port)
+        self.assertEqual(self.count_rows(), 2)
+
+        # only the changed and new rows are written
+        port.loc[1, "isOpen"] = 0
+        port.loc[0, "Price"] = 9.9
+        port.loc[2, ["Symbol", "Trader", "isOpen"]] = ["QQQ", "me#1", 1]
+        table.save(port, rows=[1])
+        saved = SQLiteTable(self.db_fname, self.fname, self.columns).load()
+        self.assertEqual(saved["isOpen"].to_list(), [1, 0, 1])
+        self.assertEqual(saved.loc[0, "Price"], 1.5)
+        table.save(port)
+        port = port.drop(index=2)
+
+        # new column is added to the table
+        port["STC1-Price"] = [None, 2.0]
+        table.save(port)
+
+        opened = table.query('"isOpen"=? AND "Trader"=?', (1, "me#1"))
+        self.assertEqual(opened["Symbol"].to_list(), ["AI_120923C25"])
+        reloaded = SQLiteTable(self.db_fname, self.fname, self.columns).load()
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.loc[0, "Price"], 9.9)
+        self.assertEqual(reloaded.loc[1, "isOpen"], 0)
+        self.assertEqual(reloaded.loc[1, "STC1-Price"], 2.0)
+        self.assertTrue(np.isnan(reloaded.loc[0, "STC1-Price"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import pandas as pd
+from datetime import datetime, timezone
+from DiscordAlertsTrader.configurator import cfg
+from DiscordAlertsTrader.replay import load_export, replay
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # replay config is a copy of cfg, other tests change it
+        self.max_capital = cfg['order_configs']['max_trade_capital']
+        cfg['order_configs']['max_trade_capital'] = '{"default": 1000}'
+        # 0DTE alerts of today, options without year are parsed with the current year
+        t0 = datetime.now(timezone.utc).replace(hour=15, minute=0, second=0, microsecond=0)
+        exp = t0.strftime("%m/%d")
+        author = {"id": "1", "name": "besttrader", "discriminator": "0000", "isBot": False}
+        contents = [f"BTO 5 AI 25c {exp} @ 1", "good morning", f"STC 5 AI 25c {exp} @ 1.5"]
+        export = {"guild": {"id": "1"},
+                  "channel": {"id": "2", "name": "replay_chan"},
+                  "messages": [{"id": str(i), "timestamp": (t0 + pd.Timedelta(minutes=i)).isoformat(),
+                                "content": c, "author": author, "embeds": []}
+                               for i, c in enumerate(contents)]}
+        self.fname = os.path.join(self.tmp_dir, "export.json")
+        with open(self.fname, "w") as f:
+            json.dump(export, f)
+        # quotes every 10 secs around the alerts
+        ts = [t0.timestamp() + 10*i for i in range(-1, 20)]
+        self.symbol = f"AI_{t0.strftime('%m%d%y')}C25"
+        self.dir_quotes = os.path.join(self.tmp_dir, "quotes")
+        os.makedirs(self.dir_quotes)
+        pd.DataFrame({"timestamp": ts, "bid": [1.0]*12 + [1.5]*9, "ask": [1.05]*12 + [1.55]*9}
+                     ).to_csv(os.path.join(self.dir_quotes, f"{self.symbol}.csv"), index=False)
+
+    def tearDown(self):
+        cfg['order_configs']['max_trade_capital'] = self.max_capital
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_export(self):
+        messages, channel = load_export(self.fname)
+        self.assertEqual(channel, "replay_chan")
+        self.assertEqual(len(messages), 3)
+        self.assertEqual((messages[0].channel.id, messages[0].guild.id), (2, 1))
+        self.assertEqual(messages[0].author.discriminator, "0")
+
+    def test_replay(self):
+        out_dir = os.path.join(self.tmp_dir, "out")
+        report = replay(self.fname, speed=0, dir_quotes=self.dir_quotes, out_dir=out_dir)
+        self.assertEqual(report["messages"], 3)
+        self.assertEqual(report["latency"]["format"]["count"], 3)
+        self.assertEqual(report["latency"]["total"]["count"], 2)
+        # good morning is not parsed
+        self.assertEqual((report["screen"]["passed"], report["screen"]["alerts"]), (2, 2))
+        self.assertGreater(report["msgs_per_sec"], 0)
+        self.assertIn("growth", report["memory"])
+        self.assertEqual(report["tracked"], 1)
+        port = pd.read_csv(os.path.join(out_dir, "trader_portfolio.csv"))
+        self.assertEqual(port.loc[0, "Symbol"], self.symbol)
+
+
+if __name__ == '__main__':
+    unittest.main()
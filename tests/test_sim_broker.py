@@ -0,0 +1,81 @@
+import unittest
+import threading
+import pandas as pd
+from DiscordAlertsTrader.brokerages.sim_api import SimBroker
+
+
+class TestSimBroker(unittest.TestCase):
+    def setUp(self):
+        self.sim = SimBroker(dir_quotes="", start_time=100, speed=0, latency=0, latency_jitter=0)
+        # bid, ask every 10 secs
+        quotes = pd.DataFrame({"timestamp": [100, 110, 120, 130, 140],
+                               "bid": [1.0, 1.2, 1.5, 1.3, 0.8],
+                               "ask": [1.1, 1.3, 1.6, 1.4, 0.9]})
+        self.sim.replay.add("AI_120923C25", quotes)
+
+    def test_quotes(self):
+        self.sim.set_time(125)
+        quote = self.sim.get_quotes(["AI_120923C25", "XYZ"])
+        self.assertEqual(quote["AI_120923C25"]["bidPrice"], 1.5)
+        self.assertEqual(quote["AI_120923C25"]["quoteTimeInLong"], 120000)
+        self.assertEqual(quote["XYZ"]["description"], "Symbol not found")
+
+    def test_limit_and_partial(self):
+        self.sim.max_fill = 2
+        _, bto_id = self.sim.send_order(self.sim.make_BTO_lim_order("AI_120923C25", 3, 1.1))
+        status, info = self.sim.get_order_info(bto_id)
+        self.assertEqual((status, info["filledQuantity"]), ("PARTIAL", 2))
+        self.sim.set_time(110)
+        # ask went above limit, no fill
+        self.assertEqual(self.sim.get_order_info(bto_id)[0], "PARTIAL")
+        self.sim.set_time(140)
+        status, info = self.sim.get_order_info(bto_id)
+        self.assertEqual((status, info["filledQuantity"]), ("FILLED", 3))
+        # 2 at 1.1 and 1 at 0.9
+        self.assertAlmostEqual(info["price"], 3.1/3)
+        self.assertEqual(self.sim.positions["AI_120923C25"], 3)
+
+    def test_trailstop_and_oco(self):
+        _, ts_id = self.sim.send_order(self.sim.make_STC_SL_trailstop("AI_120923C25", 1, 0.25))
+        _, oco_id = self.sim.send_order(self.sim.make_Lim_SL_order("AI_120923C25", 1, 2, 1.25))
+        self.sim.set_time(130)
+        # bid max 1.5, trail to 1.25
+        self.assertEqual(self.sim.get_order_info(ts_id)[0], "WORKING")
+        self.sim.set_time(140)
+        status, info = self.sim.get_order_info(ts_id)
+        self.assertEqual((status, info["price"]), ("FILLED", 0.8))
+        status, info = self.sim.get_order_info(oco_id)
+        self.assertEqual(status, "FILLED")
+        self.assertEqual([c["status"] for c in info["childOrderStrategies"]], ["CANCELED", "FILLED"])
+        self.assertEqual(self.sim.cancel_order(oco_id), False)
+
+    def test_oco_partial(self):
+        self.sim.max_fill = 2
+        # PT at 1.5 fills 2 at 120, SL of the 1 left at 0.9 fills at 140
+        _, oco_id = self.sim.send_order(self.sim.make_Lim_SL_order("AI_120923C25", 3, 1.5, 0.9))
+        self.sim.set_time(125)
+        status, info = self.sim.get_order_info(oco_id)
+        self.assertEqual(status, "PARTIAL")
+        limit, stop = info["childOrderStrategies"]
+        self.assertEqual((limit["filledQuantity"], stop["status"], stop["quantity"]), (2, "WORKING", 1))
+        self.sim.set_time(140)
+        status, info = self.sim.get_order_info(oco_id)
+        self.assertEqual(status, "FILLED")
+        self.assertEqual([(c["status"], c["filledQuantity"]) for c in info["childOrderStrategies"]],
+                         [("FILLED", 2), ("FILLED", 1)])
+        self.assertEqual(self.sim.positions["AI_120923C25"], -3)
+        self.assertEqual(len(self.sim.get_orders()), 1)
+        self.assertEqual(self.sim.get_account_info()['securitiesAccount']['orderStrategies'], [])
+
+    def test_orders_in_loop_thread(self):
+        threads = []
+        match_orders = self.sim.match_orders
+        self.sim.match_orders = lambda: threads.append(threading.current_thread()) or match_orders()
+        self.sim.get_orders()
+        self.sim.get_account_info()
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import pandas as pd
+from DiscordAlertsTrader.alerts_trader import TradeIndex, find_last_trade
+
+
+class TestFindLastTrade(unittest.TestCase):
+    def setUp(self):
+        self.port = pd.DataFrame({"Trader": ["me#1", "me#1", "me#1", "you#2", "me#1"],
+                                  "Symbol": ["AI_120923C25", "AI_120923C25", "BRKXB", "AI_120923C25", "SPY_120823P450"],
+                                  "Asset": ["option", "option", "stock", "option", "option"],
+                                  "isOpen": [1, 0, 1, 1, 0]})
+
+    def test_open_first(self):
+        index = TradeIndex()
+        order = {"Trader": "me#1", "Symbol": "AI_120923C25", "asset": "option"}
+        self.assertEqual(find_last_trade(order, self.port, trade_index=index), (0, 1))
+        self.port.loc[0, "isOpen"] = 0
+        self.assertEqual(find_last_trade(order, self.port, trade_index=index), (None, 0))
+        self.assertEqual(find_last_trade(order, self.port, open_only=False, trade_index=index), (1, 0))
+
+    def test_option_root(self):
+        index = TradeIndex()
+        order = {"Trader": "me#1", "Symbol": "SPY", "asset": "option"}
+        self.assertEqual(find_last_trade(order, self.port, open_only=False, trade_index=index), (4, 0))
+        # appended rows are indexed on next lookup
+        self.port.loc[5] = ["me#1", "SPY_121523P440", "option", 1]
+        self.assertEqual(find_last_trade(order, self.port, trade_index=index), (5, 1))
+
+    def test_symbol_not_regex(self):
+        order = {"Trader": "me#1", "Symbol": "BRK.B", "asset": "stock"}
+        self.assertEqual(find_last_trade(order, self.port), (None, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
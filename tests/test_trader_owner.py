@@ -0,0 +1,246 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from DiscordAlertsTrader.alerts_trader import AlertsTrader
+from DiscordAlertsTrader.configurator import cfg
+from DiscordAlertsTrader.latency import latency
+from DiscordAlertsTrader.portfolio_store import open_table
+
+
+class TestTraderOwner(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.trader = AlertsTrader(MagicMock(),
+                                   portfolio_fname=os.path.join(self.data_dir, "test_trader_portfolio.csv"),
+                                   alerts_log_fname=os.path.join(self.data_dir, "test_trader_log.csv"),
+                                   update_portfolio=False,
+                                   queue_prints=queue.Queue(maxsize=50),
+                                   cfg=cfg)
+
+    def tearDown(self):
+        self.trader.stop()
+        self.trader.owner.join(1)
+        shutil.rmtree(self.data_dir)
+
+    def test_call_runs_in_owner(self):
+        self.assertIs(self.trader.call(threading.current_thread), self.trader.owner)
+
+        def fail():
+            raise ValueError("bad order")
+        with self.assertRaises(ValueError):
+            self.trader.call(fail)
+
+    def test_snapshot(self):
+        def add_row():
+            self.trader.portfolio.loc[0, "Symbol"] = "AI_120923C25"
+        snap = self.trader.snapshot()
+        self.trader.call(add_row)
+        self.assertEqual(len(snap), 0)
+        self.assertEqual(self.trader.snapshot().loc[0, "Symbol"], "AI_120923C25")
+        self.assertIsNot(self.trader.snapshot(), self.trader.portfolio)
+        # copied only when read after a change
+        snap = self.trader.snapshot()
+        self.assertIs(self.trader.snapshot(), snap)
+        self.trader.call(add_row)
+        self.assertIsNot(self.trader.snapshot(), snap)
+
+    def test_order_event(self):
+        def add_rows():
+            self.trader.portfolio.loc[0, ["Symbol", "isOpen", "ordID"]] = ["AI_120923C25", 1, "101,102"]
+            self.trader.portfolio.loc[1, ["Symbol", "isOpen", "ordID", "STC2-ordID"]] = ["SPY_120823P450", 1, 103, 104.0]
+            self.trader.open_trades.update([0, 1])
+        self.trader.call(add_rows)
+        self.trader.update_trade = MagicMock()
+        self.assertEqual(self.trader.on_order_event("102", "Filled").result(), 0)
+        self.assertEqual(self.trader.on_order_event(104, "Cancelled").result(), 1)
+        self.assertIsNone(self.trader.on_order_event(105, "Filled").result())
+        self.assertEqual([c.args for c in self.trader.update_trade.call_args_list], [(0,), (1,)])
+
+    def test_order_reconcile(self):
+        self.trader.bksession = MagicMock(capabilities=frozenset())
+        self.trader.bksession.get_orders_info.return_value = {"101": ("WORKING", {}), "102": ("WORKING", {})}
+        self.trader.order_reconcile_rate = 60
+        self.trader.update_orders()
+        self.trader.update_orders()
+        # streamed orders, polled once per reconcile
+        self.assertEqual(self.trader.bksession.get_orders_info.call_count, 1)
+        self.assertEqual(self.trader.get_order_info(101), ("WORKING", {}))
+        # pushed order is asked again
+        self.trader.on_order_event(101, "Filled").result()
+        self.assertEqual(set(self.trader.orders_snapshot), {"102"})
+        self.trader.orders_fetched -= 60
+        self.trader.update_orders()
+        self.assertEqual(self.trader.bksession.get_orders_info.call_count, 2)
+        self.assertEqual(self.trader.order_update_rate, 10)
+
+    def test_orders_snapshot(self):
+        self.trader.bksession = MagicMock(capabilities=frozenset())
+        self.trader.bksession.get_orders_info.return_value = {"101": ("WORKING", {}), "102": ("FILLED", {})}
+        self.trader.bksession.get_order_info.return_value = ("WORKING", {})
+        self.trader.bksession.cancel_order.return_value = True
+        self.trader.fetch_orders_info()
+        # snapshot hit
+        self.assertEqual(self.trader.get_order_info(102), ("FILLED", {}))
+        self.assertEqual(self.trader.get_order_info("101"), ("WORKING", {}))
+        self.trader.bksession.get_order_info.assert_not_called()
+        # not in snapshot, asked to the brokerage
+        self.assertEqual(self.trader.get_order_info(103), ("WORKING", {}))
+        self.trader.bksession.get_order_info.assert_called_once_with(103)
+        # cancelled order is asked again
+        self.assertTrue(self.trader.cancel_order(101))
+        self.assertNotIn("101", self.trader.orders_snapshot)
+        self.trader.get_order_info(101)
+        self.assertEqual(self.trader.bksession.get_order_info.call_count, 2)
+        self.assertEqual(self.trader.bksession.get_orders_info.call_count, 1)
+
+    def test_quotes_snapshot(self):
+        quotes_max_age = cfg['general']['quotes_max_age']
+        cfg['general']['quotes_max_age'] = "0"
+        self.trader.bksession = MagicMock()
+        self.trader.bksession.get_quotes.side_effect = lambda symbols: {
+            s: {"symbol": s, "askPrice": 1.1, "bidPrice": 1.0} for s in symbols}
+        port = self.trader.portfolio
+        # exit orders not sent yet, SL checked below market
+        port.loc[0, ["Symbol", "Asset", "Type", "isOpen", "BTO-Status", "exit_plan"]] = \
+            ["AI", "stock", "BTO", 1, "FILLED", str({"PT1": 2, "PT2": None, "PT3": None, "SL": 1.5})]
+        # trailing stop PT
+        port.loc[1, ["Symbol", "Asset", "Type", "isOpen", "BTO-Status", "exit_plan", "STC1-ordID"]] = \
+            ["SPY", "stock", "BTO", 1, "FILLED", str({"PT1": "2TS0.1", "PT2": None, "PT3": None, "SL": None}), 104]
+        # exit orders working, no quote needed
+        port.loc[2, ["Symbol", "Asset", "Type", "isOpen", "BTO-Status", "exit_plan", "STC1-ordID"]] = \
+            ["TSLA", "stock", "BTO", 1, "FILLED", str({"PT1": 2, "PT2": None, "PT3": None, "SL": None}), 105]
+        self.trader.open_trades.update([0, 1, 2])
+        try:
+            self.trader.fetch_quotes()
+            order = self.trader.SL_below_market({"Symbol": "AI", "action": "STC", "SL": 1.5})
+            self.assertEqual(self.trader.price_now("SPY", "STC", 1), 1.0)
+        finally:
+            cfg['general']['quotes_max_age'] = quotes_max_age
+        self.assertEqual(order["SL"], 0.95)
+        self.assertEqual(self.trader.bksession.get_quotes.call_count, 1)
+        self.assertEqual(set(self.trader.bksession.get_quotes.call_args[0][0]), {"AI", "SPY"})
+
+    def test_closed_trade_saved(self):
+        storage, data_dir = cfg['general']['portfolio_storage'], cfg['general']['data_dir']
+        cfg['general']['portfolio_storage'], cfg['general']['data_dir'] = "sqlite", self.data_dir
+        fname = os.path.join(self.data_dir, "db_trader_portfolio.csv")
+        try:
+            trader = AlertsTrader(MagicMock(), portfolio_fname=fname,
+                                  alerts_log_fname=os.path.join(self.data_dir, "db_trader_log.csv"),
+                                  update_portfolio=False, queue_prints=queue.Queue(maxsize=50), cfg=cfg)
+            trader.portfolio.loc[0, ["Date", "Symbol", "Trader", "Asset", "Type", "isOpen", "BTO-Status", "Qty", "filledQty"]] = \
+                ["2023-12-01 10:00:00.000000", "AI", "me#1", "stock", "BTO", 1, "CANCELED", 1, 0]
+            trader.track_open(0)
+            trader.save_logs("port", rows=[0])
+            order = {"action": "STC", "Symbol": "AI", "Trader": "me#1", "price": 1.0, "Qty": 1, "xQty": 1, "asset": "stock"}
+            trader.new_trade_alert(order, "STC AI @1", "STC AI @1")
+            trader.stop()
+            self.assertEqual(trader.open_trades, set())
+            # close is saved, the trade is not open after a restart
+            reloaded = open_table(fname, cfg["col_names"]['portfolio'].split(","), cfg).load()
+            self.assertEqual(reloaded.loc[0, "isOpen"], 0)
+        finally:
+            cfg['general']['portfolio_storage'], cfg['general']['data_dir'] = storage, data_dir
+
+    def test_exit_orders_batched(self):
+        bk = MagicMock(capabilities=frozenset(["batch_orders"]))
+        bk.name = "sim"
+        bk.run.side_effect = lambda coro: coro
+        bk.send_orders.return_value = [("ok", 201), ("ok", 202)]
+        bk.make_STC_lim.side_effect = lambda **order: order
+        self.trader.bksession = bk
+        self.trader.save_logs = MagicMock()
+        exit_plan = {"PT1": 2.0, "PT2": 3.0, "PT3": None, "SL": None}
+        self.trader.portfolio.loc[0, ["Symbol", "Asset", "Type", "isOpen", "BTO-Status", "Price", "Qty", "filledQty", "exit_plan"]] = \
+            ["AI", "stock", "BTO", 1, "FILLED", 1.0, 2, 2, str(exit_plan)]
+        self.trader.call(self.trader.make_exit_orders, 0, exit_plan)
+        # both PTs sent in one request
+        bk.send_order.assert_not_called()
+        sent = bk.send_orders.call_args[0][0]
+        self.assertEqual([(o["price"], o["Qty"]) for o in sent], [(2.0, 1), (3.0, 1)])
+        self.assertEqual(self.trader.portfolio.loc[0, ["STC1-ordID", "STC2-ordID"]].tolist(), [201, 202])
+
+    def test_update_stops_and_saves(self):
+        self.trader.open_trades.update([0, 1, 2])
+        self.trader.update_trade = MagicMock(side_effect=[None, False, None])
+        self.trader.save_logs = MagicMock()
+        self.trader.update_open_trades()
+        self.assertEqual(self.trader.update_trade.call_count, 2)
+        self.trader.save_logs.assert_called_once_with("port", [0, 1])
+
+    def test_alerts_between_trade_updates(self):
+        self.trader.open_trades.update([0, 1, 2])
+        self.trader.save_logs = MagicMock()
+        ran = []
+
+        def alert():
+            ran.append("alert")
+            # alert closed trade 1
+            self.trader.open_trades.discard(1)
+
+        def update_trade(i):
+            ran.append(i)
+            if i == 0:
+                # alert received while the first trade is updated
+                threading.Thread(target=self.trader.submit, args=(alert,)).start()
+                while self.trader.commands.empty():
+                    time.sleep(0.001)
+        self.trader.update_trade = update_trade
+        self.trader.fetch_quotes = MagicMock()
+        self.trader.update_orders()
+        self.assertEqual(ran, [0, "alert", 2])
+        self.trader.save_logs.assert_called_once_with("port", [0, 1, 2])
+
+    def test_open_trades_by_label(self):
+        def add_rows():
+            port = self.trader.portfolio
+            port.loc[0, ["Symbol", "Asset", "Type", "isOpen", "Date"]] = ["SPY", "stock", "BTO", 1, "2023-12-01 10:00:00.000000"]
+            port.loc[1, ["Symbol", "Asset", "Type", "isOpen", "Date", "Price", "filledQty"]] = \
+                ["AI_120923C25", "option", "BTO", 1, "2023-12-01 10:00:00.000000", 1.0, 5]
+            port.loc[2, ["Symbol", "Asset", "Type", "isOpen", "Date"]] = ["TSLA", "stock", "BTO", 1, "2023-12-01 10:00:00.000000"]
+            # labels no longer match positions
+            self.trader.portfolio = port.drop(index=0)
+            for i in self.trader.portfolio.index:
+                self.trader.track_open(i)
+        self.trader.call(add_rows)
+        self.assertEqual(self.trader.open_trades, {1, 2})
+        self.assertEqual(self.trader.watchlist.symbols(), {"AI_120923C25", "TSLA"})
+
+        self.trader.price_now = MagicMock(return_value=0)
+        self.trader.save_logs = MagicMock()
+        self.trader.call(self.trader.close_expired, 1)
+        self.assertEqual(self.trader.open_trades, {2})
+        self.assertEqual(self.trader.portfolio.loc[1, "isOpen"], 0)
+        self.assertEqual(self.trader.portfolio.loc[2, "isOpen"], 1)
+        self.assertEqual(self.trader.watchlist.symbols(), {"TSLA"})
+
+    def test_risk_span_without_confirmation(self):
+        auto_trade = cfg['order_configs']['auto_trade']
+        cfg['order_configs']['auto_trade'] = "false"
+        latency.reset()
+        order = {"Symbol": "AI", "action": "BTO", "price": 1.0, "price_actual": 1.0, "asset": "stock", "Qty": 1}
+        try:
+            with patch("builtins.input", side_effect=lambda *args: time.sleep(0.2) or "n"):
+                self.trader.confirm_and_send(order, "BTO 1 AI @1", MagicMock())
+        finally:
+            cfg['order_configs']['auto_trade'] = auto_trade
+        risk = latency.stats()["risk"]
+        self.assertEqual(risk["count"], 1)
+        self.assertLess(risk["mean"], 0.1)
+
+    def test_stop(self):
+        self.trader.stop()
+        self.trader.owner.join(1)
+        self.assertFalse(self.trader.owner.is_alive())
+        # without owner thread commands run in the caller
+        self.assertIs(self.trader.call(threading.current_thread), threading.current_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import asyncio
+from unittest.mock import MagicMock
+from DiscordAlertsTrader.brokerages.tradestation_api import TS
+from DiscordAlertsTrader.brokerages.tradestation_stream import TSStream
+from DiscordAlertsTrader.live_quotes import quote_cache
+
+
+class FakeClient():
+    "Async client replaying the stream messages"
+    def __init__(self, msgs):
+        self.msgs = msgs
+        self.symbols = None
+
+    async def stream_quotes(self, symbols):
+        self.symbols = symbols
+        for msg in self.msgs:
+            yield msg
+
+
+class TestTSStream(unittest.TestCase):
+    def setUp(self):
+        ts = TS(accountId="SIM1")
+        ts.session = MagicMock()
+        self.stream = TSStream(ts)
+        self.stream.running = True
+
+    def read(self, symbols, msgs):
+        client = FakeClient(msgs)
+        self.stream.set_symbols(symbols)
+        self.stream.streamed = set(symbols)
+        try:
+            asyncio.run(self.stream.read_stream(client, sorted(symbols)))
+        except ConnectionError:
+            pass
+        return client
+
+    def test_changes_merged(self):
+        msgs = [{"Symbol": "AAPL 301206C180", "Ask": "1.10", "Bid": "1.00", "Last": "1.05",
+                 "TradeTime": "2023-12-01T15:00:00Z"},
+                {"Symbol": "AAPL 301206C180", "Bid": "1.02"}]
+        client = self.read({"AAPL_120630C180"}, msgs)
+        self.assertEqual(client.symbols, ["AAPL 301206C180"])
+        quote = quote_cache.get("AAPL_120630C180")
+        self.assertEqual([quote['askPrice'], quote['bidPrice'], quote['lastPrice']], [1.1, 1.02, 1.05])
+        self.assertEqual(quote['quoteTimeInLong'], 1701442800000)
+        self.assertIsInstance(quote['quoteTimeInLong'], int)
+        self.assertTrue(self.stream.connected)
+        self.assertTrue(self.stream.is_live("AAPL_120630C180"))
+
+    def test_bad_symbol_and_error(self):
+        msgs = [{"Symbol": "XYZQ", "Error": "Bad symbol"},
+                {"Heartbeat": 1, "Timestamp": "2023-12-01T15:00:00Z"}]
+        self.read({"XYZQ", "MSFT"}, msgs)
+        # stops reading as XYZQ is no longer streamed
+        self.assertEqual(self.stream.invalid, {"XYZQ"})
+        self.assertFalse(self.stream.connected)
+        self.assertEqual(self.stream.to_stream(), ["MSFT"])
+
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.stream.read_stream(FakeClient([{"Error": "GoAway", "Message": "Maintenance"}]), ["MSFT"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+from DiscordAlertsTrader.brokerages.weBull_api import weBull
+
+
+class TestWebullOptionIds(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.data_dir, "webull_option_ids.json")
+        self.chain = [{'strikePrice': '180',
+                       'call': {'expireDate': '2030-06-21', 'tickerId': 111},
+                       'put': {'expireDate': '2030-06-21', 'tickerId': 112}},
+                      {'strikePrice': '182.5',
+                       'call': {'expireDate': '2030-06-21', 'tickerId': 113}}]
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def make_webull(self):
+        wb = weBull(option_ids_fname=self.fname)
+        wb.session = MagicMock()
+        wb.session.get_options.return_value = self.chain
+        return wb
+
+    def test_chain_fetched_once(self):
+        wb = self.make_webull()
+        self.assertEqual(wb.get_option_id("AAPL_062130C180"), "111")
+        self.assertEqual(wb.get_option_id("AAPL_062130P180"), "112")
+        self.assertEqual(wb.get_option_id("AAPL_062130C182.5"), "113")
+        self.assertEqual(wb.session.get_options.call_count, 1)
+        with self.assertRaises(ValueError):
+            wb.get_option_id("AAPL_062130C185")
+
+        # ids loaded from disk
+        wb = self.make_webull()
+        self.assertEqual(wb.get_option_id("AAPL_062130P180"), "112")
+        wb.session.get_options.assert_not_called()
+
+    def test_expired_dropped(self):
+        with open(self.fname, "w") as f:
+            json.dump({"AAPL_062123C180": "1", "AAPL_062130C180": "111"}, f)
+        wb = self.make_webull()
+        self.assertEqual(wb.option_ids, {"AAPL_062130C180": "111"})
+
+    def test_warm(self):
+        wb = self.make_webull()
+        n_chains = wb.warm_option_ids(["AAPL_062130C180", "AAPL_062130P180", "SPY"])
+        self.assertEqual(n_chains, 1)
+        self.assertEqual(wb.option_ids["AAPL_062130C182.5"], "113")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+from DiscordAlertsTrader.brokerages import RequestBudget
+from DiscordAlertsTrader.brokerages.weBull_api import weBull
+
+
+def option_quote(tId, optionId):
+    time.sleep(0.05)
+    return {'data': [{'tradeStamp': 1700000000000,
+                      'askList': [{'price': '1.10'}],
+                      'bidList': [{'price': '1.00'}]}]}
+
+
+class TestWebullQuotes(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.wb = weBull(option_ids_fname=os.path.join(self.data_dir, "webull_option_ids.json"))
+        self.wb.budget = RequestBudget(0)
+        self.wb.session = MagicMock()
+        self.wb.session.get_ticker.return_value = 913256135
+        self.wb.session.get_option_quote.side_effect = option_quote
+        self.symbols = [f"AAPL_062130C{strike}" for strike in range(170, 186)]
+        self.wb.option_ids = {symb: str(i) for i, symb in enumerate(self.symbols)}
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_same_shape_and_order(self):
+        quotes = self.wb.get_quotes(self.symbols + ["AAPL_bad"])
+        self.assertEqual(list(quotes.keys()), self.symbols)
+        self.assertEqual(quotes["AAPL_062130C170"], {'symbol': "AAPL_062130C170",
+                                                     'description': "0",
+                                                     'askPrice': 1.1,
+                                                     'bidPrice': 1.0,
+                                                     'quoteTimeInLong': 1700000000000})
+        # ticker id asked once
+        self.assertEqual(self.wb.session.get_ticker.call_count, 1)
+
+    def test_parallel(self):
+        t0 = time.time()
+        self.wb.get_quotes(self.symbols)
+        self.assertLess(time.time() - t0, 0.05 * len(self.symbols) / 2)
+
+    def test_budget(self):
+        budget = RequestBudget(100)
+        t0 = time.monotonic()
+        for _ in range(11):
+            budget.wait()
+        self.assertGreaterEqual(time.monotonic() - t0, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import MagicMock
+from DiscordAlertsTrader.brokerages.weBull_stream import WebullStream
+from DiscordAlertsTrader.live_quotes import quote_cache
+
+
+class TestWebullStream(unittest.TestCase):
+    def setUp(self):
+        wb = MagicMock()
+        wb.fix_symbol.side_effect = lambda symb, direction: symb
+        wb.get_option_id.return_value = "1041"
+        wb.get_ticker_id.return_value = "913256135"
+        self.stream = WebullStream(wb)
+        self.stream.conn = MagicMock()
+        self.stream.connected = True
+
+    def test_subscriptions_follow_symbols(self):
+        self.stream.set_symbols({"AAPL_062130C180", "AAPL"})
+        self.stream.sync_subscriptions()
+        self.assertEqual(self.stream.subscribed, {"AAPL_062130C180": "1041", "AAPL": "913256135"})
+        self.assertEqual(self.stream.conn.subscribe.call_count, 2)
+
+        self.stream.set_symbols({"AAPL"})
+        self.stream.sync_subscriptions()
+        self.stream.conn.unsubscribe.assert_called_once_with(tId="1041", level=104)
+        self.assertEqual(self.stream.tid_symbols, {"913256135": "AAPL"})
+
+    def test_order_callbacks(self):
+        events = []
+        self.stream.order_callbacks.append(lambda *args: events.append(args))
+        self.stream.order_callbacks.append(MagicMock(side_effect=ValueError))
+        self.stream.on_order({"type": "order"}, {"orderId": 5741, "orderStatus": "Filled"})
+        self.stream.on_order({"type": "order"}, {"tickerId": 1041})
+        self.assertEqual(events, [(5741, "Filled")])
+
+    def test_order_platpush(self):
+        events = []
+        self.stream.order_callbacks.append(lambda *args: events.append(args))
+        self.stream.on_order({"type": "order"},
+                             {"messageId": "1", "action": "order", "type": "order", "title": "Order filled",
+                              "data": {"tickerId": 1041, "orderId": "5741", "filledQuantity": "1",
+                                       "orderType": "LMT", "orderStatus": "Filled"}})
+        self.assertEqual(events, [("5741", "Filled")])
+
+    def test_reconnect_closes_clients(self):
+        order_client, quotes_client = MagicMock(), MagicMock()
+        self.stream.conn.client_order_upd, self.stream.conn.client_streaming_quotes = order_client, quotes_client
+        self.stream.connect()
+        order_client.loop_stop.assert_called_once()
+        order_client.disconnect.assert_called_once()
+        quotes_client.disconnect.assert_called_once()
+        self.stream.conn.connect.assert_called_once()
+
+        order_client = MagicMock()
+        self.stream.conn.client_order_upd = order_client
+        self.stream.stop()
+        order_client.loop_stop.assert_called_once()
+        self.assertIsNone(self.stream.conn.client_order_upd)
+
+    def test_price_to_quote(self):
+        self.stream.set_symbols({"AAPL_062130C185"})
+        self.stream.sync_subscriptions()
+        topic = {"type": "104", "tickerId": 1041}
+        # only ask, not published yet
+        self.stream.on_price(topic, {"askList": [{"price": "1.10", "volume": "3"}]})
+        self.assertFalse(self.stream.is_live("AAPL_062130C185"))
+        self.stream.on_price(topic, {"bidList": [{"price": "1.00", "volume": "5"}], "tradeStamp": 1700000000000})
+        quote = quote_cache.get("AAPL_062130C185")
+        self.assertEqual(quote, {'symbol': "AAPL_062130C185",
+                                 'description': "1041",
+                                 'askPrice': 1.1,
+                                 'bidPrice': 1.0,
+                                 'quoteTimeInLong': 1700000000000})
+        self.assertTrue(self.stream.is_live("AAPL_062130C185"))
+        # bad message does not raise
+        self.stream.on_price(topic, {"askList": [{}]})
+
+
+if __name__ == '__main__':
+    unittest.main()